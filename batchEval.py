@@ -0,0 +1,140 @@
+import numpy as np
+import evaluator
+
+# Evaluates many boards at once with NumPy, for analysis jobs and generating training data, where looping over
+# Board objects one at a time is too slow. This is the only module that needs NumPy, and nothing else imports it.
+#
+# A batch of N boards is an array of shape (N, rows, columns) holding 1 for an 'X' piece, -1 for an 'O' piece
+# and 0 for an empty space, indexed [board][row][column] with row 0 at the bottom, as in Board.gameBoard.
+#
+# Every quantity is built from the windows used by evaluator.WindowEvaluator (every line of winNum spaces). For
+# each of the four directions, adding up winNum shifted slices of the board counts the pieces in every window
+# in that direction at once, which is a convolution of the board with a line of winNum ones. From the counts:
+# - a board is won by a player with a window full of their pieces
+# - the heuristic score is the same as WindowEvaluator.score(), including its scoring of immediate threats
+
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+# Convert a list of Board or BitBoard objects to a batch
+def toArray(gameBoards):
+	batch = np.zeros((len(gameBoards), gameBoards[0].numRows, gameBoards[0].numColumns), dtype=np.int8)
+	for i in range(len(gameBoards)):
+		grid = gameBoards[i].gameBoard
+		for row in range(len(grid)):
+			for column in range(len(grid[row])):
+				if grid[row][column].value == 'X':
+					batch[i, row, column] = 1
+				elif grid[row][column].value == 'O':
+					batch[i, row, column] = -1
+	return batch
+
+# Return, for each direction that has windows, the slices of the board (as (row, column) slice pairs) holding
+# the k-th space of every window, for k from 0 to winNum - 1. Window w of the direction is made of the spaces
+# at the same position in each of these slices.
+def windowSlices(rows, columns, winNum):
+	directions = []
+	for rowStep, colStep in DIRECTIONS:
+		numRows = rows - rowStep * (winNum - 1)
+		numColumns = columns - abs(colStep) * (winNum - 1)
+		if numRows <= 0 or numColumns <= 0:
+			continue
+		# Windows going left start winNum - 1 columns in
+		if colStep < 0:
+			startColumn = winNum - 1
+		else:
+			startColumn = 0
+		slices = []
+		for k in range(winNum):
+			row = rowStep * k
+			column = startColumn + colStep * k
+			slices.append((slice(row, row + numRows), slice(column, column + numColumns)))
+		directions.append(slices)
+	return directions
+
+# Return the number of 'X' pieces and 'O' pieces in each window, as two lists (one entry per direction) of
+# arrays of shape (N, windowRows, windowColumns)
+def windowCounts(batch, winNum):
+	xPieces = (batch == 1).astype(np.int16)
+	oPieces = (batch == -1).astype(np.int16)
+	xCounts = []
+	oCounts = []
+	for slices in windowSlices(batch.shape[1], batch.shape[2], winNum):
+		rowSlice, colSlice = slices[0]
+		xCount = xPieces[:, rowSlice, colSlice].copy()
+		oCount = oPieces[:, rowSlice, colSlice].copy()
+		for rowSlice, colSlice in slices[1:]:
+			xCount += xPieces[:, rowSlice, colSlice]
+			oCount += oPieces[:, rowSlice, colSlice]
+		xCounts.append(xCount)
+		oCounts.append(oCount)
+	return xCounts, oCounts
+
+# Return an array of shape (N,) holding 1 for boards won by 'X', -1 for boards won by 'O' and 0 otherwise
+def winners(batch, winNum, counts=None):
+	if counts is None:
+		counts = windowCounts(batch, winNum)
+	xCounts, oCounts = counts
+	xWon = np.zeros(batch.shape[0], dtype=bool)
+	oWon = np.zeros(batch.shape[0], dtype=bool)
+	for xCount, oCount in zip(xCounts, oCounts):
+		xWon |= (xCount == winNum).any(axis=(1, 2))
+		oWon |= (oCount == winNum).any(axis=(1, 2))
+	return xWon.astype(np.int8) - oWon.astype(np.int8)
+
+# Return a boolean array of shape (N, columns) that is True for each column with space for another piece
+def legalMoves(batch):
+	return batch[:, -1, :] == 0
+
+# Return a boolean array of shape (N, columns) that is True for each column where the given player (1 for 'X',
+# -1 for 'O') could complete a window with their next piece
+def threatColumns(batch, winNum, counts, player):
+	xCounts, oCounts = counts
+	if player == 1:
+		ownCounts = xCounts
+		otherCounts = oCounts
+	else:
+		ownCounts = oCounts
+		otherCounts = xCounts
+	empty = batch == 0
+	winning = np.zeros(batch.shape, dtype=bool)
+	directions = windowSlices(batch.shape[1], batch.shape[2], winNum)
+	for slices, ownCount, otherCount in zip(directions, ownCounts, otherCounts):
+		openWindows = (ownCount == winNum - 1) & (otherCount == 0)
+		for rowSlice, colSlice in slices:
+			winning[:, rowSlice, colSlice] |= openWindows & empty[:, rowSlice, colSlice]
+	# A space can be played if it is the lowest empty space in its column
+	heights = (batch != 0).sum(axis=1)
+	playable = np.arange(batch.shape[1])[None, :, None] == heights[:, None, :]
+	return (winning & playable).any(axis=1)
+
+# Return an array of shape (N,) of heuristic scores from the point of view of 'X', matching
+# WindowEvaluator.score(). The player to move is worked out from the number of pieces on each board.
+def scores(batch, winNum, counts=None):
+	if counts is None:
+		counts = windowCounts(batch, winNum)
+	xCounts, oCounts = counts
+	weights = np.array([0] + [4 ** (n - 1) for n in range(1, winNum + 1)], dtype=np.float64)
+	total = np.zeros(batch.shape[0], dtype=np.float64)
+	numWindows = 0
+	for xCount, oCount in zip(xCounts, oCounts):
+		numWindows += xCount.shape[1] * xCount.shape[2]
+		total += np.where(oCount == 0, weights[xCount], 0).sum(axis=(1, 2))
+		total -= np.where(xCount == 0, weights[oCount], 0).sum(axis=(1, 2))
+	result = total / (2 * max(1, numWindows) * weights[winNum])
+
+	if winNum > 1:
+		xToMove = (batch != 0).sum(axis=(1, 2)) % 2 == 0
+		xThreats = threatColumns(batch, winNum, counts, 1).sum(axis=1)
+		oThreats = threatColumns(batch, winNum, counts, -1).sum(axis=1)
+		threatScore = evaluator.WindowEvaluator.THREAT_SCORE
+		result = np.where(xToMove & (xThreats > 0), threatScore, result)
+		result = np.where(xToMove & (xThreats == 0) & (oThreats > 1), -threatScore, result)
+		result = np.where(~xToMove & (oThreats > 0), -threatScore, result)
+		result = np.where(~xToMove & (oThreats == 0) & (xThreats > 1), threatScore, result)
+	return result
+
+# Return the winners, legal moves and scores of a batch, as described above. The window counts are only worked
+# out once and shared between them.
+def evaluate(batch, winNum):
+	counts = windowCounts(batch, winNum)
+	return winners(batch, winNum, counts), legalMoves(batch), scores(batch, winNum, counts)
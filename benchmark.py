@@ -0,0 +1,222 @@
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import board
+import player
+
+# Benchmarks the search on fixed sets of positions, so that the effect of a change on speed and on the number of
+# nodes searched can be measured without random opponents or printing getting in the way.
+#
+# Each suite is a board size, a search depth and a list of positions, given as the columns played from the empty
+# board. Every method is run on every position with a fresh Player, so results do not depend on what was searched
+# before. Node counts are deterministic and should only change when the search does; times depend on the machine,
+# so each search is repeated and the median time is kept.
+#
+# Results are printed (or written to a file) as JSON, and can be compared with an earlier run saved as a baseline.
+# The comparison is gated on the node counts: a method that expands more nodes than the baseline, or prunes fewer
+# or finds fewer transposition table hits without expanding fewer nodes, is reported as a regression. Most
+# positions take well under a millisecond, where timings vary by more than any useful tolerance from one run to
+# the next, so times only count if they are worse by more than the tolerance and by more than an absolute slack,
+# and nodes per second is only compared for methods that run long enough to time reliably.
+
+# Change VERSION whenever the suites change, as results for different suites cannot be compared
+VERSION = 1
+
+SUITES = {
+	"3x3-3": {"rows": 3, "columns": 3, "winNum": 3, "depth": -1,
+		"positions": ["", "11", "2", "222", "0100", "0", "22", "02", "01"]},
+	"4x4-3": {"rows": 4, "columns": 4, "winNum": 3, "depth": -1,
+		"positions": ["", "203", "0331", "22013", "3102012", "33", "0010122", "31131", "03032031"]},
+	"4x5-3": {"rows": 4, "columns": 5, "winNum": 3, "depth": 8,
+		"positions": ["", "24413", "144034", "31212333", "34124", "10022", "0032204", "3113", "13143"]},
+	"4x5-4": {"rows": 4, "columns": 5, "winNum": 4, "depth": 6,
+		"positions": ["", "443212", "21002", "21431", "102022130", "43001132", "20041400", "042111122", "42311"]},
+	"5x6-4": {"rows": 5, "columns": 6, "winNum": 4, "depth": 5,
+		"positions": ["", "313004", "55110333204203", "50454512001502", "503331", "455050434525", "05033444", "02545505200025", "535305440153"]},
+	"6x7-4": {"rows": 6, "columns": 7, "winNum": 4, "depth": 5,
+		"positions": ["", "5404023324", "4423130603664", "2425164230561221", "1631522533122560", "643405160634631", "100260116", "6301210555315", "61404513221"]},
+}
+
+# Each method is a function that searches the given board with the given Player, and whether that Player uses the
+# transposition table. Iterative deepening methods stop at the Player's node limit rather than at the suite depth.
+def runMinimax(p, gameBoard, maxingPlayer, depth):
+	return p.minimax(gameBoard, depth, maxingPlayer)[0]
+
+def runMinimaxAB(p, gameBoard, maxingPlayer, depth):
+	return p.minimaxAB(gameBoard, depth, maxingPlayer, -math.inf, math.inf)[0]
+
+def runPVS(p, gameBoard, maxingPlayer, depth):
+	p.startSearch(gameBoard, None)
+	return p.negamax(gameBoard, depth, -math.inf, math.inf, maxingPlayer)[0]
+
+def runMinimaxIterative(p, gameBoard, maxingPlayer, depth):
+	return p.minimaxIterative(gameBoard, maxingPlayer)
+
+def runMinimaxABIterative(p, gameBoard, maxingPlayer, depth):
+	return p.minimaxABIterative(gameBoard, maxingPlayer)
+
+def runPVSIterative(p, gameBoard, maxingPlayer, depth):
+	return p.pvsIterative(gameBoard, maxingPlayer)
+
+METHODS = {
+	"minimax": (runMinimax, False),
+	"minimaxAB": (runMinimaxAB, False),
+	"minimaxAB+tt": (runMinimaxAB, True),
+	"pvs+tt": (runPVS, True),
+	"minimaxIterative": (runMinimaxIterative, False),
+	"minimaxABIterative": (runMinimaxABIterative, True),
+	"pvsIterative": (runPVSIterative, True),
+}
+
+# Build a BitBoard by playing the given columns from the empty board, returning it and whether 'X' is to move
+def makePosition(rows, columns, winNum, moves):
+	gameBoard = board.BitBoard(rows, columns, winNum)
+	for i in range(len(moves)):
+		if i % 2 == 0:
+			gameBoard.addPiece(int(moves[i]), 'X')
+		else:
+			gameBoard.addPiece(int(moves[i]), 'O')
+	return gameBoard, len(moves) % 2 == 0
+
+# Return the value at the given percentile of a sorted list, using the nearest rank
+def percentile(values, p):
+	if not values:
+		return 0
+	return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+# Run one method on every position of a suite, repeating each search the given number of times, and return its
+# results
+def runMethod(suite, method, repeat=3):
+	function, transposition = METHODS[method]
+	expanded = 0
+	pruned = 0
+	cacheHits = 0
+	latencies = []
+	for moves in suite["positions"]:
+		gameBoard, maxingPlayer = makePosition(suite["rows"], suite["columns"], suite["winNum"], moves)
+		times = []
+		for i in range(repeat):
+			random.seed(0)
+			if maxingPlayer:
+				p = player.Player('X')
+			else:
+				p = player.Player('O')
+			p.transposition = transposition
+			start = time.perf_counter()
+			function(p, gameBoard, maxingPlayer, suite["depth"])
+			times.append(time.perf_counter() - start)
+		times.sort()
+		latencies.append(times[len(times) // 2])
+		expanded += p.numExpanded
+		pruned += p.numPruned
+		cacheHits += p.cacheHits
+
+	total = sum(latencies)
+	latencies.sort()
+	return {
+		"positions": len(latencies),
+		"expanded": expanded,
+		"pruned": pruned,
+		"cacheHits": cacheHits,
+		# The fraction of nodes reached that were answered from the transposition table rather than searched
+		"ttHitRate": cacheHits / (cacheHits + expanded) if cacheHits + expanded else 0,
+		"time": total,
+		"nodesPerSecond": expanded / total if total > 0 else 0,
+		"latencyMs": {
+			"p50": percentile(latencies, 50) * 1000,
+			"p90": percentile(latencies, 90) * 1000,
+			"p99": percentile(latencies, 99) * 1000,
+			"max": latencies[-1] * 1000 if latencies else 0,
+		},
+	}
+
+# Run the given methods on the given suites, returning the results as a dictionary ready to be written as JSON
+def runBenchmark(suites=None, methods=None, repeat=3):
+	if suites is None:
+		suites = list(SUITES)
+	if methods is None:
+		methods = list(METHODS)
+	results = {}
+	for name in suites:
+		results[name] = {}
+		for method in methods:
+			results[name][method] = runMethod(SUITES[name], method, repeat)
+	return {
+		"version": VERSION,
+		"repeat": repeat,
+		"python": platform.python_version(),
+		"machine": platform.machine(),
+		"results": results,
+	}
+
+# Compare results with a baseline, returning a list of regressions (as messages). tolerance is the fraction by
+# which speed and latency may get worse before it counts as a regression, slackMs is the number of milliseconds
+# the median latency may also get worse by, and nodes per second is only compared for methods whose searches took
+# at least minSeconds in all in the baseline.
+def compare(results, baseline, tolerance=0.1, slackMs=1.0, minSeconds=0.5):
+	if results["version"] != baseline.get("version"):
+		return [f"Suite version {results['version']} cannot be compared with baseline version {baseline.get('version')}"]
+	regressions = []
+	for suite in results["results"]:
+		for method in results["results"][suite]:
+			old = baseline["results"].get(suite, {}).get(method)
+			if old is None:
+				continue
+			new = results["results"][suite][method]
+			name = f"{suite} {method}"
+			if new["expanded"] > old["expanded"]:
+				regressions.append(f"{name}: expanded {new['expanded']} nodes, up from {old['expanded']}")
+			elif new["expanded"] == old["expanded"]:
+				# With fewer nodes expanded there are fewer to prune or find in the table, so these only count when the
+				# search did as much work as before
+				if new["pruned"] < old["pruned"]:
+					regressions.append(f"{name}: pruned {new['pruned']} times, down from {old['pruned']}")
+				if new["cacheHits"] < old["cacheHits"]:
+					regressions.append(f"{name}: {new['cacheHits']} transposition table hits, down from {old['cacheHits']}")
+			if old["time"] >= minSeconds and new["nodesPerSecond"] < old["nodesPerSecond"] * (1 - tolerance):
+				regressions.append(f"{name}: {new['nodesPerSecond']:.0f} nodes/s, down from {old['nodesPerSecond']:.0f}")
+			if new["latencyMs"]["p50"] > old["latencyMs"]["p50"] * (1 + tolerance) + slackMs:
+				regressions.append(f"{name}: median latency {new['latencyMs']['p50']:.2f} ms, up from {old['latencyMs']['p50']:.2f}")
+	return regressions
+
+# Print a table of results to stderr, so that stdout only holds the JSON
+def printSummary(results):
+	print(f"{'suite':8} {'method':20} {'expanded':>10} {'pruned':>9} {'tt hit':>7} {'nodes/s':>9} {'p50 ms':>9} {'p99 ms':>9}", file=sys.stderr)
+	for suite in results["results"]:
+		for method, r in results["results"][suite].items():
+			print(f"{suite:8} {method:20} {r['expanded']:10} {r['pruned']:9} {r['ttHitRate']:7.1%} {r['nodesPerSecond']:9.0f} {r['latencyMs']['p50']:9.2f} {r['latencyMs']['p99']:9.2f}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Benchmark the search on fixed sets of positions.")
+	parser.add_argument("--suite", action="append", choices=list(SUITES), help="suite to run (may be repeated; default: all)")
+	parser.add_argument("--method", action="append", choices=list(METHODS), help="method to run (may be repeated; default: all)")
+	parser.add_argument("--repeat", type=int, default=3, help="number of times each search is run, keeping the median time")
+	parser.add_argument("--output", default=None, help="file to write the JSON results to (default: stdout)")
+	parser.add_argument("--baseline", default=None, help="JSON results of an earlier run to compare against")
+	parser.add_argument("--tolerance", type=float, default=0.1, help="fraction by which times may get worse before counting as a regression")
+	parser.add_argument("--slack", type=float, default=1.0, help="milliseconds by which the median latency may also get worse")
+	parser.add_argument("--min-time", type=float, default=0.5, help="seconds a method must take in the baseline for its nodes/s to be compared")
+	args = parser.parse_args()
+
+	results = runBenchmark(args.suite, args.method, args.repeat)
+	printSummary(results)
+	if args.output is None:
+		print(json.dumps(results, indent=1))
+	else:
+		with open(args.output, "w") as f:
+			json.dump(results, f, indent=1)
+
+	if args.baseline is not None:
+		with open(args.baseline) as f:
+			baseline = json.load(f)
+		regressions = compare(results, baseline, args.tolerance, args.slack, args.min_time)
+		for message in regressions:
+			print(f"Regression: {message}", file=sys.stderr)
+		if regressions:
+			sys.exit(1)
+		print("No regressions against the baseline", file=sys.stderr)
@@ -1,4 +1,4 @@
-import copy
+import random
 
 # The Space class is a simple wrapper around a string representing the content of a space.
 # If a space is unused it has the value ' ', otherwise it has the name of the player whose piece occupies that space. 
@@ -20,6 +20,32 @@ class Space:
 		return str(self)
 
 
+# Zobrist keys are random 64-bit numbers, one per player per space, indexed by row * columns + column.
+# The hash of a position is the XOR of the keys of every occupied space, so it can be updated with a single
+# XOR whenever a piece is added or removed. Keys are cached per board size and generated from a fixed seed, so
+# every board (and every process) with the same size uses the same keys and produces the same hashes.
+# Boards also track the hash of their mirror image (reflected about the centre column), which uses the key of
+# the mirrored space, so a position and its reflection can be recognised as equivalent.
+zobristCache = {}
+
+def zobristKeys(rows, columns, player):
+	index = (rows, columns, player)
+	if index not in zobristCache:
+		generator = random.Random(f"zobrist {rows}x{columns} {player}")
+		zobristCache[index] = [generator.getrandbits(64) for i in range(rows * columns)]
+	return zobristCache[index]
+
+# The columns of a board with the given number of columns in the order searches try them: the middle first, then
+# alternating either side of it. It is worked out once for each width and shared by every board and search.
+orderCache = {}
+
+def columnOrder(columns):
+	if columns not in orderCache:
+		middle = columns // 2
+		orderCache[columns] = tuple(middle + (1 - 2 * (i % 2)) * (i + 1) // 2 for i in range(columns))
+	return orderCache[columns]
+
+
 # This class represents the Connect board, and tracks various useful pieces of information and provides utility 
 # methods, e.g., for checking whether the board is full or the last move is a winning moves. 
 class Board:
@@ -51,6 +77,29 @@ class Board:
 		# The first element is the row, the second is the column and the last element is the name of the player.
 		self.lastPlay = [-1,-1, ""]
 
+		# We store the Zobrist hash of the position and of its mirror image, which are updated as pieces are
+		# added and removed
+		self.hash = 0
+		self.mirrorHash = 0
+		self.zobrist = {}
+
+		# An optional object (such as an evaluator.WindowEvaluator) that is told about every piece added or
+		# removed, so that it can keep a heuristic evaluation of the board up to date
+		self.evaluator = None
+		# An optional candidateColumns.CandidateColumns, told about every piece in the same way, which keeps the set
+		# of columns near the pieces on the board
+		self.candidates = None
+
+
+	# Add or remove the given player's piece at the given space from the hashes
+	def updateHash(self, row, column, player):
+		if player not in self.zobrist:
+			self.zobrist[player] = zobristKeys(self.numRows, self.numColumns, player)
+		keys = self.zobrist[player]
+		index = row * self.numColumns
+		self.hash = self.hash ^ keys[index + column]
+		self.mirrorHash = self.mirrorHash ^ keys[index + self.numColumns - 1 - column]
+
 
 	# This method adds a piece for the specified player to the specified column
 	def addPiece(self, column, player):
@@ -67,6 +116,11 @@ class Board:
 		# assign the space to the player and record the last move
 		self.gameBoard[row][column].value = player
 		self.lastPlay = [row, column, player]
+		self.updateHash(row, column, player)
+		if self.evaluator is not None:
+			self.evaluator.update(row, column, player, 1)
+		if self.candidates is not None:
+			self.candidates.update(row, column, player, 1)
 		# increment the fill tracker to account for this move
 		self.colFills[column] = self.colFills[column] + 1
 		return True
@@ -85,7 +139,13 @@ class Board:
 
 		# get the row containing the highest piece
 		row = self.colFills[column] - 1
-		# set the space to empty
+		# remove the piece from the hashes and evaluator and set the space to empty
+		player = self.gameBoard[row][column].value
+		self.updateHash(row, column, player)
+		if self.evaluator is not None:
+			self.evaluator.update(row, column, player, -1)
+		if self.candidates is not None:
+			self.candidates.update(row, column, player, -1)
 		self.gameBoard[row][column].value = ' '
 		self.lastPlay = [row, column, ' ']
 		# decrement the fill tracker to account for this move
@@ -271,6 +331,34 @@ class Board:
 		return False
 	
 
+	# Return True if a piece for the player at the given (empty) space would complete a winning line.
+	# The space does not need to be playable yet, so this can also check the space above the next move.
+	def isWinningSpace(self, row, column, player):
+		space = self.gameBoard[row][column]
+		lastPlay = self.lastPlay
+		space.value = player
+		self.lastPlay = [row, column, player]
+		won = self.checkWin()
+		space.value = ' '
+		self.lastPlay = lastPlay
+		return won
+
+
+	# Return two lists of columns: those where the player could win by playing now, and those where the player
+	# could win by playing on top of the next piece placed in that column
+	def threatColumns(self, player):
+		wins = []
+		above = []
+		for column in range(self.numColumns):
+			row = self.colFills[column]
+			if row < self.numRows:
+				if self.isWinningSpace(row, column, player):
+					wins.append(column)
+				if row + 1 < self.numRows and self.isWinningSpace(row + 1, column, player):
+					above.append(column)
+		return wins, above
+
+
 	# Check whether the board is full, i.e., if it is possible to make a move 
 	def checkFull(self):
 		for i in range(self.numColumns):
@@ -297,9 +385,340 @@ class Board:
 
 
 	# Copy the current board
+	# The new board already has its own Space objects, so only their values need copying
 	def copy(self):
 		b = Board(self.numRows, self.numColumns, self.winNum)
-		b.gameBoard = copy.deepcopy(self.gameBoard)
-		b.lastPlay = copy.deepcopy(self.lastPlay)
-		b.colFills = copy.deepcopy(self.colFills)
+		for row in range(self.numRows):
+			for column in range(self.numColumns):
+				b.gameBoard[row][column].value = self.gameBoard[row][column].value
+		b.lastPlay = list(self.lastPlay)
+		b.colFills = list(self.colFills)
+		b.hash = self.hash
+		b.mirrorHash = self.mirrorHash
+		return b
+
+
+	# Create a BitBoard holding the same pieces as this board
+	def toBitBoard(self):
+		b = BitBoard(self.numRows, self.numColumns, self.winNum)
+		for row in range(self.numRows):
+			for column in range(self.numColumns):
+				value = self.gameBoard[row][column].value
+				if value != ' ':
+					b.setSpace(row, column, value)
+		b.colFills = list(self.colFills)
+		b.lastPlay = list(self.lastPlay)
+		return b
+
+
+# Tables used by BitBoard, worked out once for each board size and shared by every BitBoard of that size:
+#  - steps[d] are the shifts that find lines of winNum pieces in direction d (see hasLine());
+#  - multiples[d] are the shifts that move 1 to winNum - 1 steps in direction d, used by threatMask();
+#  - lines[bit] lists (lineMask, steps) for each direction in which a line of winNum could pass through that bit,
+#    where lineMask holds the spaces within winNum - 1 steps of the bit in that direction, so checkWin() only has
+#    to look at the lines through the last piece played.
+bitTablesCache = {}
+
+def bitTables(rows, columns, winNum):
+	index = (rows, columns, winNum)
+	if index not in bitTablesCache:
+		colHeight = rows + 1
+		# (shift, row step, column step) for vertical, horizontal and both diagonal lines
+		directions = ((1, 1, 0), (colHeight, 0, 1), (colHeight + 1, 1, 1), (colHeight - 1, -1, 1))
+		steps = []
+		multiples = []
+		for shift, rowStep, colStep in directions:
+			multiples.append(tuple(shift * k for k in range(1, winNum)))
+			shifts = []
+			length = 1
+			while length * 2 <= winNum:
+				shifts.append(shift * length)
+				length = length * 2
+			if length < winNum:
+				shifts.append(shift * (winNum - length))
+			steps.append(tuple(shifts))
+		lines = [()] * (columns * colHeight)
+		for column in range(columns):
+			for row in range(rows):
+				through = []
+				for d in range(len(directions)):
+					shift, rowStep, colStep = directions[d]
+					lineMask = 0
+					numSpaces = 0
+					for k in range(1 - winNum, winNum):
+						r = row + k * rowStep
+						c = column + k * colStep
+						if 0 <= r < rows and 0 <= c < columns:
+							lineMask = lineMask | (1 << (c * colHeight + r))
+							numSpaces = numSpaces + 1
+					if numSpaces >= winNum:
+						through.append((lineMask, steps[d]))
+				lines[column * colHeight + row] = tuple(through)
+		bitTablesCache[index] = (tuple(steps), tuple(multiples), tuple(lines))
+	return bitTablesCache[index]
+
+
+# The BitBoard class is a compact alternative to Board. Rather than a grid of Space objects, each player's pieces
+# are stored as the set bits of a single integer, and colFills doubles as the height array. Columns are laid out
+# one after another, each using numRows + 1 bits: the extra top bit is never set, which stops lines from wrapping
+# from the top of one column into the bottom of the next. This lets checkWin() find lines by shifting and ANDing
+# the masks instead of walking the grid.
+# It provides the same methods as Board (addPiece, removePiece, checkWin, checkFull, checkSpace, printBoard and
+# copy), so it can be used anywhere a Board is expected.
+class BitBoard:
+
+	def __init__(self, rows, columns, winNum):
+		self.numRows = rows
+		self.numColumns = columns
+		self.winNum = winNum
+
+		# The number of bits used by each column (including the empty bit at the top)
+		self.colHeight = rows + 1
+		# The shift that moves one step vertically, horizontally, and along each diagonal
+		self.shifts = (1, self.colHeight, self.colHeight + 1, self.colHeight - 1)
+		self.steps, self.multiples, self.lines = bitTables(rows, columns, winNum)
+		# Masks with a bit for the bottom space of each column, and for every space on the board
+		self.bottomMask = 0
+		for column in range(columns):
+			self.bottomMask = self.bottomMask | (1 << (column * self.colHeight))
+		self.boardMask = self.bottomMask * ((1 << rows) - 1)
+
+		# The mask of pieces belonging to each player, indexed by player name
+		self.masks = {}
+		# The number of pieces on the board, used to check whether the board is full
+		self.numPieces = 0
+
+		self.colFills = list()
+		for i in range(self.numColumns):
+			self.colFills.append(0)
+
+		self.lastPlay = [-1,-1, ""]
+
+		# The Zobrist hashes of the position and its mirror image, using the same keys as Board
+		self.hash = 0
+		self.mirrorHash = 0
+		self.zobrist = {}
+
+		# An optional object (such as an evaluator.WindowEvaluator) that is told about every piece added or
+		# removed, so that it can keep a heuristic evaluation of the board up to date
+		self.evaluator = None
+		# An optional candidateColumns.CandidateColumns, told about every piece in the same way, which keeps the set
+		# of columns near the pieces on the board
+		self.candidates = None
+
+
+	# Add or remove the given player's piece at the given space from the hashes
+	def updateHash(self, row, column, player):
+		if player not in self.zobrist:
+			self.zobrist[player] = zobristKeys(self.numRows, self.numColumns, player)
+		keys = self.zobrist[player]
+		index = row * self.numColumns
+		self.hash = self.hash ^ keys[index + column]
+		self.mirrorHash = self.mirrorHash ^ keys[index + self.numColumns - 1 - column]
+
+
+	# This method adds a piece for the specified player to the specified column
+	def addPiece(self, column, player):
+		if column >= self.numColumns or column < 0:
+			print("Column does not exist")
+			return False
+
+		row = self.colFills[column]
+		if row >= self.numRows:
+			print("Column is full, pick another column")
+			return False
+
+		self.masks[player] = self.masks.get(player, 0) | (1 << (column * self.colHeight + row))
+		self.lastPlay = [row, column, player]
+		self.updateHash(row, column, player)
+		if self.evaluator is not None:
+			self.evaluator.update(row, column, player, 1)
+		if self.candidates is not None:
+			self.candidates.update(row, column, player, 1)
+		self.colFills[column] = row + 1
+		self.numPieces = self.numPieces + 1
+		return True
+
+
+	# This method removes a piece from the specified column
+	# Note this can be used in your search, and not as a move in the game.
+	def removePiece(self, column):
+		if column >= self.numColumns or column < 0:
+			print("Column does not exist")
+			return False
+
+		if self.colFills[column] == 0:
+			print("Column is empty, pick another column")
+			return False
+
+		row = self.colFills[column] - 1
+		bit = 1 << (column * self.colHeight + row)
+		masks = self.masks
+		for player, mask in masks.items():
+			if mask & bit:
+				masks[player] = mask ^ bit
+				self.updateHash(row, column, player)
+				if self.evaluator is not None:
+					self.evaluator.update(row, column, player, -1)
+				if self.candidates is not None:
+					self.candidates.update(row, column, player, -1)
+				break
+		self.lastPlay = [row, column, ' ']
+		self.colFills[column] = row
+		self.numPieces = self.numPieces - 1
+		return True
+
+
+	# Set the specified space to belong to the player without changing colFills or lastPlay.
+	# This is used when building a BitBoard from an existing board.
+	def setSpace(self, row, column, player):
+		self.masks[player] = self.masks.get(player, 0) | (1 << (column * self.colHeight + row))
+		self.numPieces = self.numPieces + 1
+		self.updateHash(row, column, player)
+
+
+	# Return True if the mask contains a line of winNum pieces in any direction.
+	# For each direction, run holds the pieces that start a line of the current length; ANDing it with a copy
+	# of itself shifted along by that length doubles the length, so only log2(winNum) steps are needed.
+	def hasLine(self, mask):
+		for steps in self.steps:
+			run = mask
+			for step in steps:
+				run = run & (run >> step)
+			if run:
+				return True
+		return False
+
+
+	# This method returns True if the last play resulted in a win for that player, and returns False otherwise.
+	# As with Board, this assumes that the game did not already contain a winning line before the last move, so
+	# only the lines through the last piece are looked at: in each direction in which a line fits on the board, the
+	# player's pieces are masked down to the spaces in line with it, and only if there are at least winNum of them
+	# is the mask searched for a line.
+	def checkWin(self):
+		row, column, lastPlayer = self.lastPlay
+		if lastPlayer not in self.masks:
+			return False
+		mask = self.masks[lastPlayer]
+		winNum = self.winNum
+		for lineMask, steps in self.lines[column * self.colHeight + row]:
+			run = mask & lineMask
+			if run.bit_count() >= winNum:
+				for step in steps:
+					run = run & (run >> step)
+				if run:
+					return True
+		return False
+
+
+	# Return a mask of the empty spaces where a piece for the player would complete a winning line.
+	# For each direction and each position the empty space could take within a line, the player's mask is
+	# shifted so that the other spaces of the line all land on the empty space, and the shifted masks are ANDed.
+	# Lines cannot wrap between columns: every step from a space on the board lands either on another space of
+	# the board, off the board entirely, or on the empty bit at the top of a column, none of which are set.
+	# Rather than shifting the mask once for every space of every line, below[k] holds the spaces with k of the
+	# player's pieces in a row just below them in the direction, and above[k] those with k just above, each built
+	# from the one before with one shift. A space completes a line if it has a pieces below and winNum - 1 - a above.
+	def threatMask(self, player):
+		mask = self.masks.get(player, 0)
+		boardMask = self.boardMask
+		threats = 0
+		for multiples in self.multiples:
+			below = [boardMask]
+			above = [boardMask]
+			downRun = boardMask
+			upRun = boardMask
+			for multiple in multiples:
+				downRun = downRun & (mask << multiple)
+				upRun = upRun & (mask >> multiple)
+				below.append(downRun)
+				above.append(upRun)
+			above.reverse()
+			for downRun, upRun in zip(below, above):
+				threats = threats | (downRun & upRun)
+		occupied = 0
+		for name in self.masks:
+			occupied = occupied | self.masks[name]
+		return threats & ~occupied
+
+
+	# Return a mask of the spaces where the next piece in each column would land
+	def playableMask(self):
+		occupied = 0
+		for name in self.masks:
+			occupied = occupied | self.masks[name]
+		return (occupied + self.bottomMask) & self.boardMask
+
+
+	# Return the columns that have a set bit in the mask. Only the columns with a set bit are visited, so this is
+	# cheap on wide boards where few columns have threats.
+	def maskColumns(self, mask):
+		columns = []
+		columnMask = (1 << self.colHeight) - 1
+		while mask:
+			column = ((mask & -mask).bit_length() - 1) // self.colHeight
+			columns.append(column)
+			mask = mask & ~(columnMask << (column * self.colHeight))
+		return columns
+
+
+	# Return two lists of columns: those where the player could win by playing now, and those where the player
+	# could win by playing on top of the next piece placed in that column
+	def threatColumns(self, player):
+		threats = self.threatMask(player)
+		playable = self.playableMask()
+		return self.maskColumns(threats & playable), self.maskColumns(threats & (playable << 1))
+
+
+	# Check whether the board is full, i.e., if it is possible to make a move
+	def checkFull(self):
+		return self.numPieces >= self.numRows * self.numColumns
+
+
+	# Check what is in the specified location. As with Board, this returns a Space whose value is the
+	# player name or ' '.
+	def checkSpace(self, row, column):
+		space = Space()
+		bit = 1 << (column * self.colHeight + row)
+		for player in self.masks:
+			if self.masks[player] & bit:
+				space.value = player
+				break
+		return space
+
+
+	# Build the board as a list of lists of Space objects, in the same layout as Board.gameBoard.
+	# This is only intended for display and for code that reads the grid directly; it is rebuilt on each access.
+	@property
+	def gameBoard(self):
+		grid = list()
+		for row in range(self.numRows):
+			currRow = list()
+			for column in range(self.numColumns):
+				currRow.append(self.checkSpace(row, column))
+			grid.append(currRow)
+		return grid
+
+
+	# Print a simple visualisation of the current board (where 0,0 is bottom left)
+	def printBoard(self):
+		for row in reversed(self.gameBoard):
+			print("| ", end='')
+			for col in row:
+				print(col, " ", end='')
+			print("|")
+		for i in range(self.numColumns):
+			print(f"--{i}", end='')
+		print("---")
+
+
+	# Copy the current board
+	def copy(self):
+		b = BitBoard(self.numRows, self.numColumns, self.winNum)
+		b.masks = dict(self.masks)
+		b.numPieces = self.numPieces
+		b.colFills = list(self.colFills)
+		b.lastPlay = list(self.lastPlay)
+		b.hash = self.hash
+		b.mirrorHash = self.mirrorHash
 		return b
@@ -0,0 +1,55 @@
+import board
+
+# Keeps the set of columns worth searching on very wide boards: those within a few columns of a piece already
+# played. On a board much wider than it is tall (say 20 rows by 40 columns with 5 to win), most columns are empty
+# and far from any piece, and a move there can neither make nor block a line for many moves, so searching every
+# column makes each node cost in proportion to the width of the board without finding anything better.
+#
+# Like evaluator.WindowEvaluator, a CandidateColumns is attached to a board (as board.candidates) and the board tells
+# it about every piece added or removed. For each column it counts the pieces within distance columns of it, so an
+# update only touches the 2 * distance + 1 columns around the piece, and a column is a candidate while its count is
+# above zero. Every space that would complete or block a line of winNum is next to a piece of that line, so with a
+# distance of at least 1 the candidates always include the immediate wins and blocks.
+#
+# ordered() returns the playable candidates in the usual middle-first order, so the cost of ordering the moves at
+# a node depends on the number of candidates and not on the width of the board.
+
+class CandidateColumns:
+
+	def __init__(self, gameBoard, distance=2):
+		self.distance = distance
+		self.numColumns = gameBoard.numColumns
+		self.numRows = gameBoard.numRows
+		self.order = board.columnOrder(self.numColumns)
+		# rank[column] is the position of the column in the middle-first order
+		self.rank = [0] * self.numColumns
+		for i in range(self.numColumns):
+			self.rank[self.order[i]] = i
+		# nearCounts[column] is the number of pieces within distance columns of the column
+		self.nearCounts = [0] * self.numColumns
+		self.columns = set()
+		for column in range(self.numColumns):
+			for row in range(gameBoard.colFills[column]):
+				self.update(row, column, None, 1)
+
+	# Called by the board when a piece is added (delta 1) or removed (delta -1)
+	def update(self, row, column, player, delta):
+		nearCounts = self.nearCounts
+		for near in range(max(0, column - self.distance), min(self.numColumns, column + self.distance + 1)):
+			nearCounts[near] += delta
+			if nearCounts[near] == 0:
+				self.columns.discard(near)
+			elif delta > 0 and nearCounts[near] == 1:
+				self.columns.add(near)
+
+	# Return the candidate columns of the board that are not full, middle first. On an empty board this is just the
+	# middle column, and if every candidate is full it is every column that is not full.
+	def ordered(self, gameBoard):
+		if not self.columns:
+			return [self.order[0]]
+		colFills = gameBoard.colFills
+		columns = [column for column in self.columns if colFills[column] < self.numRows]
+		if not columns:
+			return [column for column in self.order if colFills[column] < self.numRows]
+		columns.sort(key=self.rank.__getitem__)
+		return columns
@@ -0,0 +1,220 @@
+import argparse
+import mmap
+import struct
+import sys
+import board
+
+# An endgame table holds the result of every position reachable on one board size, found by solving the whole
+# game once, so that a player can play perfectly by looking up each of its moves instead of searching.
+#
+# Positions are numbered by a perfect index: no two positions share an index, so the table is a flat array
+# with one byte per index and no keys need to be stored. Each column is numbered by writing its pieces as
+# binary digits (1 for 'O'), from the bottom, under a leading 1 that marks the height of the column, and
+# subtracting 1. That gives 2^(rows + 1) - 1 possible columns, and the index of the board is its columns read
+# as the digits of a number in that base. Playing a piece changes only one digit, so the index is updated with a
+# single addition during the solve.
+# The table has (2^(rows + 1) - 1)^columns entries whether or not every index is a reachable position, so it is
+# only practical for small boards (about 29 MB for 4x5, but almost 1 GB for 5x5).
+#
+# Each byte holds the result for the player to move, in the top two bits, and the number of moves until the game
+# ends with perfect play, in the bottom six. The winner plays to win as quickly as possible and the loser to lose
+# as slowly as possible. A zero byte is a position that has not been solved (or cannot be reached).
+
+WIN = 1
+LOSS = 2
+DRAW = 3
+
+MAGIC = b"CNEG"
+HEADER = struct.Struct("<4sBBB") # magic, rows, columns, winNum
+
+# The largest table built unless a larger limit is given
+MAX_SIZE = 1 << 28
+
+
+class EndgameTable:
+
+	def __init__(self, rows, columns, winNum, maxSize=MAX_SIZE):
+		self.numRows = rows
+		self.numColumns = columns
+		self.winNum = winNum
+		self.base = (1 << (rows + 1)) - 1
+		self.size = self.base ** columns
+		if rows * columns > 63:
+			raise ValueError("Boards with more than 63 spaces cannot be stored in an endgame table")
+		if self.size > maxSize:
+			raise ValueError(f"An endgame table for a {rows}x{columns} board needs {self.size} entries (the limit is {maxSize})")
+		# powers[column] is the value of one unit of that column's digit in the index
+		self.powers = [self.base ** column for column in range(columns)]
+		self.table = None
+		# The number of positions solved
+		self.numSolved = 0
+
+	# Return the index of the given board, which may be a Board or a BitBoard
+	def positionIndex(self, gameBoard):
+		index = 0
+		for column in range(self.numColumns):
+			height = gameBoard.colFills[column]
+			digit = 1 << height
+			for row in range(height):
+				if gameBoard.checkSpace(row, column).value == 'O':
+					digit = digit | (1 << row)
+			index = index + (digit - 1) * self.powers[column]
+		return index
+
+	# Solve every position reachable from the empty board
+	def solve(self):
+		self.table = bytearray(self.size)
+		self.numSolved = 0
+		# The solve needs one level of recursion per move
+		sys.setrecursionlimit(max(sys.getrecursionlimit(), self.numRows * self.numColumns + 100))
+		# A BitBoard is only used for its win test; the solve keeps its own masks
+		self.lineBoard = board.BitBoard(self.numRows, self.numColumns, self.winNum)
+		self.solvePosition(0, 0, [0] * self.numColumns, 0, 0, 0)
+
+	# Solve the position with the given index, where mover and other are the masks (in BitBoard layout) of the
+	# pieces of the player to move and of their opponent, and return its table entry.
+	# moverBit is 0 if 'X' is to move and 1 if 'O' is, and numPieces is the number of pieces on the board.
+	def solvePosition(self, mover, other, heights, moverBit, numPieces, index):
+		entry = self.table[index]
+		if entry != 0:
+			return entry
+
+		rows = self.numRows
+		colHeight = rows + 1
+		best = 0
+		bestResult = 0
+		bestDistance = 0
+		for column in range(self.numColumns):
+			height = heights[column]
+			if height == rows:
+				continue
+			newMover = mover | (1 << (column * colHeight + height))
+			childIndex = index + ((1 + moverBit) << height) * self.powers[column]
+			if self.lineBoard.hasLine(newMover):
+				# The player to move wins with this move, so the position after it is lost for the opponent
+				if self.table[childIndex] == 0:
+					self.table[childIndex] = LOSS << 6
+					self.numSolved = self.numSolved + 1
+				result = WIN
+				distance = 1
+			elif numPieces + 1 == rows * self.numColumns:
+				if self.table[childIndex] == 0:
+					self.table[childIndex] = DRAW << 6
+					self.numSolved = self.numSolved + 1
+				result = DRAW
+				distance = 1
+			else:
+				heights[column] = height + 1
+				childEntry = self.solvePosition(other, newMover, heights, 1 - moverBit, numPieces + 1, childIndex)
+				heights[column] = height
+				childResult = childEntry >> 6
+				distance = (childEntry & 63) + 1
+				if childResult == WIN:
+					result = LOSS
+				elif childResult == LOSS:
+					result = WIN
+				else:
+					result = DRAW
+			if best == 0 or self.better(result, distance, bestResult, bestDistance):
+				best = 1
+				bestResult = result
+				bestDistance = distance
+
+		entry = (bestResult << 6) | bestDistance
+		self.table[index] = entry
+		self.numSolved = self.numSolved + 1
+		return entry
+
+	# Return True if the result and distance are better for the player to move than the best so far
+	def better(self, result, distance, bestResult, bestDistance):
+		if result != bestResult:
+			return result == WIN or (result == DRAW and bestResult == LOSS)
+		if result == WIN:
+			return distance < bestDistance
+		if result == LOSS:
+			return distance > bestDistance
+		return False
+
+	# Return the table entry for the given board as (result, distance) for the player to move, or None if the
+	# board is a different size or the position has not been solved
+	def lookup(self, gameBoard):
+		if gameBoard.numRows != self.numRows or gameBoard.numColumns != self.numColumns or gameBoard.winNum != self.winNum:
+			return None
+		entry = self.table[self.positionIndex(gameBoard)]
+		if entry == 0:
+			return None
+		return entry >> 6, entry & 63
+
+	# Return the best move for the player to move on the given board, or None if it is not in the table.
+	# Ties are broken in favour of the columns nearest the middle.
+	def bestMove(self, gameBoard):
+		if gameBoard.checkWin() or gameBoard.checkFull() or self.lookup(gameBoard) is None:
+			return None
+		if sum(gameBoard.colFills) % 2 == 0:
+			piece = 'X'
+		else:
+			piece = 'O'
+		column = None
+		bestResult = 0
+		bestDistance = 0
+		for col in board.columnOrder(self.numColumns):
+			if gameBoard.colFills[col] >= self.numRows:
+				continue
+			child = gameBoard.copy()
+			child.addPiece(col, piece)
+			childEntry = self.lookup(child)
+			if childEntry is None:
+				return None
+			if childEntry[0] == WIN:
+				result = LOSS
+			elif childEntry[0] == LOSS:
+				result = WIN
+			else:
+				result = DRAW
+			if column is None or self.better(result, childEntry[1] + 1, bestResult, bestDistance):
+				column = col
+				bestResult = result
+				bestDistance = childEntry[1] + 1
+		return column
+
+	# Write the table to path
+	def save(self, path):
+		with open(path, "wb") as f:
+			f.write(HEADER.pack(MAGIC, self.numRows, self.numColumns, self.winNum))
+			f.write(self.table)
+
+	# Load a table written by save(). The table is memory-mapped, so processes using the same file share it.
+	@classmethod
+	def load(cls, path, maxSize=MAX_SIZE):
+		with open(path, "rb") as f:
+			magic, rows, columns, winNum = HEADER.unpack(f.read(HEADER.size))
+			if magic != MAGIC:
+				raise ValueError(f"{path} is not an endgame table")
+			endgame = cls(rows, columns, winNum, maxSize)
+			data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		endgame.table = memoryview(data)[HEADER.size:]
+		return endgame
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Solve a Connect-N board completely and write its endgame table.")
+	parser.add_argument("--rows", type=int, default=3)
+	parser.add_argument("--columns", type=int, default=3)
+	parser.add_argument("--win", type=int, default=3)
+	parser.add_argument("--max-size", type=int, default=MAX_SIZE, help="largest number of table entries allowed")
+	parser.add_argument("--output", default=None, help="file to write (default: endgame-<rows>x<columns>-<win>.bin)")
+	args = parser.parse_args()
+
+	output = args.output
+	if output is None:
+		output = f"endgame-{args.rows}x{args.columns}-{args.win}.bin"
+	try:
+		endgame = EndgameTable(args.rows, args.columns, args.win, args.max_size)
+	except ValueError as error:
+		if args.rows * args.columns > 63:
+			parser.error(str(error))
+		size = ((1 << (args.rows + 1)) - 1) ** args.columns
+		parser.error(f"{error}. Pass --max-size {size} to build it anyway; the table takes one byte per entry, in memory while it is solved and on disk.")
+	endgame.solve()
+	endgame.save(output)
+	print(f"Solved {endgame.numSolved} positions and wrote {output}")
@@ -0,0 +1,131 @@
+# Static evaluation of non-terminal positions, for use at the depth limit of a depth-limited search.
+#
+# A window is any line of winNum spaces (vertical, horizontal or diagonal) that could hold a winning line. A window
+# containing pieces from only one player is still open for that player, and is worth more the more pieces it holds.
+# Windows containing pieces from both players can never be won and are worth nothing. The evaluation is the total
+# worth of the maximising player's open windows minus that of the minimising player's.
+#
+# The evaluator is attached to a board (as board.evaluator) and the board tells it about every piece added or
+# removed, so only the windows through that space need updating. It also keeps the set of windows that need just
+# one more piece, which are used to spot immediate threats when a position is scored.
+#
+# Scores are from the maximising player's point of view and always lie strictly between -1 and 1, so they never
+# compete with the scores the search gives to wins and losses.
+
+# The windows for each board size, as a list of windows (each a list of (row, column) spaces), and for each
+# space (indexed by row * columns + column) the list of windows containing it
+windowCache = {}
+
+def windowTables(rows, columns, winNum):
+	index = (rows, columns, winNum)
+	if index not in windowCache:
+		windows = []
+		for row in range(rows):
+			for column in range(columns):
+				for rowStep, colStep in ((1, 0), (0, 1), (1, 1), (1, -1)):
+					endRow = row + rowStep * (winNum - 1)
+					endColumn = column + colStep * (winNum - 1)
+					if 0 <= endRow < rows and 0 <= endColumn < columns:
+						windows.append([(row + rowStep * i, column + colStep * i) for i in range(winNum)])
+		spaceWindows = [[] for i in range(rows * columns)]
+		for w in range(len(windows)):
+			for row, column in windows[w]:
+				spaceWindows[row * columns + column].append(w)
+		windowCache[index] = (windows, spaceWindows)
+	return windowCache[index]
+
+
+class WindowEvaluator:
+
+	# The score given when the player to move can win immediately, or the opponent has two immediate threats
+	# that cannot both be blocked
+	THREAT_SCORE = 0.9
+
+	def __init__(self, gameBoard, maxPlayer='X', minPlayer='O'):
+		self.maxPlayer = maxPlayer
+		self.minPlayer = minPlayer
+		self.numColumns = gameBoard.numColumns
+		self.winNum = gameBoard.winNum
+		# colFills is shared with the board, so it is always up to date when a position is scored
+		self.colFills = gameBoard.colFills
+		self.windows, self.spaceWindows = windowTables(gameBoard.numRows, gameBoard.numColumns, gameBoard.winNum)
+
+		# weights[n] is the worth of an open window holding n pieces. Each extra piece is worth four times as much.
+		self.weights = [0]
+		for n in range(1, self.winNum + 1):
+			self.weights.append(4 ** (n - 1))
+		# Dividing by scale keeps the total worth of every window below 0.5
+		self.scale = 2 * max(1, len(self.windows)) * self.weights[self.winNum]
+
+		self.maxCounts = [0] * len(self.windows)
+		self.minCounts = [0] * len(self.windows)
+		self.total = 0
+		self.threats = set()
+
+		for row in range(gameBoard.numRows):
+			for column in range(gameBoard.numColumns):
+				player = gameBoard.checkSpace(row, column).value
+				if player != ' ':
+					self.update(row, column, player, 1)
+
+	# Add (sign 1) or remove (sign -1) the given player's piece at the given space
+	def update(self, row, column, player, sign):
+		if player == self.maxPlayer:
+			counts = self.maxCounts
+		elif player == self.minPlayer:
+			counts = self.minCounts
+		else:
+			return
+		weights = self.weights
+		threatCount = self.winNum - 1
+		for w in self.spaceWindows[row * self.numColumns + column]:
+			maxCount = self.maxCounts[w]
+			minCount = self.minCounts[w]
+			# remove the window's old worth
+			if minCount == 0:
+				self.total -= weights[maxCount]
+			elif maxCount == 0:
+				self.total += weights[minCount]
+			wasThreat = (maxCount == threatCount and minCount == 0) or (minCount == threatCount and maxCount == 0)
+
+			counts[w] += sign
+			maxCount = self.maxCounts[w]
+			minCount = self.minCounts[w]
+			# add its new worth
+			if minCount == 0:
+				self.total += weights[maxCount]
+			elif maxCount == 0:
+				self.total -= weights[minCount]
+			isThreat = (maxCount == threatCount and minCount == 0) or (minCount == threatCount and maxCount == 0)
+
+			if isThreat and not wasThreat:
+				self.threats.add(w)
+			elif wasThreat and not isThreat:
+				self.threats.discard(w)
+
+	# Return the score of the position, given whether the maximising player is the one to move
+	def score(self, maxingPlayer):
+		if self.winNum > 1 and self.threats:
+			# Find the spaces that would complete a window and can be played immediately
+			maxThreats = set()
+			minThreats = set()
+			for w in self.threats:
+				for row, column in self.windows[w]:
+					if row >= self.colFills[column]:
+						if row == self.colFills[column]:
+							if self.maxCounts[w] > 0:
+								maxThreats.add(column)
+							else:
+								minThreats.add(column)
+						break
+			if maxingPlayer:
+				if maxThreats:
+					return self.THREAT_SCORE
+				if len(minThreats) > 1:
+					return -self.THREAT_SCORE
+			else:
+				if minThreats:
+					return -self.THREAT_SCORE
+				if len(maxThreats) > 1:
+					return self.THREAT_SCORE
+		return self.total / self.scale
@@ -10,10 +10,15 @@ class Game:
 		self.player2 = player2
 		self.gameBoard = board.Board(rows, columns, winNum)
 		self.listOfPlayers = (cwPlayer, player2)
+		# The number of moves made so far
+		self.numMoves = 0
+		# The column played on each turn, or gameRecord.PASS (255) for a turn lost to an illegal move, so that the
+		# game can be saved with gameRecord.fromGame()
+		self.moves = bytearray()
 
     # Play the game itself, with or without alpha-beta pruning according to whether the pruning 
-    # argument is true or false respectively.
-	def playGame(self, pruning):
+    # argument is true or false respectively. If quiet is true nothing is printed.
+	def playGame(self, pruning, quiet=False):
 		# Keep track of whether the game is won or the board is full
 		won = False
 		full = False
@@ -23,7 +28,8 @@ class Game:
 		while not won and not full:
 			# Get the current player, and update the index
 			currPlayer = self.listOfPlayers[index]
-			print("Moving with player " + str(currPlayer.name))
+			if not quiet:
+				print("Moving with player " + str(currPlayer.name))
 
 			if index == 0 and pruning:
 				move = currPlayer.getMoveAlphaBeta(self.gameBoard.copy())
@@ -32,34 +38,47 @@ class Game:
 				
 			moveDone = self.gameBoard.addPiece(move, currPlayer.name)
 			if moveDone == True:
+				self.numMoves = self.numMoves + 1
+				self.moves.append(move)
 				won = self.gameBoard.checkWin()
 				full = self.gameBoard.checkFull()
 				# Uncomment the following line to print each move
-				self.gameBoard.printBoard()
+				if not quiet:
+					self.gameBoard.printBoard()
 			else:
-				print("Player made illegal move. Turn lost.")
+				self.moves.append(255)
+				if not quiet:
+					print("Player made illegal move. Turn lost.")
 
 			index = (index + 1) % 2
 
+		# Stop any player that is still searching on its opponent's time
+		for p in self.listOfPlayers:
+			if hasattr(p, "stopPonder"):
+				p.stopPonder()
+
 		if won and currPlayer == self.player1:
-			print("You Win!")
-			print("Nodes expanded:", self.player1.numExpanded)
-			print("Branches pruned:", self.player1.numPruned)
-			self.gameBoard.printBoard()
+			if not quiet:
+				print("You Win!")
+				print("Nodes expanded:", self.player1.numExpanded)
+				print("Branches pruned:", self.player1.numPruned)
+				self.gameBoard.printBoard()
 			return 1
 
 		if won and currPlayer == self.player2:
-			print("You Lose!")
-			print("Nodes expanded:", self.player1.numExpanded)
-			print("Branches pruned:", self.player1.numPruned)
-			self.gameBoard.printBoard()
+			if not quiet:
+				print("You Lose!")
+				print("Nodes expanded:", self.player1.numExpanded)
+				print("Branches pruned:", self.player1.numPruned)
+				self.gameBoard.printBoard()
 			return -1
 
 		if full and not won:
-			print("It's a Draw!")
-			print("Nodes expanded:", self.player1.numExpanded)
-			print("Branches pruned:", self.player1.numPruned)
-			self.gameBoard.printBoard()
+			if not quiet:
+				print("It's a Draw!")
+				print("Nodes expanded:", self.player1.numExpanded)
+				print("Branches pruned:", self.player1.numPruned)
+				self.gameBoard.printBoard()
 			return 0
 
 
@@ -0,0 +1,351 @@
+import argparse
+import concurrent.futures
+import json
+import math
+import os
+import random
+import struct
+import time
+import board
+import searchStats
+import strengthTest
+
+# A compact binary format for recording games, so that large numbers of them can be kept for offline analysis
+# and for building opening books.
+#
+# A record is a 9-byte header (the board size, the result, whether search statistics are included, and the
+# number of moves) followed by one byte per move: the column played, or PASS for a turn lost to an illegal move.
+# If statistics are included, the moves are followed by 12 bytes for each move: the nodes its search expanded, the
+# seconds it took and its score from the point of view of 'X' (NaN if unknown).
+#
+# Files are append-only and made of chunks: a chunk header (a magic number, the number of records and the size of
+# the payload) followed by the records. A RecordWriter collects records in memory until a chunk is full and then
+# appends the whole chunk, so memory use is bounded however many games are written, and a program that stops part
+# way through a write leaves at most a truncated chunk at the end of the file. A RecordWriter opening the file
+# again cuts off the truncated chunk before it appends, and readers skip it. Several files can be joined by
+# concatenating them; if a truncated chunk ends up in the middle, readers skip ahead to the next chunk header.
+#
+# readRecords() reads one chunk at a time and yields GameRecords; GameRecord.positions() replays a record on a
+# board.Board one move at a time, so only the game being looked at is ever held in memory.
+
+MAGIC = b"CNGR"
+CHUNK = struct.Struct("<4sII") # magic, number of records, payload size
+RECORD = struct.Struct("<BBBBBI") # rows, columns, winNum, result, flags, number of moves
+MOVE_STATS = struct.Struct("<Iff") # nodes expanded, seconds, score
+
+# Results
+DRAW = 0
+X_WIN = 1
+O_WIN = 2
+UNFINISHED = 3
+
+# Flags
+HAS_STATS = 1
+
+# The move byte for a turn lost to an illegal move
+PASS = 255
+
+
+class GameRecord:
+
+	# moves is a sequence of columns (or PASS), and stats is None or a list of (nodes, seconds, score) per move
+	def __init__(self, rows, columns, winNum, moves, result, stats=None):
+		self.numRows = rows
+		self.numColumns = columns
+		self.winNum = winNum
+		self.moves = bytes(moves)
+		self.result = result
+		self.stats = stats
+
+	# Return the record in the binary format
+	def pack(self):
+		flags = 0
+		if self.stats is not None:
+			flags = HAS_STATS
+		data = RECORD.pack(self.numRows, self.numColumns, self.winNum, self.result, flags, len(self.moves)) + self.moves
+		if self.stats is not None:
+			data = data + b"".join(MOVE_STATS.pack(*entry) for entry in self.stats)
+		return data
+
+	# Return the record starting at offset in data, and the offset of the record after it
+	@classmethod
+	def unpack(cls, data, offset):
+		rows, columns, winNum, result, flags, numMoves = RECORD.unpack_from(data, offset)
+		offset = offset + RECORD.size
+		moves = data[offset:offset + numMoves]
+		offset = offset + numMoves
+		stats = None
+		if flags & HAS_STATS:
+			stats = list(MOVE_STATS.iter_unpack(data[offset:offset + numMoves * MOVE_STATS.size]))
+			offset = offset + numMoves * MOVE_STATS.size
+		return cls(rows, columns, winNum, moves, result, stats), offset
+
+	# Replay the game, yielding (gameBoard, piece, move) before each move: the position, the player to move and the
+	# move they played. The same board is updated in place as the game goes on, so copy it to keep a position. Once
+	# the generator is finished the board holds the final position.
+	def positions(self, bitboard=False):
+		if bitboard:
+			gameBoard = board.BitBoard(self.numRows, self.numColumns, self.winNum)
+		else:
+			gameBoard = board.Board(self.numRows, self.numColumns, self.winNum)
+		piece = 'X'
+		for move in self.moves:
+			yield gameBoard, piece, move
+			if move != PASS:
+				gameBoard.addPiece(move, piece)
+			if piece == 'X':
+				piece = 'O'
+			else:
+				piece = 'X'
+
+
+# Appends records to a file in chunks of about chunkSize bytes
+class RecordWriter:
+
+	def __init__(self, path, chunkSize=1 << 16):
+		self.file = open(path, "ab")
+		try:
+			end = completeLength(path)
+		except ValueError:
+			self.file.close()
+			raise
+		if end < self.file.tell():
+			# Cut off a chunk left truncated by a program that stopped part way through a write
+			self.file.truncate(end)
+		self.chunkSize = chunkSize
+		self.buffer = bytearray()
+		self.numBuffered = 0
+		self.numWritten = 0 # Tracks the number of records written to the file
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		self.close()
+
+	def write(self, record):
+		self.buffer += record.pack()
+		self.numBuffered += 1
+		if len(self.buffer) >= self.chunkSize:
+			self.flush()
+
+	# Append the buffered records to the file as one chunk
+	def flush(self):
+		if self.numBuffered == 0:
+			return
+		self.file.write(CHUNK.pack(MAGIC, self.numBuffered, len(self.buffer)) + self.buffer)
+		self.file.flush()
+		self.numWritten += self.numBuffered
+		self.buffer = bytearray()
+		self.numBuffered = 0
+
+	def close(self):
+		self.flush()
+		self.file.close()
+
+
+# Return the length of the file without a truncated chunk at its end, following the chunk headers from the start.
+# If the file is damaged part way through and has chunks after the damage, it is left as it is, as readers skip
+# the damage. A file that is not a record file raises ValueError, so records are never appended to one.
+def completeLength(path):
+	with open(path, "rb") as f:
+		fileSize = os.fstat(f.fileno()).st_size
+		end = 0
+		while True:
+			header = f.read(CHUNK.size)
+			if len(header) < CHUNK.size:
+				if findChunk(f, end + 1) is not None:
+					return fileSize
+				return end
+			magic, numRecords, size = CHUNK.unpack(header)
+			if magic != MAGIC:
+				if end == 0:
+					raise ValueError(f"{path} is not a game record file")
+				return fileSize
+			if end + CHUNK.size + size > fileSize:
+				if findChunk(f, end + 1) is not None:
+					return fileSize
+				return end
+			end = end + CHUNK.size + size
+			f.seek(end)
+
+
+# Return the records of a chunk, or None if the payload does not hold exactly numRecords whole records
+def unpackChunk(payload, numRecords):
+	records = []
+	offset = 0
+	try:
+		for i in range(numRecords):
+			record, offset = GameRecord.unpack(payload, offset)
+			records.append(record)
+	except struct.error:
+		return None
+	if offset != len(payload):
+		return None
+	return records
+
+
+# Return the offset of the next chunk header at or after start, or None if there is none
+def findChunk(f, start):
+	while True:
+		f.seek(start)
+		data = f.read(1 << 16)
+		if len(data) < len(MAGIC):
+			return None
+		found = data.find(MAGIC)
+		if found >= 0:
+			return start + found
+		start = start + len(data) - len(MAGIC) + 1
+
+
+# Yield every record in the file, reading one chunk at a time. A truncated chunk is skipped: at the end of the file
+# it is ignored, and in the middle (when more chunks were appended after it) reading carries on from the next chunk
+# header after it.
+def readRecords(path):
+	with open(path, "rb") as f:
+		start = 0
+		while True:
+			f.seek(start)
+			header = f.read(CHUNK.size)
+			if len(header) < CHUNK.size:
+				return
+			magic, numRecords, size = CHUNK.unpack(header)
+			if magic != MAGIC:
+				raise ValueError(f"{path} is not a game record file")
+			payload = f.read(size)
+			records = None
+			if len(payload) == size:
+				records = unpackChunk(payload, numRecords)
+				following = f.read(len(MAGIC))
+				if following and following != MAGIC:
+					records = None
+			if records is None:
+				start = findChunk(f, start + 1)
+				if start is None:
+					return
+				continue
+			for record in records:
+				yield record
+			start = start + CHUNK.size + size
+
+
+# Record a game played by game.Game.playGame, which keeps its moves and returns its result for player 1 ('X')
+def fromGame(g, result):
+	gameBoard = g.gameBoard
+	if result == 1:
+		result = X_WIN
+	elif result == -1:
+		result = O_WIN
+	elif result == 0:
+		result = DRAW
+	else:
+		result = UNFINISHED
+	return GameRecord(gameBoard.numRows, gameBoard.numColumns, gameBoard.winNum, g.moves, result)
+
+
+# Play one self-play game from the opening between two Players with the given configuration (see
+# strengthTest.makePlayer), and return its record with the statistics of every searched move
+def selfPlayGame(config, opening, rows, columns, winNum, timeMs, seed):
+	random.seed(seed)
+	players = {}
+	for name in ('X', 'O'):
+		players[name] = strengthTest.makePlayer(config, name)
+		players[name].stats = searchStats.SearchStats()
+	gameBoard = board.Board(rows, columns, winNum)
+	moves = []
+	stats = []
+	piece = 'X'
+	for col in opening:
+		gameBoard.addPiece(col, piece)
+		moves.append(col)
+		stats.append((0, 0, math.nan))
+		if piece == 'X':
+			piece = 'O'
+		else:
+			piece = 'X'
+	result = UNFINISHED
+	try:
+		while result == UNFINISHED:
+			p = players[piece]
+			p.stats.reset()
+			start = time.perf_counter()
+			col = p.getMoveAlphaBeta(gameBoard.copy(), timeMs)
+			seconds = time.perf_counter() - start
+			score = math.nan
+			if p.stats.iterations:
+				# SearchStats gives scores from the point of view of 'X', whichever search was used
+				score = p.stats.iterations[-1]["score"]
+			stats.append((p.numExpandedPerMove, seconds, score))
+			if col is None or not gameBoard.addPiece(col, piece):
+				moves.append(PASS)
+			else:
+				moves.append(col)
+				if gameBoard.checkWin():
+					if piece == 'X':
+						result = X_WIN
+					else:
+						result = O_WIN
+				elif gameBoard.checkFull():
+					result = DRAW
+			if piece == 'X':
+				piece = 'O'
+			else:
+				piece = 'X'
+	finally:
+		# Stop any pondering, so no search keeps running in the worker after the game
+		for name in players:
+			players[name].stopPonder()
+	return GameRecord(rows, columns, winNum, moves, result, stats)
+
+# Play the given number of self-play games across a pool of processes and append their records to path as they finish. At most
+# a few games per worker are submitted ahead, so memory use does not grow with the number of games. Each game
+# starts from a random opening of the given number of plies. Returns the number of games written.
+def selfPlay(path, games, rows, columns, winNum, config=None, timeMs=50, plies=2, workers=None, seed=0, chunkSize=1 << 16):
+	if config is None:
+		config = {}
+	generator = random.Random(seed)
+	with RecordWriter(path, chunkSize) as writer, concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+		maxPending = (workers or os.cpu_count()) * 4
+		pending = set()
+		submitted = 0
+		while submitted < games or pending:
+			while submitted < games and len(pending) < maxPending:
+				opening = strengthTest.randomOpening(generator, rows, columns, winNum, plies)
+				pending.add(pool.submit(selfPlayGame, config, opening, rows, columns, winNum, timeMs, generator.getrandbits(32)))
+				submitted += 1
+			done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+			for future in done:
+				writer.write(future.result())
+	return writer.numWritten
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Generate or summarise files of game records.")
+	subparsers = parser.add_subparsers(dest="command", required=True)
+	generate = subparsers.add_parser("selfplay", help="append self-play games to a file")
+	generate.add_argument("path")
+	generate.add_argument("--games", type=int, default=1000)
+	generate.add_argument("--rows", type=int, default=6)
+	generate.add_argument("--columns", type=int, default=7)
+	generate.add_argument("--win", type=int, default=4)
+	generate.add_argument("--config", default="{}", help="Player attributes for both players, as JSON")
+	generate.add_argument("--time", type=int, default=50, help="milliseconds per move")
+	generate.add_argument("--plies", type=int, default=2, help="number of random moves in each opening")
+	generate.add_argument("--workers", type=int, default=None, help="number of processes (default: one per CPU)")
+	generate.add_argument("--seed", type=int, default=0)
+	summary = subparsers.add_parser("summary", help="count the games and results in a file")
+	summary.add_argument("path")
+	args = parser.parse_args()
+
+	if args.command == "selfplay":
+		start = time.perf_counter()
+		written = selfPlay(args.path, args.games, args.rows, args.columns, args.win, json.loads(args.config), args.time, args.plies, args.workers, args.seed)
+		print(f"Wrote {written} games in {time.perf_counter() - start:.1f}s")
+	else:
+		counts = [0, 0, 0, 0]
+		numMoves = 0
+		for record in readRecords(args.path):
+			counts[record.result] += 1
+			numMoves += len(record.moves)
+		games = sum(counts)
+		print(json.dumps({"games": games, "xWins": counts[X_WIN], "oWins": counts[O_WIN], "draws": counts[DRAW], "unfinished": counts[UNFINISHED], "averageMoves": numMoves / games if games else 0}))
@@ -0,0 +1,382 @@
+import argparse
+import asyncio
+import concurrent.futures
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+import board
+import player
+import sharedTable
+
+# A match server that hosts many games at once in a single process, against clients connecting over a local
+# socket (TCP or a Unix domain socket). The server keeps only a BitBoard and the list of moves for each game, so
+# thousands of games fit in the memory that one process per game would need for a few.
+#
+# The protocol is one JSON object per line in each direction. Requests have an "op" field:
+#   {"op": "new", "rows": 6, "columns": 7, "winNum": 4, "first": "client" or "server", "pruning": true, "timeMs": 500}
+#       Start a game (every field but "op" is optional). The server replies {"op": "started", ...} with the game's id
+#       and which piece the client plays, and moves first itself if "first" is "server".
+#   {"op": "move", "game": id, "column": c}
+#       Play a move for the client. The server replies {"op": "moved", ...} for the client's move and again for its
+#       own reply, each with the game's result so far.
+#   {"op": "state", "game": id}
+#       Reply with the game's moves, the player to move and its result.
+#   {"op": "close", "game": id}
+#       Abandon the game.
+# Finished games stop counting towards maxGames as soon as they end, but the last keepFinished of them are kept so
+# that their clients can still ask for their state.
+# Errors are reported as {"op": "error", "message": ...}. A game's "result" is None while it is in progress, and
+# then 'X', 'O' or "draw", with "reason" set to "line", "full" or "timeout".
+#
+# The server's own moves are searched in a pool of worker processes, so the event loop never waits on a search.
+# Searches use iterative deepening with a time budget of timeMs, and are abandoned (with the server playing the
+# middle-most legal column instead) if a result has not arrived after a further grace period. The budget and grace
+# period are counted from when a worker starts the search, which each worker reports through a queue, so a search
+# that waited in the pool's queue while the server was busy is not abandoned for it. A client that does not move
+# within moveTimeout seconds loses the game.
+
+# The Players used for searching in a worker process, indexed by name. They are kept between searches, so their
+# transposition tables carry over from one move (and game) to the next; hashes do not depend on the game.
+# If the server has a shared table, every worker's Players use it, so positions searched by one worker are not
+# searched again by the others.
+workerPlayers = {}
+workerTable = None
+workerStarts = None
+
+def initWorker(table, starts):
+	global workerTable, workerStarts
+	workerTable = table
+	workerStarts = starts
+
+# Search the position reached by playing the given moves from the empty board, in a worker process, and return
+# the column to play. The searchId is put on the server's queue when the search starts.
+def searchMove(rows, columns, winNum, moves, pruning, timeMs, searchId):
+	workerStarts.put(searchId)
+	if len(moves) % 2 == 0:
+		name = 'X'
+	else:
+		name = 'O'
+	if name not in workerPlayers:
+		p = player.Player(name)
+		p.transposition = True
+		if workerTable is not None:
+			p.table = workerTable
+		workerPlayers[name] = p
+	p = workerPlayers[name]
+	gameBoard = board.BitBoard(rows, columns, winNum)
+	for i in range(len(moves)):
+		if i % 2 == 0:
+			gameBoard.addPiece(moves[i], 'X')
+		else:
+			gameBoard.addPiece(moves[i], 'O')
+	if pruning:
+		return p.getMoveAlphaBeta(gameBoard, timeMs)
+	return p.getMove(gameBoard, timeMs)
+
+
+# A game being played on the server
+class Match:
+
+	def __init__(self, matchId, rows, columns, winNum, serverName, pruning, timeMs):
+		self.id = matchId
+		self.gameBoard = board.BitBoard(rows, columns, winNum)
+		self.moves = bytearray()
+		self.serverName = serverName
+		if serverName == 'X':
+			self.clientName = 'O'
+		else:
+			self.clientName = 'X'
+		self.pruning = pruning
+		self.timeMs = timeMs
+		self.result = None
+		self.reason = None
+		# The handle of the client's move timer, while the server is waiting for the client to move
+		self.timer = None
+		# The set of game ids owned by the client playing the game
+		self.owned = None
+
+	# The name of the player to move
+	def toMove(self):
+		if len(self.moves) % 2 == 0:
+			return 'X'
+		return 'O'
+
+	# Play the given column for the player to move, returning False if the move is illegal
+	def play(self, column):
+		if self.result is not None or not 0 <= column < self.gameBoard.numColumns:
+			return False
+		name = self.toMove()
+		if not self.gameBoard.addPiece(column, name):
+			return False
+		self.moves.append(column)
+		if self.gameBoard.checkWin():
+			self.finish(name, "line")
+		elif self.gameBoard.checkFull():
+			self.finish("draw", "full")
+		return True
+
+	def finish(self, result, reason):
+		self.result = result
+		self.reason = reason
+		if self.timer is not None:
+			self.timer.cancel()
+			self.timer = None
+
+	# Return the middle-most legal column, which is played if a search does not finish in time
+	def fallbackMove(self):
+		for col in board.columnOrder(self.gameBoard.numColumns):
+			if self.gameBoard.colFills[col] < self.gameBoard.numRows:
+				return col
+		return None
+
+	def state(self):
+		return {"game": self.id, "moves": list(self.moves), "toMove": self.toMove(), "result": self.result, "reason": self.reason}
+
+
+class GameServer:
+
+	# If tableSize is given, the workers share one sharedTable.SharedTranspositionTable of that many entries
+	def __init__(self, workers=None, moveTimeout=60.0, searchGrace=1.0, maxGames=10000, tableSize=None, keepFinished=1000):
+		self.table = None
+		if tableSize is not None:
+			self.table = sharedTable.SharedTranspositionTable(tableSize)
+			self.table.staleSearches = workers or os.cpu_count()
+		# The workers put the id of each search on this queue when they start it
+		self.starts = multiprocessing.SimpleQueue()
+		self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=initWorker, initargs=(self.table, self.starts))
+		self.moveTimeout = moveTimeout # Seconds a client has to make each move
+		self.searchGrace = searchGrace # Seconds a search may overrun its time budget before it is abandoned
+		self.maxGames = maxGames # The most games that can be in progress at once
+		self.keepFinished = keepFinished # The most finished games kept for "state" requests
+		self.matches = {} # Games in progress, indexed by id
+		self.finished = {} # Finished games, indexed by id, oldest first
+		self.ids = itertools.count(1)
+		# For each running search of the server's, a future set when a worker starts it, indexed by search id, and
+		# the thread that reads the queue of started searches
+		self.searches = {}
+		self.searchIds = itertools.count(1)
+		self.startReader = None
+		self.numFallbacks = 0 # Tracks the number of searches abandoned for fallbackMove()
+		# Running tasks for the server's moves, kept so that they are not garbage collected before they finish
+		self.tasks = set()
+
+	# Serve clients on a Unix domain socket at path if it is given, and otherwise on host and port
+	async def serve(self, host="127.0.0.1", port=8765, path=None):
+		# Allow for many clients connecting at once
+		if path is not None:
+			server = await asyncio.start_unix_server(self.handleClient, path, backlog=1024)
+		else:
+			server = await asyncio.start_server(self.handleClient, host, port, backlog=1024)
+		async with server:
+			await server.serve_forever()
+
+	# Read and answer requests from one client until it disconnects, then abandon its games
+	async def handleClient(self, reader, writer):
+		owned = set()
+
+		async def send(message):
+			if writer.is_closing():
+				return
+			writer.write(json.dumps(message).encode() + b"\n")
+			try:
+				await writer.drain()
+			except ConnectionError:
+				pass
+
+		try:
+			while True:
+				line = await reader.readline()
+				if not line:
+					break
+				try:
+					request = json.loads(line)
+				except ValueError:
+					await send({"op": "error", "message": "Requests must be JSON"})
+					continue
+				if not isinstance(request, dict):
+					await send({"op": "error", "message": "Requests must be JSON objects"})
+					continue
+				await self.handleRequest(request, owned, send)
+		except ConnectionError:
+			pass
+		finally:
+			for matchId in owned:
+				self.closeMatch(matchId)
+			writer.close()
+
+	async def handleRequest(self, request, owned, send):
+		op = request.get("op")
+		if op == "new":
+			if len(self.matches) >= self.maxGames:
+				await send({"op": "error", "message": "The server is full"})
+				return
+			try:
+				rows = int(request.get("rows", 6))
+				columns = int(request.get("columns", 7))
+				winNum = int(request.get("winNum", 4))
+				timeMs = int(request.get("timeMs", 500))
+			except (TypeError, ValueError):
+				await send({"op": "error", "message": "rows, columns, winNum and timeMs must be numbers"})
+				return
+			if rows < 1 or columns < 1 or winNum < 1 or rows > 16 or columns > 16 or timeMs < 1:
+				await send({"op": "error", "message": "Board size or time budget out of range"})
+				return
+			if request.get("first", "client") == "server":
+				serverName = 'X'
+			else:
+				serverName = 'O'
+			match = Match(next(self.ids), rows, columns, winNum, serverName, bool(request.get("pruning", True)), timeMs)
+			match.owned = owned
+			self.matches[match.id] = match
+			owned.add(match.id)
+			await send({"op": "started", "game": match.id, "client": match.clientName, "rows": rows, "columns": columns, "winNum": winNum})
+			self.nextTurn(match, send)
+			return
+
+		match = self.matches.get(request.get("game"))
+		if match is None:
+			match = self.finished.get(request.get("game"))
+		if match is None or match.id not in owned:
+			await send({"op": "error", "message": "No such game"})
+			return
+		if op == "move":
+			if match.result is not None or match.toMove() != match.clientName:
+				await send({"op": "error", "game": match.id, "message": "It is not your move"})
+				return
+			column = request.get("column")
+			if not isinstance(column, int) or not match.play(column):
+				await send({"op": "error", "game": match.id, "message": "Illegal move"})
+				return
+			if match.timer is not None:
+				match.timer.cancel()
+				match.timer = None
+			await send(self.moveMessage(match, match.clientName, column))
+			self.nextTurn(match, send)
+			self.retire(match)
+		elif op == "state":
+			message = match.state()
+			message["op"] = "state"
+			await send(message)
+		elif op == "close":
+			self.closeMatch(match.id)
+			owned.discard(match.id)
+			await send({"op": "closed", "game": match.id})
+		else:
+			await send({"op": "error", "message": f"Unknown op {op!r}"})
+
+	def moveMessage(self, match, name, column):
+		return {"op": "moved", "game": match.id, "player": name, "column": column, "result": match.result, "reason": match.reason}
+
+	# Start the server's search if it is the server's move, or the client's move timer if it is the client's
+	def nextTurn(self, match, send):
+		if match.result is not None:
+			return
+		if match.toMove() == match.serverName:
+			task = asyncio.create_task(self.serverMove(match, send))
+			self.tasks.add(task)
+			task.add_done_callback(self.tasks.discard)
+		else:
+			match.timer = asyncio.get_running_loop().call_later(self.moveTimeout, self.clientTimedOut, match, send)
+
+	async def serverMove(self, match, send):
+		loop = asyncio.get_running_loop()
+		self.readStarts(loop)
+		gameBoard = match.gameBoard
+		searchId = next(self.searchIds)
+		started = loop.create_future()
+		self.searches[searchId] = started
+		future = loop.run_in_executor(self.pool, searchMove, gameBoard.numRows, gameBoard.numColumns, gameBoard.winNum, bytes(match.moves), match.pruning, match.timeMs, searchId)
+		try:
+			# Only start the clock once a worker has taken the search from the queue
+			await asyncio.wait([started, future], return_when=asyncio.FIRST_COMPLETED)
+			column = await asyncio.wait_for(future, match.timeMs / 1000 + self.searchGrace)
+		except asyncio.TimeoutError:
+			self.numFallbacks += 1
+			column = match.fallbackMove()
+		finally:
+			self.searches.pop(searchId, None)
+		if match.id not in self.matches or match.result is not None:
+			return # The game was closed while the search was running
+		if column is None or not match.play(column):
+			column = match.fallbackMove()
+			match.play(column)
+		await send(self.moveMessage(match, match.serverName, column))
+		self.nextTurn(match, send)
+		self.retire(match)
+
+	# Start the thread that reads the queue of started searches, if it is not already running for this loop
+	def readStarts(self, loop):
+		if self.startReader is not None and self.startReader[0] is loop:
+			return
+		thread = threading.Thread(target=self.readStartsThread, args=(loop,), daemon=True)
+		self.startReader = (loop, thread)
+		thread.start()
+
+	def readStartsThread(self, loop):
+		while self.startReader is not None and self.startReader[0] is loop:
+			searchId = self.starts.get()
+			try:
+				loop.call_soon_threadsafe(self.searchStarted, searchId)
+			except RuntimeError:
+				# The loop has closed, so pass the id on to the reader of the loop now in use, if any
+				self.starts.put(searchId)
+				return
+
+	def searchStarted(self, searchId):
+		started = self.searches.get(searchId)
+		if started is not None and not started.done():
+			started.set_result(None)
+
+	# If the match has finished, stop counting it as in progress, keeping it among the finished games. The oldest
+	# finished games are dropped once there are more than keepFinished.
+	def retire(self, match):
+		if match.result is None or self.matches.pop(match.id, None) is None:
+			return
+		self.finished[match.id] = match
+		while len(self.finished) > self.keepFinished:
+			oldest = self.finished.pop(next(iter(self.finished)))
+			oldest.owned.discard(oldest.id)
+
+	def clientTimedOut(self, match, send):
+		match.timer = None
+		if match.result is None:
+			match.finish(match.serverName, "timeout")
+			self.retire(match)
+			task = asyncio.create_task(send({"op": "timeout", "game": match.id, "result": match.result, "reason": match.reason}))
+			self.tasks.add(task)
+			task.add_done_callback(self.tasks.discard)
+
+	def closeMatch(self, matchId):
+		match = self.matches.pop(matchId, None)
+		self.finished.pop(matchId, None)
+		if match is not None and match.timer is not None:
+			match.timer.cancel()
+			match.timer = None
+
+	def shutdown(self):
+		self.pool.shutdown(cancel_futures=True)
+		if self.table is not None:
+			self.table.close()
+			self.table.unlink()
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Host Connect-N games for clients over a local socket.")
+	parser.add_argument("--host", default="127.0.0.1")
+	parser.add_argument("--port", type=int, default=8765)
+	parser.add_argument("--unix", default=None, help="serve on this Unix domain socket instead of TCP")
+	parser.add_argument("--workers", type=int, default=None, help="number of search processes (default: one per CPU)")
+	parser.add_argument("--move-timeout", type=float, default=60.0, help="seconds a client has to make each move")
+	parser.add_argument("--max-games", type=int, default=10000)
+	parser.add_argument("--shared-table", type=int, default=None, metavar="ENTRIES", help="share one transposition table of this many entries between the search processes")
+	args = parser.parse_args()
+
+	gameServer = GameServer(args.workers, args.move_timeout, maxGames=args.max_games, tableSize=args.shared_table)
+	try:
+		asyncio.run(gameServer.serve(args.host, args.port, args.unix))
+	except KeyboardInterrupt:
+		pass
+	finally:
+		gameServer.shutdown()
@@ -0,0 +1,261 @@
+import concurrent.futures
+import math
+import random
+import time
+import board
+
+# A Monte Carlo tree search player, for boards too large for minimax to search deeply. Like RandomPlayer it can
+# play either side in game.Game.
+#
+# Each playout walks down the tree choosing children by UCT (average result plus an exploration term that favours
+# children visited less often than their siblings), adds one new child to the tree, then plays the game out to the
+# end with random moves. The result is added to every node on the path. The move played is the child of the root
+# visited most often.
+# By default playouts are not completely random: a player wins immediately if it can, and otherwise blocks an
+# immediate win for the opponent. This makes playout results much closer to real play at little cost.
+#
+# Playouts work directly on a pair of masks in the same layout as board.BitBoard (whose hasLine() is used to spot
+# wins), so no board objects are created during the search.
+#
+# The tree is kept between moves: when it is this player's turn again, the subtree for the move it played and
+# the opponent's reply becomes the new root, keeping its statistics.
+# With workers set to more than 1, the other workers each grow their own tree from the same position in a separate
+# process, and the visits and results for each move at the root are added together before choosing.
+
+# The worker pools, indexed by the number of workers
+pools = {}
+
+def getPool(workers):
+	if workers not in pools:
+		pools[workers] = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+	return pools[workers]
+
+
+class Node:
+	__slots__ = ("move", "parent", "children", "untried", "visits", "wins", "player", "winner")
+
+	# player is the index (0 for 'X', 1 for 'O') of the player who made move to reach this node, and winner is
+	# None while the game is in progress, then the index of the winner, or 2 for a draw
+	def __init__(self, move, parent, player, untried, winner):
+		self.move = move
+		self.parent = parent
+		self.children = []
+		self.untried = untried
+		self.visits = 0
+		self.wins = 0.0 # Results for player: 1 for a win and 0.5 for a draw
+		self.player = player
+		self.winner = winner
+
+
+class MCTSPlayer:
+
+	def __init__(self, name, seed=0):
+		self.name = name
+		self.randomGenerator = random.Random(seed)
+		self.playouts = 10000 # The number of playouts per move when no time budget is given
+		self.exploration = math.sqrt(2) # The UCT exploration constant. Larger values explore more widely.
+		self.heuristicPlayouts = True # Set to True/False to take and block immediate wins during playouts
+		self.reuseTree = True # Set to True/False to keep the search tree from one move to the next
+		self.workers = 1 # Set to more than 1 to grow that many trees in separate processes
+		self.numPlayouts = 0 # Tracks the number of playouts run
+		self.root = None # The root of the tree kept from the last move, and the masks of its position
+		self.rootMasks = None
+		self.lineBoard = None
+
+	# If timeMs is given, playouts are run until that many milliseconds have passed
+	def getMove(self, gameBoard, timeMs=None):
+		rows = gameBoard.numRows
+		columns = gameBoard.numColumns
+		if self.lineBoard is None or (self.lineBoard.numRows, self.lineBoard.numColumns, self.lineBoard.winNum) != (rows, columns, gameBoard.winNum):
+			self.lineBoard = board.BitBoard(rows, columns, gameBoard.winNum)
+			self.root = None
+		if isinstance(gameBoard, board.Board):
+			gameBoard = gameBoard.toBitBoard()
+		masks = [gameBoard.masks.get('X', 0), gameBoard.masks.get('O', 0)]
+		heights = list(gameBoard.colFills)
+		if self.name == 'X':
+			toMove = 0
+		else:
+			toMove = 1
+
+		root = self.findRoot(masks, heights)
+		if root is None:
+			root = Node(None, None, 1 - toMove, self.legalMoves(heights), None)
+
+		futures = []
+		if self.workers > 1:
+			pool = getPool(self.workers)
+			for i in range(self.workers - 1):
+				seed = self.randomGenerator.getrandbits(32)
+				futures.append(pool.submit(searchWorker, rows, columns, gameBoard.winNum, masks, heights, toMove, self.playouts, timeMs, seed, self.exploration, self.heuristicPlayouts))
+		self.search(root, masks, heights, toMove, self.playouts, timeMs)
+
+		# Add up the visits to each move at the root, across every tree
+		visits = {}
+		for child in root.children:
+			visits[child.move] = child.visits
+		for future in futures:
+			workerVisits, workerPlayouts = future.result()
+			self.numPlayouts += workerPlayouts
+			for move in workerVisits:
+				visits[move] = visits.get(move, 0) + workerVisits[move]
+		if not visits:
+			return self.legalMoves(heights)[0]
+		move = max(visits, key=lambda m: visits[m])
+
+		if self.reuseTree:
+			self.root = None
+			for child in root.children:
+				if child.move == move:
+					child.parent = None
+					self.root = child
+					self.rootMasks = list(masks)
+					self.rootMasks[toMove] = masks[toMove] | (1 << (move * self.lineBoard.colHeight + heights[move]))
+		return move
+
+	# MCTS does not use pruning, so the same method is used by game.Game whether or not pruning is asked for
+	def getMoveAlphaBeta(self, gameBoard, timeMs=None):
+		return self.getMove(gameBoard, timeMs)
+
+	# Return the node of the kept tree for the given position (the node for the move played last time followed by
+	# the opponent's reply), or None if there is no such node
+	def findRoot(self, masks, heights):
+		if self.root is None:
+			return None
+		root = self.root
+		self.root = None
+		for child in root.children:
+			column = child.move
+			if heights[column] == 0:
+				continue
+			childMasks = list(self.rootMasks)
+			# The reply was played on top of the pieces in its column, so its row is one below the current height
+			childMasks[child.player] = childMasks[child.player] | (1 << (column * self.lineBoard.colHeight + heights[column] - 1))
+			if childMasks == masks:
+				child.parent = None
+				return child
+		return None
+
+	def legalMoves(self, heights):
+		moves = []
+		for column in range(len(heights)):
+			if heights[column] < self.lineBoard.numRows:
+				moves.append(column)
+		return moves
+
+	# Run playouts from the root until the given number have been run, or until timeMs milliseconds have passed
+	def search(self, root, masks, heights, toMove, playouts, timeMs):
+		if timeMs is not None:
+			deadline = time.perf_counter() + timeMs / 1000
+		numSpaces = self.lineBoard.numRows * self.lineBoard.numColumns
+		rootPieces = sum(heights)
+		colHeight = self.lineBoard.colHeight
+		rng = self.randomGenerator
+		i = 0
+		while True:
+			if timeMs is None:
+				if i >= playouts:
+					break
+			elif i % 16 == 0 and time.perf_counter() > deadline:
+				break
+			i += 1
+
+			node = root
+			nodeMasks = list(masks)
+			nodeHeights = list(heights)
+			numPieces = rootPieces
+			# Selection: walk down through fully expanded nodes
+			while node.winner is None and not node.untried and node.children:
+				node = self.selectChild(node)
+				nodeMasks[node.player] |= 1 << (node.move * colHeight + nodeHeights[node.move])
+				nodeHeights[node.move] += 1
+				numPieces += 1
+
+			# Expansion: add one untried move as a new child
+			if node.winner is None and node.untried:
+				side = 1 - node.player
+				move = node.untried.pop(rng.randrange(len(node.untried)))
+				nodeMasks[side] |= 1 << (move * colHeight + nodeHeights[move])
+				nodeHeights[move] += 1
+				numPieces += 1
+				if self.lineBoard.hasLine(nodeMasks[side]):
+					child = Node(move, node, side, [], side)
+				elif numPieces == numSpaces:
+					child = Node(move, node, side, [], 2)
+				else:
+					child = Node(move, node, side, self.legalMoves(nodeHeights), None)
+				node.children.append(child)
+				node = child
+
+			# Simulation
+			if node.winner is None:
+				winner = self.playout(nodeMasks, nodeHeights, 1 - node.player, numPieces)
+			else:
+				winner = node.winner
+
+			# Backpropagation
+			while node is not None:
+				node.visits += 1
+				if winner == node.player:
+					node.wins += 1
+				elif winner == 2:
+					node.wins += 0.5
+				node = node.parent
+		self.numPlayouts += i
+
+	# Return the child with the highest UCT score
+	def selectChild(self, node):
+		logVisits = math.log(node.visits)
+		exploration = self.exploration
+		best = None
+		bestScore = -math.inf
+		for child in node.children:
+			score = child.wins / child.visits + exploration * math.sqrt(logVisits / child.visits)
+			if score > bestScore:
+				best = child
+				bestScore = score
+		return best
+
+	# Play the game out from the given position, with side to move, and return the index of the winner, or 2 for a
+	# draw. The masks and heights are changed.
+	def playout(self, masks, heights, side, numPieces):
+		rng = self.randomGenerator
+		hasLine = self.lineBoard.hasLine
+		colHeight = self.lineBoard.colHeight
+		numSpaces = self.lineBoard.numRows * self.lineBoard.numColumns
+		while numPieces < numSpaces:
+			moves = self.legalMoves(heights)
+			move = None
+			if self.heuristicPlayouts:
+				for column in moves:
+					if hasLine(masks[side] | (1 << (column * colHeight + heights[column]))):
+						return side
+				for column in moves:
+					if hasLine(masks[1 - side] | (1 << (column * colHeight + heights[column]))):
+						move = column
+						break
+			if move is None:
+				move = moves[rng.randrange(len(moves))]
+			masks[side] |= 1 << (move * colHeight + heights[move])
+			heights[move] += 1
+			numPieces += 1
+			# With heuristic playouts every winning move has already been found above
+			if not self.heuristicPlayouts and hasLine(masks[side]):
+				return side
+			side = 1 - side
+		return 2
+
+
+# Grow a tree from the given position in a worker process, returning the visits to each move at the root and the
+# number of playouts run
+def searchWorker(rows, columns, winNum, masks, heights, toMove, playouts, timeMs, seed, exploration, heuristicPlayouts):
+	p = MCTSPlayer('XO'[toMove], seed)
+	p.exploration = exploration
+	p.heuristicPlayouts = heuristicPlayouts
+	p.lineBoard = board.BitBoard(rows, columns, winNum)
+	root = Node(None, None, 1 - toMove, p.legalMoves(heights), None)
+	p.search(root, masks, heights, toMove, playouts, timeMs)
+	visits = {}
+	for child in root.children:
+		visits[child.move] = child.visits
+	return visits, p.numPlayouts
@@ -0,0 +1,137 @@
+import argparse
+import math
+import mmap
+import struct
+import board
+import player
+
+# An opening book holds the exact value and best move of every position reachable in the first few moves of a
+# game on one board size, so that those moves (which are the most expensive to search) can be played without
+# searching at all.
+#
+# The book is built once by solving each position with a full alpha-beta search and is written to a binary file:
+# a header giving the board size, the number of plies covered and the number of entries, followed by one
+# fixed-size record per position, sorted by key. A record holds the position's Zobrist hash, its value (1, 0 or -1
+# from the point of view of 'X') and the best move. Sizes and moves take 16 bits, so boards can be up to 65535
+# columns wide. Zobrist keys are generated from a fixed seed, so hashes are the
+# same in every process.
+# As in the transposition table, a position and its mirror image share the record stored under the smaller of
+# their two hashes, with the move reflected if that hash belongs to the mirror image.
+#
+# Books are memory-mapped rather than read, so loading is instant and processes using the same book share one
+# copy of it in memory. Positions are found by binary search over the records.
+
+MAGIC = b"CNB2"
+HEADER = struct.Struct("<4sHHHHI") # magic, rows, columns, winNum, plies, number of entries
+RECORD = struct.Struct("<QbH") # key, value, move
+
+
+# Return a dictionary of every non-terminal position reachable in at most plies moves, indexed by the smaller of
+# the position's hash and its mirror image's hash
+def reachablePositions(rows, columns, winNum, plies):
+	positions = {}
+	level = [board.BitBoard(rows, columns, winNum)]
+	for ply in range(plies + 1):
+		nextLevel = []
+		for gameBoard in level:
+			key = min(gameBoard.hash, gameBoard.mirrorHash)
+			if key in positions:
+				continue
+			positions[key] = gameBoard
+			if ply == plies:
+				continue
+			if ply % 2 == 0:
+				piece = 'X'
+			else:
+				piece = 'O'
+			for col in range(columns):
+				if gameBoard.colFills[col] < rows:
+					child = gameBoard.copy()
+					child.addPiece(col, piece)
+					if not child.checkWin() and not child.checkFull():
+						nextLevel.append(child)
+		level = nextLevel
+	return positions
+
+# Solve every position reachable in at most plies moves and write the book to path. Returns the number of entries.
+# All positions are solved by one Player, so its transposition table carries over from one position to the next.
+def buildBook(rows, columns, winNum, plies, path, tableSize=1 << 20):
+	solver = player.Player('X', tableSize)
+	solver.transposition = True
+	records = []
+	for key, gameBoard in reachablePositions(rows, columns, winNum, plies).items():
+		maxingPlayer = gameBoard.numPieces % 2 == 0
+		column, value = solver.minimaxAB(gameBoard, -1, maxingPlayer, -math.inf, math.inf)
+		if key != gameBoard.hash:
+			column = columns - 1 - column
+		records.append((key, value, column))
+	records.sort()
+
+	with open(path, "wb") as f:
+		f.write(HEADER.pack(MAGIC, rows, columns, winNum, plies, len(records)))
+		for record in records:
+			f.write(RECORD.pack(*record))
+	return len(records)
+
+
+class OpeningBook:
+
+	def __init__(self, path):
+		with open(path, "rb") as f:
+			self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		magic, self.numRows, self.numColumns, self.winNum, self.plies, self.numEntries = HEADER.unpack_from(self.data, 0)
+		if magic != MAGIC:
+			self.data.close()
+			raise ValueError(f"{path} is not an opening book")
+
+	def __len__(self):
+		return self.numEntries
+
+	# Return the entry for the given key as (value, move), or None if it is not in the book
+	def find(self, key):
+		low = 0
+		high = self.numEntries
+		while low < high:
+			middle = (low + high) // 2
+			entryKey, value, move = RECORD.unpack_from(self.data, HEADER.size + middle * RECORD.size)
+			if entryKey == key:
+				return value, move
+			if entryKey < key:
+				low = middle + 1
+			else:
+				high = middle
+		return None
+
+	# Return (move, value) for the given board, or None if the board is a different size or the position is not
+	# in the book
+	def lookup(self, gameBoard):
+		if gameBoard.numRows != self.numRows or gameBoard.numColumns != self.numColumns or gameBoard.winNum != self.winNum:
+			return None
+		if gameBoard.mirrorHash < gameBoard.hash:
+			entry = self.find(gameBoard.mirrorHash)
+			if entry is not None:
+				return self.numColumns - 1 - entry[1], entry[0]
+			return None
+		entry = self.find(gameBoard.hash)
+		if entry is not None:
+			return entry[1], entry[0]
+		return None
+
+	def close(self):
+		self.data.close()
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Solve the opening positions of a Connect-N board and write an opening book.")
+	parser.add_argument("--rows", type=int, default=3)
+	parser.add_argument("--columns", type=int, default=3)
+	parser.add_argument("--win", type=int, default=3)
+	parser.add_argument("--plies", type=int, default=4, help="number of moves from the start covered by the book")
+	parser.add_argument("--output", default=None, help="file to write (default: book-<rows>x<columns>-<win>.bin)")
+	args = parser.parse_args()
+
+	output = args.output
+	if output is None:
+		output = f"book-{args.rows}x{args.columns}-{args.win}.bin"
+	numEntries = buildBook(args.rows, args.columns, args.win, args.plies, output)
+	print(f"Wrote {numEntries} positions to {output}")
@@ -0,0 +1,184 @@
+import concurrent.futures
+import multiprocessing
+from multiprocessing import resource_tracker
+import math
+import player
+import sharedTable
+
+# Parallel root-split search. The children of the root are searched in separate processes, each with its own
+# Player, and the root picks the best of their results.
+#
+# With alpha-beta pruning the search follows the young-brothers-wait rule at the root: the eldest child (the first
+# in move order) is searched on its own first, so that its value can be used as a bound for all of the others.
+# The best exact value found so far, and the index of the child it belongs to, are kept in shared memory. Each
+# worker reads them when it starts a child and searches with a window that only admits values that would replace
+# the current best, so a child that cannot improve on the best fails low quickly.
+# A child earlier in move order than the current best would win a tie (the serial search keeps the first of equal
+# moves), so its window is opened by the smallest possible amount to let an equal value through. This means the
+# parallel search returns the same move as the serial search, whatever order the workers finish in.
+
+# The worker pools, indexed by the number of workers, and the shared best value and child index for each pool
+pools = {}
+sharedBests = {}
+
+# The shared best value and child index in a worker process, and the Player used for searching there
+workerBest = None
+workerPlayers = {}
+
+def initWorker(best):
+	global workerBest
+	workerBest = best
+
+# Return the pool with the given number of workers, creating it the first time it is needed
+def getPool(workers):
+	if workers not in pools:
+		# Start the resource tracker before the workers, so that they share it. Otherwise each worker starts its
+		# own, which removes any shared table the worker attached to when the worker exits.
+		resource_tracker.ensure_running()
+		sharedBests[workers] = multiprocessing.Array('d', 2)
+		pools[workers] = concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=initWorker, initargs=(sharedBests[workers],))
+	return pools[workers], sharedBests[workers]
+
+# Shut down every worker pool
+def shutdown():
+	for workers in pools:
+		pools[workers].shutdown()
+	pools.clear()
+	sharedBests.clear()
+
+# The Player attributes that change how a search is done, which are copied from the root player to the Player in
+# each worker. A new search option must be added here to take effect when workers is more than 1.
+SEARCH_SETTINGS = ("transposition", "symmetry", "bitboard", "evaluator", "threatPruning", "candidateColumns", "candidateDistance")
+
+# Return the settings the workers need to search like rootPlayer, as a dictionary
+def workerSettings(rootPlayer):
+	settings = {"name": rootPlayer.name, "tableSize": rootPlayer.table.size, "sharedName": None}
+	if isinstance(rootPlayer.table, sharedTable.SharedTranspositionTable):
+		settings["sharedName"] = rootPlayer.table.name
+	for attribute in SEARCH_SETTINGS:
+		settings[attribute] = getattr(rootPlayer, attribute)
+	return settings
+
+# Return the Player used by this worker process for the given settings. It is kept between searches, so its
+# transposition table carries over from one child to the next. If the root player's table is a
+# sharedTable.SharedTranspositionTable, the worker attaches to the same table, so every worker and the root share
+# their results.
+def getWorkerPlayer(settings):
+	key = tuple(sorted(settings.items()))
+	if key not in workerPlayers:
+		p = player.Player(settings["name"], settings["tableSize"])
+		for attribute in SEARCH_SETTINGS:
+			setattr(p, attribute, settings[attribute])
+		if settings["sharedName"] is not None:
+			p.table = sharedTable.SharedTranspositionTable(name=settings["sharedName"])
+		workerPlayers[key] = p
+	return workerPlayers[key]
+
+# Return True if value from the child at index should replace the current best
+def improves(value, index, bestValue, bestIndex, maxingPlayer):
+	if value == bestValue:
+		return index < bestIndex
+	if maxingPlayer:
+		return value > bestValue
+	return value < bestValue
+
+# Return the alpha-beta window for the child at index, given the current best value and child index
+def childWindow(index, bestValue, bestIndex, maxingPlayer):
+	if maxingPlayer:
+		if index < bestIndex:
+			return math.nextafter(bestValue, -math.inf), math.inf
+		return bestValue, math.inf
+	if index < bestIndex:
+		return -math.inf, math.nextafter(bestValue, math.inf)
+	return -math.inf, bestValue
+
+# Search the child of the root reached by playing col, in a worker process.
+# Returns the child's index, its value, whether that value is exact (rather than a bound that cannot improve on
+# the best), and the number of nodes expanded and branches pruned.
+def searchChild(gameBoard, index, col, depth, maxingPlayer, pruning, settings):
+	p = getWorkerPlayer(settings)
+	numExpanded = p.numExpanded
+	numPruned = p.numPruned
+	if maxingPlayer:
+		gameBoard.addPiece(col, 'X')
+	else:
+		gameBoard.addPiece(col, 'O')
+
+	if pruning:
+		with workerBest.get_lock():
+			bestValue = workerBest[0]
+			bestIndex = workerBest[1]
+		alpha, beta = childWindow(index, bestValue, bestIndex, maxingPlayer)
+		value = p.minimaxAB(gameBoard, depth, not maxingPlayer, alpha, beta)[1]
+		exact = alpha < value < beta
+		if exact:
+			with workerBest.get_lock():
+				if improves(value, index, workerBest[0], workerBest[1], maxingPlayer):
+					workerBest[0] = value
+					workerBest[1] = index
+	else:
+		value = p.minimax(gameBoard, depth, not maxingPlayer)[1]
+		exact = True
+
+	return index, value, exact, p.numExpanded - numExpanded, p.numPruned - numPruned
+
+# Search the root position with rootPlayer.workers processes, returning (column, score) like Player.minimax and
+# Player.minimaxAB. Node and pruning counts from the workers are added to rootPlayer's counters.
+def searchRoot(rootPlayer, gameBoard, depth, maxingPlayer, pruning):
+	if gameBoard.checkFull():
+		return None, 0
+
+	rootPlayer.numExpanded += 1
+	rootPlayer.numExpandedPerMove += 1
+	tableMove = None
+	if rootPlayer.transposition:
+		entry = rootPlayer.probeTable(gameBoard)
+		if entry is not None:
+			tableMove = entry[3]
+	# Narrow the moves with the same tactical pass as the serial search, so the same move is chosen
+	colOrder = rootPlayer.orderMoves(gameBoard, tableMove, None)
+	if rootPlayer.threatPruning:
+		win, colOrder = rootPlayer.tacticalMoves(gameBoard, colOrder, maxingPlayer, depth)
+		if win is not None:
+			return win, rootPlayer.winScore(depth, maxingPlayer)
+	colOrder = [col for col in colOrder if gameBoard.colFills[col] < gameBoard.numRows]
+	if depth > 0:
+		depth = depth - 1
+
+	if maxingPlayer:
+		piece = 'X'
+		bestValue = -math.inf
+	else:
+		piece = 'O'
+		bestValue = math.inf
+	bestIndex = len(colOrder)
+
+	pool, shared = getPool(rootPlayer.workers)
+	settings = workerSettings(rootPlayer)
+	start = 0
+	if pruning:
+		# Search the eldest child here first, to give the workers a bound
+		lastPlay = gameBoard.lastPlay
+		gameBoard.addPiece(colOrder[0], piece)
+		bestValue = rootPlayer.minimaxAB(gameBoard, depth, not maxingPlayer, -math.inf, math.inf)[1]
+		gameBoard.removePiece(colOrder[0])
+		gameBoard.lastPlay = lastPlay
+		bestIndex = 0
+		start = 1
+	shared[0] = bestValue
+	shared[1] = bestIndex
+
+	futures = []
+	for index in range(start, len(colOrder)):
+		futures.append(pool.submit(searchChild, gameBoard, index, colOrder[index], depth, maxingPlayer, pruning, settings))
+
+	for future in concurrent.futures.as_completed(futures):
+		index, value, exact, numExpanded, numPruned = future.result()
+		rootPlayer.numExpanded += numExpanded
+		rootPlayer.numExpandedPerMove += numExpanded
+		rootPlayer.numPruned += numPruned
+		if exact and improves(value, index, bestValue, bestIndex, maxingPlayer):
+			bestValue = value
+			bestIndex = index
+
+	return colOrder[bestIndex], bestValue
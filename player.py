@@ -1,6 +1,12 @@
 import board
 import random
 import math
+import time
+import threading
+import transpositionTable
+import evaluator
+import parallelSearch
+import candidateColumns
 
 # The aim of this coursework is to implement the minimax algorithm to determine the next move for a game of Connect.
 # The goal in Connect is for a player to create a line of the specified number of pieces, either horizontally, vertically or diagonally.
@@ -31,20 +37,89 @@ import math
 #
 # IMPORTANT: You MUST TRACK how many nodes you expand in your minimax and minimax with alpha-beta implementations.
 # IMPORTANT: In your minimax with alpha-beta implementation, when pruning you MUST TRACK the number of times you prune.
+
+# Raised inside the search when the time budget for a move runs out
+class SearchTimeout(Exception):
+	pass
+
 class Player:
 
-	def __init__(self, name):
+	def __init__(self, name, tableSize=1 << 18):
 		self.name = name
 		self.numExpanded = 0 # Use this to track the number of nodes you expand
 		self.numPruned = 0 # Use this to track the number of times you prune
 		self.iterative = False # Is set to True when running iterative deepening
 		self.numExpandedPerMove = 0 # Tracks the number of nodes expanded per move
 		self.transposition = False # Set to True/False to enable/disable transposition table caching
-		self.table = {} # Transposition table
+		self.table = transpositionTable.TranspositionTable(tableSize) # Transposition table, holding at most tableSize entries
 		self.cacheHits = 0 # Tracks the number of times the transposition table finds a match
+		self.symmetry = True # Set to True/False to share transposition table entries between a position and its mirror image
+		self.bitboard = True # Set to True/False to search on a board.BitBoard copy rather than the board given
+		self.nodeLimit = 10000 # Limit on the number of nodes expanded per move by iterative deepening without a time budget
+		self.deadline = None # The time.perf_counter() value at which a timed search is abandoned
+		self.ply = 0 # The number of moves made from the root of the current search
+		self.pv = () # Principal variation from the last completed iteration of iterative deepening, used for move ordering
+		self.followPV = False # True while the search is following the moves of self.pv from the root
+		self.pvTable = () # pvTable[ply] holds the best line found so far from the node at that ply
+		self.lastRoot = None # A copy of the root of the last search, used to recognise when a new root follows on from it
+		self.lastPV = () # The principal variation found by the last search from lastRoot
+		self.workers = 1 # Set to more than 1 to split untimed full searches at the root across that many processes (minimax and minimaxAB only: getMoveAlphaBeta raises ValueError with algorithm 'pvs')
+		self.evaluator = evaluator.WindowEvaluator # Class used to score positions at the depth limit (None scores them 0)
+		self.algorithm = 'minimax' # Set to 'pvs' for getMoveAlphaBeta to use principal variation search (negamax) instead of minimaxAB
+		self.killers = () # killers[ply] holds the two most recent moves that caused a cutoff at that ply
+		self.history = {} # history[player][row * numColumns + column] scores how often a move has caused cutoffs
+		self.threatPruning = True # Set to True/False to play immediate wins, force blocks and avoid moves under an opponent's win
+		self.candidateColumns = False # Set to True to only search columns near the pieces already played, for very wide boards
+		self.candidateDistance = 2 # How many columns either side of a piece count as near it (at least 1)
+		self.aspirationWindow = 0.01 # Half-width of the window around the previous iteration's score in iterative PVS
+		self.book = None # Set to an openingBook.OpeningBook to play positions in the book without searching
+		self.endgame = None # Set to an endgameTable.EndgameTable to play perfectly from the solved table without searching
+		self.bookHits = 0 # Tracks the number of moves taken from the opening book or endgame table
+		self.solver = None # Set to a proofSearch.ProofSolver to try proving the result of decisive-looking positions before searching
+		self.solveMs = 1000 # The longest time the solver may take for one move, in milliseconds
+		self.solveFraction = 0.5 # The largest fraction of a timed move's budget the solver may take
+		self.solveThreshold = 0.5 # Positions the evaluator scores at least this far from 0 look decisive
+		self.solveEmpty = 10 # Positions with at most this many empty spaces look decisive
+		self.numSolved = 0 # Tracks the number of moves proved by the solver
+		self.stats = None # Set to a searchStats.SearchStats to record detailed statistics about the search
+		self.ponder = False # Set to True/False to keep searching on the opponent's time (only useful with transposition set to True)
+		self.ponderMs = 60000 # The longest time to ponder for, in milliseconds
+		self.ponderThread = None # The thread searching on the opponent's time, while it is running
+		self.stopSearch = False # Set to True to make a search with a deadline stop as if it had run out of time
+		self.numPondered = 0 # Tracks the number of nodes expanded while pondering, which are not counted in numExpanded
+
+	# If timeMs is given, iterative deepening is run until that many milliseconds have passed.
+	# With pondering enabled, any pondering is stopped before searching, and started again after the move is chosen.
+	def getMove(self, gameBoard, timeMs=None):
+		self.stopPonder()
+		move = self.findMove(gameBoard, timeMs)
+		if self.ponder:
+			self.startPonder(gameBoard, move, False, timeMs)
+		return move
+
+	def getMoveAlphaBeta(self, gameBoard, timeMs=None):
+		self.stopPonder()
+		move = self.findMoveAlphaBeta(gameBoard, timeMs)
+		if self.ponder:
+			self.startPonder(gameBoard, move, True, timeMs)
+		return move
 
-	def getMove(self, gameBoard):
+	def findMove(self, gameBoard, timeMs=None):
 		self.numExpandedPerMove = 0
+		self.table.newSearch()
+		start = time.perf_counter()
+		move = self.knownMove(gameBoard, timeMs)
+		if move is not None:
+			return move
+		if timeMs is not None:
+			# The search gets whatever time the solver left
+			timeMs = timeMs - (time.perf_counter() - start) * 1000
+		if self.bitboard and isinstance(gameBoard, board.Board):
+			gameBoard = gameBoard.toBitBoard()
+		if timeMs is not None:
+			return self.minimaxIterative(gameBoard, self.name == 'X', timeMs)
+		if self.workers > 1:
+			return parallelSearch.searchRoot(self, gameBoard, -1, self.name == 'X', False)[0]
 		if self.name == 'X':
 			return self.minimax(gameBoard, -1, True)[0] # Set depth to -1 to run a full search (no depth cutoff)
 			#return self.minimaxIterative(gameBoard, True) # Uncomment this to run iterative deepening
@@ -52,8 +127,31 @@ class Player:
 			return self.minimax(gameBoard, -1, False)[0] # For player 2 minimax AI
 			# return self.minimaxIterative(gameBoard, False) # Uncomment this to run iterative deepening for player 2
 
-	def getMoveAlphaBeta(self, gameBoard):
+	def findMoveAlphaBeta(self, gameBoard, timeMs=None):
 		self.numExpandedPerMove = 0
+		self.table.newSearch()
+		start = time.perf_counter()
+		move = self.knownMove(gameBoard, timeMs)
+		if move is not None:
+			return move
+		if timeMs is not None:
+			# The search gets whatever time the solver left
+			timeMs = timeMs - (time.perf_counter() - start) * 1000
+		if self.bitboard and isinstance(gameBoard, board.Board):
+			gameBoard = gameBoard.toBitBoard()
+		if timeMs is not None:
+			if self.algorithm == 'pvs':
+				return self.pvsIterative(gameBoard, self.name == 'X', timeMs)
+			return self.minimaxABIterative(gameBoard, self.name == 'X', timeMs)
+		if self.workers > 1:
+			if self.algorithm == 'pvs':
+				raise ValueError("The parallel search does not run PVS: set workers to 1 or algorithm to 'minimax'")
+			return parallelSearch.searchRoot(self, gameBoard, -1, self.name == 'X', True)[0]
+		if self.algorithm == 'pvs':
+			self.startSearch(gameBoard, None)
+			column = self.negamax(gameBoard, -1, -math.inf, math.inf, self.name == 'X')[0]
+			self.lastPV = self.pvTable[0]
+			return column
 		if self.name == 'X':
 			return self.minimaxAB(gameBoard, -1, True, -math.inf, math.inf)[0] # Set depth to -1 to run a full search (no depth cutoff)
 			#return self.minimaxABIterative(gameBoard, True) # Uncomment this to run iterative deepening
@@ -61,14 +159,179 @@ class Player:
 			return self.minimaxAB(gameBoard, -1, False, -math.inf, math.inf)[0] # For player 2 minimaxAB AI
 			# return self.minimaxABIterative(gameBoard, False) # Uncomment this to run iterative deepening for player 2
 
-	def minimax(self, gameBoard, depth, maxingPlayer):
-		if self.transposition: # Check if transposition table is enabled
-			index = str(gameBoard.gameBoard)
-			if index in self.table: # Check if board state is in transposition table
-				self.cacheHits += 1
-				return self.table[index][0], self.table[index][1] # Return best move and score from table
+	# Pondering: after choosing a move, the position it leads to is searched in a background thread from the
+	# opponent's point of view, filling the transposition table while the opponent thinks. Their likely replies are
+	# searched first and deepest, so when the opponent's move arrives, the search for it finds much of its work
+	# already in the table. If the move was chosen by a timed search, pondering runs iterative deepening, whose
+	# depth-limited results the next timed search can reuse; otherwise it runs the same full search as getMove()
+	# would, since a full search can only reuse results of full searches.
+	# Pondering shares the interpreter with the rest of the process, so it is best used when the opponent is a
+	# person or runs in another process.
+	def startPonder(self, gameBoard, move, pruning, timeMs):
+		if move is None:
+			return
+		if self.bitboard and isinstance(gameBoard, board.Board):
+			ponderBoard = gameBoard.toBitBoard()
+		else:
+			ponderBoard = gameBoard.copy()
+		ponderBoard.addPiece(move, self.name)
+		if ponderBoard.checkWin() or ponderBoard.checkFull():
+			return
+		self.ponderCounters = (self.numExpanded, self.numPruned, self.cacheHits)
+		self.stopSearch = False
+		self.ponderThread = threading.Thread(target=self.ponderSearch, args=(ponderBoard, pruning, timeMs is not None), daemon=True)
+		self.ponderThread.start()
+
+	def ponderSearch(self, gameBoard, pruning, timed):
+		maxingPlayer = self.name != 'X'
+		self.numExpandedPerMove = 0
+		self.table.newSearch()
+		if timed:
+			if pruning and self.algorithm == 'pvs':
+				self.pvsIterative(gameBoard, maxingPlayer, self.ponderMs)
+			elif pruning:
+				self.minimaxABIterative(gameBoard, maxingPlayer, self.ponderMs)
+			else:
+				self.minimaxIterative(gameBoard, maxingPlayer, self.ponderMs)
+			return
+		self.startSearch(gameBoard, self.ponderMs)
+		try:
+			if pruning and self.algorithm == 'pvs':
+				self.negamax(gameBoard, -1, -math.inf, math.inf, maxingPlayer)
+			elif pruning:
+				self.minimaxAB(gameBoard, -1, maxingPlayer, -math.inf, math.inf)
+			else:
+				self.minimax(gameBoard, -1, maxingPlayer)
+		except SearchTimeout:
+			pass
+		self.ply = 0
+		self.deadline = None
+		# startSearch() made the pondered position the root the next search follows on from, and the killers are
+		# already relative to it, so keep its principal variation: the best line found so far if pondering was
+		# stopped, or the line carried over from the last search if the root was answered from the table.
+		self.lastPV = self.pvTable[0]
+		if not self.lastPV:
+			self.lastPV = self.pv
+
+	# Stop pondering, if it is running. Nodes expanded while pondering are moved from the usual counters to
+	# numPondered, so the counters only describe the searches for this player's moves.
+	def stopPonder(self):
+		if self.ponderThread is None:
+			return
+		self.stopSearch = True
+		self.ponderThread.join()
+		self.ponderThread = None
+		self.stopSearch = False
+		numExpanded, numPruned, cacheHits = self.ponderCounters
+		self.numPondered += self.numExpanded - numExpanded
+		self.numExpanded = numExpanded
+		self.numPruned = numPruned
+		self.cacheHits = cacheHits
+
+	# If gameBoard can be reached from the root of the last search by playing the first moves of its principal
+	# variation, return the number of moves played, and otherwise return None
+	def pvMovesPlayed(self, gameBoard):
+		lastRoot = self.lastRoot
+		if lastRoot is None or lastRoot.numRows != gameBoard.numRows or lastRoot.numColumns != gameBoard.numColumns or lastRoot.winNum != gameBoard.winNum:
+			return None
+		if len(self.killers) != gameBoard.numColumns * gameBoard.numRows + 2:
+			return None
+		played = sum(gameBoard.colFills) - sum(lastRoot.colFills)
+		if played < 0 or played > len(self.lastPV):
+			return None
+		if sum(lastRoot.colFills) % 2 == 0:
+			piece = 'X'
+		else:
+			piece = 'O'
+		root = lastRoot.copy()
+		for col in self.lastPV[:played]:
+			root.addPiece(col, piece)
+			if piece == 'X':
+				piece = 'O'
+			else:
+				piece = 'X'
+		if root.hash != gameBoard.hash:
+			return None
+		return played
 
-		if depth == 0 or gameBoard.checkWin(): # Check if win or reached depth limit
+	# Return the move for the position from the endgame table or the opening book, or proved by the solver, or None
+	# if none of them has one. The solver is only tried on positions that look decisive, and its move is only used
+	# if it proves a win or a draw; for a proved loss the search chooses how to resist. It may take up to solveMs, or
+	# solveFraction of timeMs if that is less.
+	def knownMove(self, gameBoard, timeMs=None):
+		move = None
+		if self.endgame is not None:
+			move = self.endgame.bestMove(gameBoard)
+		if move is None and self.book is not None:
+			entry = self.book.lookup(gameBoard)
+			if entry is not None:
+				move = entry[0]
+		if move is not None:
+			self.bookHits += 1
+			return move
+		if self.solver is not None and self.looksDecisive(gameBoard):
+			solveMs = self.solveMs
+			if timeMs is not None:
+				solveMs = min(solveMs, timeMs * self.solveFraction)
+			result = self.solver.solve(gameBoard, solveMs)
+			if result is not None and result[1] is not None:
+				self.numSolved += 1
+				return result[1]
+		return None
+
+	# A position looks decisive if the evaluator scores it far from even (as it does when a player has an immediate
+	# threat), or if the game is nearly over
+	def looksDecisive(self, gameBoard):
+		if gameBoard.numRows * gameBoard.numColumns - sum(gameBoard.colFills) <= self.solveEmpty:
+			return True
+		return abs(self.evaluate(gameBoard, self.name == 'X')) >= self.solveThreshold
+
+	# The depth a stored entry must have been searched to in order to be reused at the given depth.
+	# A full search (depth -1) can only reuse entries that were also searched fully.
+	def tableDepth(self, depth):
+		if depth < 0:
+			return math.inf
+		return depth
+
+	# Win and loss scores in a depth-limited search depend on the remaining depth, so a value stored by a deeper
+	# search is shifted back to the depth being searched now (but never past the smallest win or loss score).
+	def tableValue(self, value, entryDepth, depth):
+		if depth < 0:
+			return value
+		if value >= 1:
+			return max(1, value - (entryDepth - depth))
+		if value <= -1:
+			return min(-1, value + (entryDepth - depth))
+		return value
+
+	# Return the heuristic score of a position at the depth limit. The evaluator is attached to the board the first
+	# time it is needed, after which the board keeps it up to date as pieces are added and removed.
+	def evaluate(self, gameBoard, maxingPlayer):
+		if self.evaluator is None:
+			return 0
+		if type(gameBoard.evaluator) is not self.evaluator:
+			gameBoard.evaluator = self.evaluator(gameBoard)
+		return gameBoard.evaluator.score(maxingPlayer)
+
+	# A position and its mirror image (reflected about the centre column) have the same value, so when symmetry
+	# is enabled both are stored under the smaller of their two hashes. If that hash belongs to the reflection,
+	# the best move is reflected when it is stored and reflected back when it is looked up.
+	def probeTable(self, gameBoard):
+		if self.symmetry and gameBoard.mirrorHash < gameBoard.hash:
+			entry = self.table.probe(gameBoard.mirrorHash)
+			if entry is not None and entry[3] is not None:
+				return entry[0], entry[1], entry[2], gameBoard.numColumns - 1 - entry[3]
+			return entry
+		return self.table.probe(gameBoard.hash)
+
+	def storeTable(self, gameBoard, value, depth, flag, column):
+		if self.symmetry and gameBoard.mirrorHash < gameBoard.hash:
+			self.table.store(gameBoard.mirrorHash, value, self.tableDepth(depth), flag, gameBoard.numColumns - 1 - column)
+		else:
+			self.table.store(gameBoard.hash, value, self.tableDepth(depth), flag, column)
+
+	def minimax(self, gameBoard, depth, maxingPlayer):
+		if gameBoard.checkWin(): # Check if the last move won
 			if gameBoard.lastPlay[2] == 'X': # Check if maximising player won
 				if depth < 1:
 					return None, 1 # Return 1 for maximising player (no depth limit)
@@ -81,14 +344,28 @@ class Player:
 					return None, -1 - depth # Lower score for shallower depths to encourage faster wins for minimising player
 		if gameBoard.checkFull():
 			return None, 0
+		if depth == 0: # Reached the depth limit, so estimate the value of the position
+			return None, self.evaluate(gameBoard, maxingPlayer)
+
+		if self.transposition: # Check if transposition table is enabled
+			entry = self.probeTable(gameBoard)
+			if entry is not None and entry[1] >= self.tableDepth(depth): # Only reuse results searched at least as deep
+				self.cacheHits += 1
+				return entry[3], self.tableValue(entry[0], entry[1], depth) # Return best move and score from table
+			searchedDepth = depth
 
 		self.numExpanded += 1
 		self.numExpandedPerMove += 1
+		if self.stats is not None:
+			self.stats.node(self.ply)
+		self.checkTime()
 		maxCol = gameBoard.numColumns
 		maxRow = gameBoard.numRows
-		colOrder = []
-		for i in range(maxCol):
-			colOrder.append(math.ceil(maxCol // 2 + (1 - 2 * (i % 2)) * (i + 1) // 2)) # Order columns by middle first, then alternate
+		colOrder = self.orderMoves(gameBoard, None, None) # Order columns by middle first, then alternate
+		if self.threatPruning:
+			win, colOrder = self.tacticalMoves(gameBoard, colOrder, maxingPlayer, depth)
+			if win is not None:
+				return win, self.winScore(depth, maxingPlayer)
 		if depth > 0:
 			depth = depth - 1
 
@@ -97,38 +374,44 @@ class Player:
 			column = random.randint(0, maxCol - 1)
 			for col in colOrder:
 				if gameBoard.colFills[col] < maxRow:
-					temp = gameBoard.copy()
-					temp.addPiece(col, 'X')
-					eval = self.minimax(temp, depth, False)[1]
+					# Search the move in place rather than on a copy: play it, search, then take it back.
+					# removePiece() marks lastPlay as empty, so the previous lastPlay is restored afterwards.
+					lastPlay = gameBoard.lastPlay
+					gameBoard.addPiece(col, 'X')
+					self.ply += 1
+					eval = self.minimax(gameBoard, depth, False)[1]
+					self.ply -= 1
+					gameBoard.removePiece(col)
+					gameBoard.lastPlay = lastPlay
 					if eval > maxEval:
 						column = col
 						maxEval = eval
 			if self.transposition:
-				self.table[index] = [column, maxEval] # Add board state with best move and score to transposition table
+				self.storeTable(gameBoard, maxEval, searchedDepth, transpositionTable.EXACT, column) # Add board state with best move and score to transposition table
 			return column, maxEval
 		else:
 			minEval = math.inf
 			column = random.randint(0, maxCol - 1)
 			for col in colOrder:
 				if gameBoard.colFills[col] < maxRow:
-					temp = gameBoard.copy()
-					temp.addPiece(col, 'O')
-					eval = self.minimax(temp, depth, True)[1]
+					lastPlay = gameBoard.lastPlay
+					gameBoard.addPiece(col, 'O')
+					self.ply += 1
+					eval = self.minimax(gameBoard, depth, True)[1]
+					self.ply -= 1
+					gameBoard.removePiece(col)
+					gameBoard.lastPlay = lastPlay
 					if eval < minEval:
 						column = col
 						minEval = eval
 			if self.transposition:
-				self.table[index] = [column, minEval]
+				self.storeTable(gameBoard, minEval, searchedDepth, transpositionTable.EXACT, column)
 			return column, minEval
 
 	def minimaxAB(self, gameBoard, depth, maxingPlayer, alpha, beta):
-		if self.transposition:
-			index = str(gameBoard.gameBoard)
-			if index in self.table:
-				self.cacheHits += 1
-				return self.table[index][0], self.table[index][1]
-
-		if depth == 0 or gameBoard.checkWin(): # Check if win or reached depth limit
+		if self.ply < len(self.pvTable):
+			self.pvTable[self.ply] = ()
+		if gameBoard.checkWin(): # Check if the last move won
 			if gameBoard.lastPlay[2] == 'X': # Check if maximising player won
 				if depth < 1:
 					return None, 1 # Return 1 for maximising player (no depth limit)
@@ -142,72 +425,634 @@ class Player:
 
 		if gameBoard.checkFull():
 			return None, 0
+		if depth == 0:
+			return None, self.evaluate(gameBoard, maxingPlayer)
+
+		# The table may hold an exact value or only a bound. Bounds narrow the window, and if the window closes
+		# the stored value is enough to decide this node. Otherwise the stored best move is searched first.
+		tableMove = None
+		if self.transposition:
+			entry = self.probeTable(gameBoard)
+			if entry is not None:
+				tableMove = entry[3]
+				if entry[1] >= self.tableDepth(depth):
+					value = self.tableValue(entry[0], entry[1], depth)
+					if entry[2] == transpositionTable.EXACT:
+						self.cacheHits += 1
+						return tableMove, value
+					if entry[2] == transpositionTable.LOWER:
+						alpha = max(alpha, value)
+					else:
+						beta = min(beta, value)
+					if beta <= alpha:
+						self.cacheHits += 1
+						return tableMove, value
+			# The result is flagged against the window actually searched, after any narrowing
+			windowAlpha = alpha
+			windowBeta = beta
+			searchedDepth = depth
 
 		self.numExpanded += 1
 		self.numExpandedPerMove += 1
+		if self.stats is not None:
+			self.stats.node(self.ply)
+		self.checkTime()
 		maxCol = gameBoard.numColumns
 		maxRow = gameBoard.numRows
-		colOrder = []
-		for i in range(maxCol):
-				colOrder.append(math.ceil(maxCol // 2 + (1 - 2 * (i % 2)) * (i + 1) // 2))
+		onPV = self.followPV
+		pvMove = None
+		if onPV and self.ply < len(self.pv):
+			pvMove = self.pv[self.ply]
+		colOrder = self.orderMoves(gameBoard, tableMove, pvMove)
+		if self.threatPruning:
+			win, colOrder = self.tacticalMoves(gameBoard, colOrder, maxingPlayer, depth)
+			if win is not None:
+				return win, self.winScore(depth, maxingPlayer)
 		if depth > 0:
 				depth = depth - 1
 
 		if maxingPlayer:
 			maxEval = -math.inf
 			column = random.randint(0, maxCol - 1)
+			first = True
 			for col in colOrder:
 				if gameBoard.colFills[col] < maxRow:
-					temp = gameBoard.copy()
-					temp.addPiece(col, 'X')
-					eval = self.minimaxAB(temp, depth, False, alpha, beta)[1]
+					lastPlay = gameBoard.lastPlay
+					gameBoard.addPiece(col, 'X')
+					self.followPV = onPV and col == pvMove
+					self.ply += 1
+					eval = self.minimaxAB(gameBoard, depth, False, alpha, beta)[1]
+					self.ply -= 1
+					gameBoard.removePiece(col)
+					gameBoard.lastPlay = lastPlay
 					if eval > maxEval:
 						column = col
 						maxEval = eval
+						self.updatePV(col)
 					alpha = max(alpha, maxEval)
 					if beta <= alpha:
+						if self.stats is not None:
+							self.stats.cutoff(first)
 						self.numPruned += 1
 						break
+					first = False
 			if self.transposition:
-				self.table[index] = [column, maxEval]
+				self.storeBound(gameBoard, maxEval, searchedDepth, windowAlpha, windowBeta, column)
 			return column, maxEval
 		else:
 			minEval = math.inf
 			column = random.randint(0, maxCol - 1)
+			first = True
 			for col in colOrder:
 				if gameBoard.colFills[col] < maxRow:
-					temp = gameBoard.copy()
-					temp.addPiece(col, 'O')
-					eval = self.minimaxAB(temp, depth, True, alpha, beta)[1]
+					lastPlay = gameBoard.lastPlay
+					gameBoard.addPiece(col, 'O')
+					self.followPV = onPV and col == pvMove
+					self.ply += 1
+					eval = self.minimaxAB(gameBoard, depth, True, alpha, beta)[1]
+					self.ply -= 1
+					gameBoard.removePiece(col)
+					gameBoard.lastPlay = lastPlay
 					if eval < minEval:
 						column = col
 						minEval = eval
+						self.updatePV(col)
 					beta = min(beta, minEval)
 					if beta <= alpha:
+						if self.stats is not None:
+							self.stats.cutoff(first)
 						self.numPruned += 1
 						break
+					first = False
 			if self.transposition:
-				self.table[index] = [column, minEval]
+				self.storeBound(gameBoard, minEval, searchedDepth, windowAlpha, windowBeta, column)
 			return column, minEval
 
-	def minimaxIterative(self, gameBoard, maxingPlayer):
+	# Return the columns in the order they should be searched: the move from the previous iteration's principal
+	# variation first, then the best move stored in the transposition table, then the rest from the middle outwards.
+	# With candidateColumns set, the rest are only the columns near pieces already played (see candidateColumns.py).
+	def orderMoves(self, gameBoard, tableMove, pvMove):
+		if self.candidateColumns:
+			candidates = gameBoard.candidates
+			if candidates is None or candidates.distance != self.candidateDistance:
+				candidates = candidateColumns.CandidateColumns(gameBoard, self.candidateDistance)
+				gameBoard.candidates = candidates
+			colOrder = candidates.ordered(gameBoard)
+		else:
+			colOrder = list(board.columnOrder(gameBoard.numColumns))
+		if tableMove is not None:
+			if tableMove in colOrder:
+				colOrder.remove(tableMove)
+			colOrder.insert(0, tableMove)
+		if pvMove is not None and pvMove != tableMove:
+			if pvMove in colOrder:
+				colOrder.remove(pvMove)
+			colOrder.insert(0, pvMove)
+		return colOrder
+
+	# Record that col is the best move found so far at the current ply, followed by the best line from the child
+	def updatePV(self, col):
+		if self.ply + 1 < len(self.pvTable):
+			self.pvTable[self.ply] = (col,) + self.pvTable[self.ply + 1]
+
+	# Abandon the search if the deadline has passed. The clock is only read every 256 nodes to keep this cheap.
+	def checkTime(self):
+		if self.deadline is not None and self.numExpandedPerMove % 256 == 0 and (self.stopSearch or time.perf_counter() > self.deadline):
+			raise SearchTimeout()
+
+	# Return the first column that is not full, searching from the middle outwards. This is the move played if
+	# a timed search runs out of time before completing its first iteration.
+	def firstLegalMove(self, gameBoard):
+		for col in self.orderMoves(gameBoard, None, None):
+			if gameBoard.colFills[col] < gameBoard.numRows:
+				return col
+		return None
+
+	# The score of a node searched to the given depth where the player to move wins with their next move, from the
+	# point of view of 'X'. This is the score the search would give the winning child.
+	def winScore(self, depth, maxingPlayer):
+		if depth > 0:
+			depth = depth - 1
+		if depth < 1:
+			score = 1
+		else:
+			score = 1 + depth
+		if maxingPlayer:
+			return score
+		return -score
+
+	# A tactical pass run before searching the children of a node. It returns (column, colOrder):
+	# - If the player to move can win immediately, column is the first winning move in colOrder.
+	# - Otherwise, if the opponent could win immediately, colOrder is cut down to the first column that blocks it
+	#   (if there is more than one such column the game is lost whichever is played, so one is enough).
+	# - Otherwise, moves that would let the opponent win by playing directly on top are dropped, unless every
+	#   move would.
+	# Each of these gives the same score as searching every child, as long as the search can see the opponent's
+	# reply; with less than two plies left the children are scored by the evaluator instead, so only immediate
+	# wins are used.
+	def tacticalMoves(self, gameBoard, colOrder, maxingPlayer, depth):
+		if maxingPlayer:
+			piece = 'X'
+			opponent = 'O'
+		else:
+			piece = 'O'
+			opponent = 'X'
+		wins = gameBoard.threatColumns(piece)[0]
+		if wins:
+			for col in colOrder:
+				if col in wins:
+					return col, colOrder
+		if depth == 1:
+			return None, colOrder
+
+		oppWins, oppAbove = gameBoard.threatColumns(opponent)
+		if oppWins:
+			for col in colOrder:
+				if col in oppWins:
+					return None, [col]
+		if oppAbove:
+			safe = []
+			for col in colOrder:
+				if col not in oppAbove and gameBoard.colFills[col] < gameBoard.numRows:
+					safe.append(col)
+			if safe:
+				return None, safe
+		return None, colOrder
+
+	# Store an alpha-beta result, flagged by whether it fell inside the window the node was searched with
+	def storeBound(self, gameBoard, value, depth, alpha, beta, column):
+		if value <= alpha:
+			flag = transpositionTable.UPPER
+		elif value >= beta:
+			flag = transpositionTable.LOWER
+		else:
+			flag = transpositionTable.EXACT
+		self.storeTable(gameBoard, value, depth, flag, column)
+
+	# Principal variation search, written in negamax form: scores are from the point of view of the player to move
+	# (maxingPlayer is True when that is 'X'), and each child's score is the negation of its score for the opponent.
+	# Depths, win scores and the transposition table work as in minimaxAB, and table entries are shared with it
+	# (they are converted to and from the 'X' point of view).
+	#
+	# Only the first child is searched with the full window. Each later child is first searched with a null window
+	# just above alpha, which only proves whether it is better than the best move so far; if it is, it is searched
+	# again with the full window. With good move ordering most null-window searches fail low quickly.
+	# Moves are ordered by: the previous iteration's principal variation, the table move, then by the history table,
+	# with the two killer moves for this ply (recent moves that caused a cutoff in a sibling position) placed
+	# straight after the first move. Killers are not searched first because, unlike the history table, they ignore
+	# which row the piece lands in, and searching them ahead of the best history move was found to cost nodes.
+	# Every window is also narrowed to the best and worst scores still possible (see below).
+	def negamax(self, gameBoard, depth, alpha, beta, maxingPlayer):
+		if self.ply < len(self.pvTable):
+			self.pvTable[self.ply] = ()
+		if gameBoard.checkWin(): # The last move won, so the player to move has lost
+			if depth < 1:
+				return None, -1
+			return None, -1 - depth
+		if gameBoard.checkFull():
+			return None, 0
+
+		if maxingPlayer:
+			piece = 'X'
+			sign = 1
+		else:
+			piece = 'O'
+			sign = -1
+		if depth == 0:
+			return None, sign * self.evaluate(gameBoard, maxingPlayer)
+
+		# No score can be better than winning with the next move, or worse than losing on the move after, so the
+		# window is narrowed to those limits. In a full search this means finding a win ends the search of a node.
+		if depth < 0:
+			bound = 1
+		else:
+			bound = max(1, depth)
+		if beta > bound:
+			beta = bound
+			if alpha >= beta:
+				return None, beta
+		if alpha < -bound:
+			alpha = -bound
+			if alpha >= beta:
+				return None, alpha
+
+		tableMove = None
+		if self.transposition:
+			entry = self.probeTable(gameBoard)
+			if entry is not None:
+				tableMove = entry[3]
+				if entry[1] >= self.tableDepth(depth):
+					value = sign * self.tableValue(entry[0], entry[1], depth)
+					flag = entry[2]
+					if sign < 0 and flag != transpositionTable.EXACT: # A lower bound for 'X' is an upper bound for 'O'
+						flag = transpositionTable.LOWER + transpositionTable.UPPER - flag
+					if flag == transpositionTable.EXACT:
+						self.cacheHits += 1
+						return tableMove, value
+					if flag == transpositionTable.LOWER:
+						alpha = max(alpha, value)
+					else:
+						beta = min(beta, value)
+					if beta <= alpha:
+						self.cacheHits += 1
+						return tableMove, value
+		windowAlpha = alpha
+		windowBeta = beta
+
+		self.numExpanded += 1
+		self.numExpandedPerMove += 1
+		if self.stats is not None:
+			self.stats.node(self.ply)
+		self.checkTime()
+		maxRow = gameBoard.numRows
+		onPV = self.followPV
+		pvMove = None
+		if onPV and self.ply < len(self.pv):
+			pvMove = self.pv[self.ply]
+		colOrder = self.orderMovesPVS(gameBoard, tableMove, pvMove, piece)
+		if self.threatPruning:
+			win, colOrder = self.tacticalMoves(gameBoard, colOrder, maxingPlayer, depth)
+			if win is not None:
+				return win, self.winScore(depth, True)
+		searchedDepth = depth
+		if depth > 0:
+			depth = depth - 1
+
+		bestEval = -math.inf
+		column = None
+		first = True
+		for col in colOrder:
+			if gameBoard.colFills[col] < maxRow:
+				lastPlay = gameBoard.lastPlay
+				gameBoard.addPiece(col, piece)
+				self.followPV = onPV and col == pvMove
+				self.ply += 1
+				if first:
+					eval = -self.negamax(gameBoard, depth, -beta, -alpha, not maxingPlayer)[1]
+				else:
+					eval = -self.negamax(gameBoard, depth, -math.nextafter(alpha, math.inf), -alpha, not maxingPlayer)[1]
+					if alpha < eval < beta: # The null window failed high, so search again to find the exact value
+						eval = -self.negamax(gameBoard, depth, -beta, -alpha, not maxingPlayer)[1]
+				self.ply -= 1
+				gameBoard.removePiece(col)
+				gameBoard.lastPlay = lastPlay
+				if eval > bestEval:
+					column = col
+					bestEval = eval
+					self.updatePV(col)
+					alpha = max(alpha, bestEval)
+					if beta <= alpha:
+						if self.stats is not None:
+							self.stats.cutoff(first)
+						self.numPruned += 1
+						self.recordCutoff(gameBoard, col, piece, searchedDepth)
+						break
+				first = False
+
+		if self.transposition:
+			if sign > 0:
+				self.storeBound(gameBoard, bestEval, searchedDepth, windowAlpha, windowBeta, column)
+			else:
+				self.storeBound(gameBoard, -bestEval, searchedDepth, -windowBeta, -windowAlpha, column)
+		return column, bestEval
+
+	# Order moves for negamax: see the comment above negamax()
+	def orderMovesPVS(self, gameBoard, tableMove, pvMove, piece):
+		colOrder = self.orderMoves(gameBoard, None, None)
+		history = self.history.get(piece)
+		if history is not None:
+			# Python's sort is stable, so moves with equal history scores stay in middle-first order
+			numColumns = gameBoard.numColumns
+			colFills = gameBoard.colFills
+			colOrder.sort(key=lambda col: -history[colFills[col] * numColumns + col])
+		if self.ply < len(self.killers):
+			for killer in reversed(self.killers[self.ply]):
+				if killer is not None and killer != colOrder[0] and killer in colOrder:
+					colOrder.remove(killer)
+					colOrder.insert(1, killer)
+		for move in (tableMove, pvMove):
+			if move is not None:
+				if move in colOrder:
+					colOrder.remove(move)
+				colOrder.insert(0, move)
+		return colOrder
+
+	# Record that col caused a cutoff: make it the first killer move at this ply, and add to its history score.
+	# Cutoffs further from the leaves prune more, so they add more to the history score.
+	def recordCutoff(self, gameBoard, col, piece, depth):
+		if self.ply < len(self.killers):
+			killers = self.killers[self.ply]
+			if killers[0] != col:
+				killers[1] = killers[0]
+				killers[0] = col
+		if depth < 0: # In a full search, use the number of empty spaces as the remaining depth
+			depth = gameBoard.numRows * gameBoard.numColumns - sum(gameBoard.colFills)
+		if piece not in self.history:
+			self.history[piece] = [0] * ((gameBoard.numRows + 1) * gameBoard.numColumns)
+		self.history[piece][gameBoard.colFills[col] * gameBoard.numColumns + col] += depth * depth
+
+	# Iterative deepening with principal variation search. After the first iteration, each search starts with an
+	# aspiration window around the previous iteration's score; if the score falls outside it, the iteration is
+	# searched again with a full window. Win and loss scores change with depth, so they are never used for a window.
+	def pvsIterative(self, gameBoard, maxingPlayer, timeMs=None):
 		self.iterative = True
-		self.transposition = False # Disabled due to issues with iterative deepening
-		limit = 10000 # Limit on the number of nodes expanded per move
+		if timeMs is not None:
+			gameBoard = gameBoard.copy()
+		self.startSearch(gameBoard, timeMs)
+		depth = 2
+		column = self.firstLegalMove(gameBoard)
+		score = None
+		try:
+			while (timeMs is not None or self.numExpandedPerMove < self.nodeLimit) and depth <= gameBoard.numColumns * gameBoard.numRows:
+				self.ply = 0
+				self.followPV = True
+				if score is None or abs(score) >= 1:
+					result = self.negamax(gameBoard, depth, -math.inf, math.inf, maxingPlayer)
+				else:
+					alpha = score - self.aspirationWindow
+					beta = score + self.aspirationWindow
+					result = self.negamax(gameBoard, depth, alpha, beta, maxingPlayer)
+					if result[1] <= alpha or result[1] >= beta:
+						self.ply = 0
+						self.followPV = True
+						result = self.negamax(gameBoard, depth, -math.inf, math.inf, maxingPlayer)
+				column, score = result
+				self.pv = self.pvTable[0]
+				if self.stats is not None:
+					# negamax scores are for the player to move, but statistics use the point of view of 'X'
+					if maxingPlayer:
+						self.stats.iteration(depth, column, score)
+					else:
+						self.stats.iteration(depth, column, -score)
+				depth += 1
+		except SearchTimeout:
+			self.ply = 0
+		self.deadline = None
+		self.followPV = False
+		self.lastPV = self.pv
+		return column
+
+	# Analyse the position, returning a list of (column, score, flag, pv) for every legal column, best first for the
+	# player to move. Scores are from the point of view of 'X' as in minimax, flag is transpositionTable.EXACT or
+	# the kind of bound the score is (also from the point of view of 'X'), and pv is the principal variation
+	# starting with the column.
+	# Every column is searched in one search, with negamax, so the transposition table, killer moves and history
+	# scores found for one column order and cut off the search of the next; most of the positions after one column
+	# are reached again after another. If numPV is given, only the best numPV columns get exact scores: the others
+	# are searched with a null window at the numPV-th best score so far, and are given an upper bound for the
+	# player to move unless they turn out to be better, when they are searched again.
+	# With depth -1 the search is a full search. With timeMs, iterative deepening is run until time is up, and the
+	# analysis of the last completed iteration is returned (depth is ignored).
+	def analyse(self, gameBoard, numPV=None, depth=-1, timeMs=None):
+		self.stopPonder()
+		self.numExpandedPerMove = 0
+		self.table.newSearch()
+		if self.bitboard and isinstance(gameBoard, board.Board):
+			gameBoard = gameBoard.toBitBoard()
+		else:
+			gameBoard = gameBoard.copy()
+		if gameBoard.checkWin() or gameBoard.checkFull():
+			return []
+		self.startSearch(gameBoard, timeMs)
+		self.followPV = False
+		if timeMs is None:
+			return self.analyseRoot(gameBoard, depth, numPV, None)
+		analysis = []
+		depth = 2
+		try:
+			while depth <= gameBoard.numColumns * gameBoard.numRows:
+				analysis = self.analyseRoot(gameBoard, depth, numPV, analysis)
+				depth += 1
+		except SearchTimeout:
+			self.ply = 0
+		self.deadline = None
+		return analysis
+
+	# Search every column (every candidate column with candidateColumns set) at the root for analyse(), in the order of the previous iteration's analysis if given
+	def analyseRoot(self, gameBoard, depth, numPV, previous):
+		maxingPlayer = sum(gameBoard.colFills) % 2 == 0
+		if maxingPlayer:
+			piece = 'X'
+			sign = 1
+		else:
+			piece = 'O'
+			sign = -1
+		if previous:
+			colOrder = [entry[0] for entry in previous]
+		else:
+			tableMove = None
+			if self.transposition:
+				entry = self.probeTable(gameBoard)
+				if entry is not None:
+					tableMove = entry[3]
+			colOrder = self.orderMovesPVS(gameBoard, tableMove, None, piece)
+		if numPV is None:
+			numPV = gameBoard.numColumns
+		childDepth = depth
+		if depth > 0:
+			childDepth = depth - 1
+
+		self.numExpanded += 1
+		self.numExpandedPerMove += 1
+		if self.stats is not None:
+			self.stats.node(0)
+		# exact holds the scores of the columns given exact scores, for the player to move
+		exact = []
+		analysis = []
+		for col in colOrder:
+			if gameBoard.colFills[col] >= gameBoard.numRows:
+				continue
+			lastPlay = gameBoard.lastPlay
+			gameBoard.addPiece(col, piece)
+			self.ply = 1
+			if len(exact) < numPV:
+				eval = -self.negamax(gameBoard, childDepth, -math.inf, math.inf, not maxingPlayer)[1]
+				flag = transpositionTable.EXACT
+			else:
+				# Only search exactly if the column is better than the worst of the best numPV so far
+				alpha = sorted(exact, reverse=True)[numPV - 1]
+				eval = -self.negamax(gameBoard, childDepth, -math.nextafter(alpha, math.inf), -alpha, not maxingPlayer)[1]
+				if eval > alpha:
+					eval = -self.negamax(gameBoard, childDepth, -math.inf, -alpha, not maxingPlayer)[1]
+				if eval > alpha:
+					flag = transpositionTable.EXACT
+				elif sign > 0:
+					flag = transpositionTable.UPPER
+				else:
+					flag = transpositionTable.LOWER
+			pv = (col,) + tuple(self.pvTable[1])
+			self.ply = 0
+			gameBoard.removePiece(col)
+			gameBoard.lastPlay = lastPlay
+			if flag == transpositionTable.EXACT:
+				pv = self.extendPV(gameBoard, pv, piece, depth)
+			if flag == transpositionTable.EXACT:
+				exact.append(eval)
+			analysis.append((col, sign * eval, flag, pv))
+
+		# Exact scores come first. Every bounded column is worse than the best numPV, which all have exact scores.
+		analysis.sort(key=lambda entry: (entry[2] != transpositionTable.EXACT, -sign * entry[1]))
+		if self.stats is not None and analysis:
+			self.stats.iteration(depth, analysis[0][0], analysis[0][1])
+		if self.transposition and analysis:
+			self.storeTable(gameBoard, analysis[0][1], depth, transpositionTable.EXACT, analysis[0][0])
+		return analysis
+
+	# A principal variation stops where the search took a score from the transposition table or played an immediate
+	# win without searching further. This continues it with the best moves stored for the positions along it, for as
+	# long as they are stored and legal and the game is not over, and ends it with an immediate win if there is one.
+	# Scores at the limits of the window (such as wins) are stored as bounds, so bounded entries are followed too.
+	# The line is at most depth moves long unless depth is -1 (a full search).
+	def extendPV(self, gameBoard, pv, piece, depth):
+		if depth > 0 and len(pv) >= depth:
+			return pv
+		line = gameBoard.copy()
+		for col in pv:
+			if line.colFills[col] >= line.numRows:
+				return pv
+			line.addPiece(col, piece)
+			if piece == 'X':
+				piece = 'O'
+			else:
+				piece = 'X'
+		while not line.checkWin() and not line.checkFull() and (depth < 0 or len(pv) < depth):
+			# Immediate wins are played without storing anything in the table
+			wins = line.threatColumns(piece)[0]
+			if wins:
+				pv = pv + (wins[0],)
+				break
+			entry = None
+			if self.transposition:
+				entry = self.probeTable(line)
+			if entry is None or entry[3] is None or not 0 <= entry[3] < line.numColumns:
+				break
+			col = entry[3]
+			if line.colFills[col] >= line.numRows:
+				break
+			line.addPiece(col, piece)
+			pv = pv + (col,)
+			if piece == 'X':
+				piece = 'O'
+			else:
+				piece = 'X'
+		return pv
+
+	# Without a time budget, iterative deepening runs until self.nodeLimit nodes have been expanded for this move.
+	# With a budget of timeMs milliseconds it runs until time is up, abandoning the unfinished iteration and
+	# returning the move from the last one that completed. An abandoned search leaves pieces on the board it was
+	# searching, so timed searches are run on a copy.
+	def minimaxIterative(self, gameBoard, maxingPlayer, timeMs=None):
+		self.iterative = True
+		if timeMs is not None:
+			gameBoard = gameBoard.copy()
+		self.startSearch(gameBoard, timeMs)
 		depth = 2 # Starting depth
-		column = random.randint(0, gameBoard.numColumns - 1)
-		while self.numExpandedPerMove < limit and depth <= gameBoard.numColumns * gameBoard.numRows: # Run until the limit is reached/exceeded or the max depth is reached (width * height of board)
-			column = self.minimax(gameBoard, depth, maxingPlayer)[0]
-			depth += 1
+		column = self.firstLegalMove(gameBoard)
+		try:
+			while (timeMs is not None or self.numExpandedPerMove < self.nodeLimit) and depth <= gameBoard.numColumns * gameBoard.numRows: # Run until the limit is reached/exceeded or the max depth is reached (width * height of board)
+				column, score = self.minimax(gameBoard, depth, maxingPlayer)
+				if self.stats is not None:
+					self.stats.iteration(depth, column, score)
+				depth += 1
+		except SearchTimeout:
+			self.ply = 0
+		self.deadline = None
+		self.followPV = False
 		return column
 
-	def minimaxABIterative(self, gameBoard, maxingPlayer):
+	# Each iteration searches the principal variation of the previous one first, so the best line found so far
+	# is used to set tight alpha-beta bounds early
+	def minimaxABIterative(self, gameBoard, maxingPlayer, timeMs=None):
 		self.iterative = True
-		self.transposition = False
-		limit = 10000
+		if timeMs is not None:
+			gameBoard = gameBoard.copy()
+		self.startSearch(gameBoard, timeMs)
 		depth = 2
-		column = random.randint(0, gameBoard.numColumns - 1)
-		while self.numExpandedPerMove < limit and depth <= gameBoard.numColumns * gameBoard.numRows:
-			column = self.minimaxAB(gameBoard, depth, maxingPlayer, -math.inf, math.inf)[0]
-			depth += 1
-		return column
\ No newline at end of file
+		column = self.firstLegalMove(gameBoard)
+		try:
+			while (timeMs is not None or self.numExpandedPerMove < self.nodeLimit) and depth <= gameBoard.numColumns * gameBoard.numRows:
+				self.ply = 0
+				self.followPV = True
+				column, score = self.minimaxAB(gameBoard, depth, maxingPlayer, -math.inf, math.inf)
+				self.pv = self.pvTable[0]
+				if self.stats is not None:
+					self.stats.iteration(depth, column, score)
+				depth += 1
+		except SearchTimeout:
+			self.ply = 0
+		self.deadline = None
+		self.followPV = False
+		self.lastPV = self.pv
+		return column
+
+	# Reset the per-search state before a search, setting the deadline if there is a time budget.
+	# History scores are kept from earlier moves, but halved so that recent cutoffs count for more.
+	# If the new root is further along the principal variation of the last search (as it is when the opponent
+	# plays the expected reply), the rest of that principal variation is searched first, and the killer moves
+	# found at each ply are moved up by the number of moves played, so the search carries on from the last one.
+	def startSearch(self, gameBoard, timeMs):
+		self.ply = 0
+		size = gameBoard.numColumns * gameBoard.numRows + 2
+		played = self.pvMovesPlayed(gameBoard)
+		if played is None:
+			self.pv = ()
+			self.killers = [[None, None] for i in range(size)]
+		else:
+			self.pv = tuple(self.lastPV[played:])
+			self.killers = self.killers[played:] + [[None, None] for i in range(played)]
+		self.lastRoot = gameBoard.copy()
+		self.lastPV = ()
+		self.pvTable = [()] * size
+		for piece in list(self.history):
+			scores = self.history[piece]
+			if len(scores) != (gameBoard.numRows + 1) * gameBoard.numColumns: # Scores for a different board size
+				del self.history[piece]
+				continue
+			for i in range(len(scores)):
+				scores[i] = scores[i] // 2
+		if timeMs is not None:
+			self.deadline = time.perf_counter() + timeMs / 1000
+		else:
+			self.deadline = None
+		if self.stats is not None:
+			self.stats.mark()
\ No newline at end of file
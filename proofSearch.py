@@ -0,0 +1,279 @@
+import argparse
+import time
+import board
+
+# A depth-first proof-number (df-pn) solver, which proves the result of a position with perfect play much faster
+# than a full minimax search when the result is decisive, because it only needs to look at one winning reply to
+# each defence rather than every move.
+#
+# Proof-number search proves a yes-or-no goal: "the attacker wins". Each node has a proof number (how many more
+# leaves must be proved to prove the goal there) and a disproof number (how many to disprove it). At an attacker
+# node the proof number is the smallest of its children's and the disproof number the sum; at a defender node the
+# other way round. The search always expands the most-proving node, the one reached by following, from the root,
+# the child with the smallest proof number at attacker nodes and disproof number at defender nodes.
+# Df-pn finds the same node depth-first: each child is searched with thresholds on its numbers and only returns
+# when one is exceeded, so nothing but the transposition table needs to be kept in memory. The thresholds use the
+# 1 + epsilon trick, which lets a child be searched a little past the point where its sibling becomes the most
+# proving, so the search does not switch back and forth between two children.
+#
+# Numbers are stored from the point of view of the player to move: phi is the proof number if that player is the
+# attacker and the disproof number otherwise, and delta is the other. A node's phi is then the smallest delta of
+# its children, and its delta the sum of their phis, whoever is to move.
+#
+# The result is found with two proofs: first that the player to move wins, and if that is disproved, that the
+# opponent wins. If the second is disproved too, the game is a draw. A full board (a draw) disproves the goal of
+# whichever player is attacking, so the two proofs store different numbers and the attacker is mixed into the key.
+#
+# Nodes use the rules of Player.tacticalMoves: a player who can win immediately does so, a player facing one
+# immediate win must block it (and loses if facing two), and moves under an opponent's immediate win are not
+# played unless there is nothing else.
+#
+# The transposition table has a fixed number of entries, so memory use is bounded whatever the position. Like
+# transpositionTable.TranspositionTable it is split into buckets of two slots; when a bucket is full, the entry
+# whose subtree took the least work to search is replaced, unless the other is an unresolved entry left by an earlier
+# call to solve(). A position and its mirror image share an entry.
+
+WIN = 1
+LOSS = 2
+DRAW = 3
+
+INFINITY = 1 << 60
+EPSILON = 0.25
+# Mixed into the keys of the proof in which 'O' is the attacker
+ATTACKER_KEY = 0x9e3779b97f4a7c15
+
+# Raised when a proof uses more nodes or time than it is allowed
+class SolverLimit(Exception):
+	pass
+
+
+class ProofSolver:
+
+	def __init__(self, tableSize=1 << 20, maxNodes=1000000):
+		self.numBuckets = max(1, tableSize // 2)
+		self.size = self.numBuckets * 2
+		self.keys = [None] * self.size
+		self.phis = [0] * self.size
+		self.deltas = [0] * self.size
+		self.works = [0] * self.size
+		self.ages = [0] * self.size
+		self.age = 0
+		self.maxNodes = maxNodes # The most nodes expanded by one call to solve()
+		self.deadline = None
+		self.numExpanded = 0 # Tracks the number of nodes expanded
+		self.nodeLimit = 0
+
+	# Prove the result of the position for the player to move. Returns (result, move), where result is WIN, LOSS or
+	# DRAW and move is a column that achieves it (None for a loss), or None if the proof needs more than maxNodes
+	# nodes or timeMs milliseconds.
+	def solve(self, gameBoard, timeMs=None):
+		if isinstance(gameBoard, board.Board):
+			gameBoard = gameBoard.toBitBoard()
+		else:
+			gameBoard = gameBoard.copy()
+		if sum(gameBoard.colFills) % 2 == 0:
+			piece = 'X'
+			opponent = 'O'
+		else:
+			piece = 'O'
+			opponent = 'X'
+		self.age = self.age + 1
+		self.nodeLimit = self.numExpanded + self.maxNodes
+		self.deadline = None
+		if timeMs is not None:
+			self.deadline = time.perf_counter() + timeMs / 1000
+		try:
+			if self.prove(gameBoard, piece, piece):
+				return WIN, self.provingMove(gameBoard, piece, piece)
+			if self.prove(gameBoard, piece, opponent):
+				return LOSS, None
+			return DRAW, self.provingMove(gameBoard, piece, opponent)
+		except SolverLimit:
+			return None
+		finally:
+			self.deadline = None
+
+	# Run df-pn from the root until the goal that attacker wins is proved or disproved, returning True if it is proved
+	def prove(self, gameBoard, piece, attacker):
+		self.search(gameBoard, piece, attacker, INFINITY, INFINITY)
+		phi, delta = self.lookup(self.key(gameBoard, attacker))
+		# phi is 0 when the player to move achieves its goal
+		return (phi == 0) == (piece == attacker)
+
+	# Return the child of the root that achieves the goal of the player to move. Its entry is normally still in the
+	# table from the proof, but if it has been replaced, the children are searched again until it is found.
+	def provingMove(self, gameBoard, piece, attacker):
+		children, phi, delta = self.expand(gameBoard, piece, attacker)
+		if phi == 0:
+			# The player to move wins immediately
+			return gameBoard.threatColumns(piece)[0][0]
+		if piece == 'X':
+			other = 'O'
+		else:
+			other = 'X'
+		keys = self.childKeys(gameBoard, piece, attacker, children)
+		for i in range(len(children)):
+			if self.lookup(keys[i])[1] == 0:
+				return children[i]
+		for i in range(len(children)):
+			gameBoard.addPiece(children[i], piece)
+			self.search(gameBoard, other, attacker, INFINITY, INFINITY)
+			gameBoard.removePiece(children[i])
+			if self.lookup(keys[i])[1] == 0:
+				return children[i]
+		return None
+
+	# Return the columns to search from the position, and its phi and delta if they are known without searching
+	# (or None for both otherwise)
+	def expand(self, gameBoard, piece, attacker):
+		if piece == 'X':
+			opponent = 'O'
+		else:
+			opponent = 'X'
+		if gameBoard.checkFull():
+			# A draw proves the goal of the defender
+			if piece == attacker:
+				return [], INFINITY, 0
+			return [], 0, INFINITY
+		wins = gameBoard.threatColumns(piece)[0]
+		if wins:
+			return [], 0, INFINITY
+		oppWins, oppAbove = gameBoard.threatColumns(opponent)
+		if len(oppWins) > 1:
+			return [], INFINITY, 0
+		if oppWins:
+			return oppWins, None, None
+		children = []
+		unsafe = []
+		for column in board.columnOrder(gameBoard.numColumns):
+			if gameBoard.colFills[column] < gameBoard.numRows:
+				if column in oppAbove:
+					unsafe.append(column)
+				else:
+					children.append(column)
+		if not children:
+			children = unsafe
+		return children, None, None
+
+	def key(self, gameBoard, attacker):
+		key = min(gameBoard.hash, gameBoard.mirrorHash)
+		if attacker == 'O':
+			key = key ^ ATTACKER_KEY
+		return key
+
+	# Return the keys of the positions reached by playing each of the columns, worked out from the Zobrist keys
+	# without playing the moves
+	def childKeys(self, gameBoard, piece, attacker, children):
+		numColumns = gameBoard.numColumns
+		zobrist = board.zobristKeys(gameBoard.numRows, numColumns, piece)
+		keys = []
+		for column in children:
+			index = gameBoard.colFills[column] * numColumns
+			key = min(gameBoard.hash ^ zobrist[index + column], gameBoard.mirrorHash ^ zobrist[index + numColumns - 1 - column])
+			if attacker == 'O':
+				key = key ^ ATTACKER_KEY
+			keys.append(key)
+		return keys
+
+	# Return (phi, delta) for the position with the given key, from the table if it is stored and (1, 1) otherwise.
+	# Only proved and disproved entries are kept from earlier calls to solve(): the numbers of unresolved entries
+	# were left by searches with other thresholds from other roots, and reusing them can make a proof much slower.
+	def lookup(self, key):
+		slot = (key % self.numBuckets) * 2
+		if self.keys[slot] != key:
+			slot = slot + 1
+			if self.keys[slot] != key:
+				return 1, 1
+		if not self.keep(slot):
+			return 1, 1
+		return self.phis[slot], self.deltas[slot]
+
+	# Return True if the entry in the slot is still useful: it is resolved or was stored by the current solve
+	def keep(self, slot):
+		return self.ages[slot] == self.age or self.phis[slot] == 0 or self.deltas[slot] == 0
+
+	def store(self, key, phi, delta, work):
+		slot = (key % self.numBuckets) * 2
+		if self.keys[slot] != key:
+			if self.keys[slot + 1] == key or (self.keys[slot] is not None and self.keep(slot) and self.works[slot + 1] <= self.works[slot]):
+				slot = slot + 1
+		self.keys[slot] = key
+		self.phis[slot] = phi
+		self.deltas[slot] = delta
+		self.works[slot] = work
+		self.ages[slot] = self.age
+
+	# Search the position until its phi reaches phiLimit or its delta reaches deltaLimit, storing its numbers in the
+	# table. Returns the number of nodes expanded.
+	def search(self, gameBoard, piece, attacker, phiLimit, deltaLimit):
+		self.numExpanded += 1
+		if self.numExpanded > self.nodeLimit or (self.deadline is not None and self.numExpanded % 256 == 0 and time.perf_counter() > self.deadline):
+			raise SolverLimit()
+		work = 1
+		key = self.key(gameBoard, attacker)
+		children, phi, delta = self.expand(gameBoard, piece, attacker)
+		if phi is not None:
+			self.store(key, phi, delta, work)
+			return work
+		if piece == 'X':
+			other = 'O'
+		else:
+			other = 'X'
+		keys = self.childKeys(gameBoard, piece, attacker, children)
+
+		while True:
+			# Find the numbers of the node from its children, and the children with the two smallest deltas
+			phi = INFINITY
+			delta = 0
+			best = None
+			bestPhi = 0
+			secondDelta = INFINITY
+			for i in range(len(children)):
+				childPhi, childDelta = self.lookup(keys[i])
+				delta = min(INFINITY, delta + childPhi)
+				if childDelta < phi:
+					secondDelta = phi
+					phi = childDelta
+					best = children[i]
+					bestPhi = childPhi
+				elif childDelta < secondDelta:
+					secondDelta = childDelta
+			if phi >= phiLimit or delta >= deltaLimit:
+				self.store(key, phi, delta, work)
+				return work
+
+			childPhiLimit = deltaLimit - (delta - bestPhi)
+			childDeltaLimit = min(phiLimit, int(secondDelta * (1 + EPSILON)) + 1)
+			gameBoard.addPiece(best, piece)
+			work += self.search(gameBoard, other, attacker, childPhiLimit, childDeltaLimit)
+			gameBoard.removePiece(best)
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Prove the result of a Connect-N position with df-pn.")
+	parser.add_argument("--rows", type=int, default=6)
+	parser.add_argument("--columns", type=int, default=7)
+	parser.add_argument("--win", type=int, default=4)
+	parser.add_argument("--moves", default="", help="the columns played from the empty board, as digits (e.g. 3342)")
+	parser.add_argument("--max-nodes", type=int, default=10000000)
+	parser.add_argument("--time", type=float, default=None, help="give up after this many seconds")
+	args = parser.parse_args()
+
+	gameBoard = board.BitBoard(args.rows, args.columns, args.win)
+	piece = 'X'
+	for move in args.moves:
+		gameBoard.addPiece(int(move), piece)
+		if piece == 'X':
+			piece = 'O'
+		else:
+			piece = 'X'
+	solver = ProofSolver(maxNodes=args.max_nodes)
+	start = time.perf_counter()
+	timeMs = None
+	if args.time is not None:
+		timeMs = args.time * 1000
+	result = solver.solve(gameBoard, timeMs)
+	if result is None:
+		print(f"Unknown after {solver.numExpanded} nodes")
+	else:
+		print(f"{('', 'Win', 'Loss', 'Draw')[result[0]]} for {piece}, move {result[1]}, {solver.numExpanded} nodes, {time.perf_counter() - start:.2f}s")
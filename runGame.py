@@ -1,78 +1,81 @@
-import board
-import game
 import player
 import randomPlayer
-# Note that you can comment out the following if you don't want to seed the random player differently each run
-from datetime import datetime
+import tournament
 import time
-import statistics
 
-games = 100
-wins = 0
-draws = 0
-losses = 0
+# This script allows you to test your solution.
+# Your coursework implementation must always be player 1.
+# You should consider changing player 2 to use a minimax approach for evaluation.
+# It is recommended that you also consider other game board sizes, and vary the number of pieces
+# that are required in a line to win. There are examples of board sizes commented out below.
+#
+# Games are played by tournament.runTournament(), which plays them in parallel across a pool of processes.
+# Each game is given its own seed (derived from 'seed' below), so a run can be repeated exactly. Change 'seed'
+# to test against different opponents, or use something like the following to seed differently each run:
+#       from datetime import datetime
+#       seed = int(datetime.now().timestamp())
 
-realStart = time.time()
-times = []
-expanded = []
-pruned = []
+# Player 1 is created by this function in each worker process.
+# To play the opening from a book, build one with 'python openingBook.py --rows R --columns C --win N' and use:
+#       p = player.Player(name)
+#       p.book = openingBook.OpeningBook("book-RxC-N.bin")
+# Small boards can be solved completely with 'python endgameTable.py --rows R --columns C --win N', after which
+# player 1 plays perfectly with:
+#       p.endgame = endgameTable.EndgameTable.load("endgame-RxC-N.bin")
+def makePlayer1(name, seed):
+    return player.Player(name)
 
-for i in range(games):
-    print(f"\n ---- Game {i + 1} ----")
-    # This script allows you to test your solution.
-    # Your coursework implementation must always be player 1.
-    # You should consider changing player 2 to use a minimax approach for evaluation.
-    # It is recommended that you also consider other game board sizes, and vary the number of pieces 
-    # that are required in a line to win. There are examples of the method calls to create such games
-    # commented out below.
-    p1 = player.Player("X")
-    # Player 2 currently picks random moves and so, while player 2 is not very good, it does allow you to
-    # start testing your solution. Once you have something sensible, you should change player 2 to be more 
-    # intelligent. Note that you can specify a seed for the random player (currently the seed is '42'),
-    # which allows for testing in a consistent environment.
-    # Note that the following two lines seed the random player differently each run
-    seed = datetime.now().timestamp()
-    #p2 = player.Player("O")
-    # Instead of randomly seeding, you can comment out the following line to seed the random player and
-    # test with a consistent opponent
-    p2 = randomPlayer.RandomPlayer("O", seed)
-    #p2 = randomPlayer.RandomPlayer("O", 42)
-    #p2 = randomPlayer.userPlayer("O")
-    start = time.time()
-    # The arguments to game.Game specify the two players, the number of rows, the number of columns
-    # and the number of pieces that need to be placed in a line in order to win.
-    # g = game.Game(p1, p2, 5, 6, 4)
-    # g = game.Game(p1, p2, 5, 5, 3)
-    # g = game.Game(p1, p2, 4, 5, 3)
-    # g = game.Game(p1, p2, 4, 4, 4)
-    # g = game.Game(p1, p2, 4, 4, 3)
-    # g = game.Game(p1, p2, 4, 4, 2)
-    # g = game.Game(p1, p2, 4, 4, 1)
-    # g = game.Game(p1, p2, 3, 4, 3)
-    # g = game.Game(p1, p2, 5, 5, 2)
-    # g = game.Game(p1, p2, 6, 7, 4)
-    g = game.Game(p1, p2, 3, 3, 3)
-    # g = game.Game(p1, p2, 3, 3, 2)
-    # g = game.Game(p1, p2, 2, 3, 2)
-    # g = game.Game(p1, p2, 3, 2, 2)
-    # g = game.Game(p1, p2, 2, 2, 2)
-    # g = game.Game(p1, p2, 3, 3, 1)
+# Player 2 currently picks random moves and so, while player 2 is not very good, it does allow you to
+# start testing your solution. Once you have something sensible, you should change player 2 to be more
+# intelligent.
+def makePlayer2(name, seed):
+    #return player.Player(name)
+    # On large boards, a Monte Carlo tree search player (import mctsPlayer) is a stronger opponent:
+    #return mctsPlayer.MCTSPlayer(name, seed)
+    return randomPlayer.RandomPlayer(name, seed)
 
-    # You can pass 'True' to the playGame() method to test your alpha-beta pruning approach, i.e., to make
-    # player 1 use alpha-beta. If you want player 2 to use alpha-beta you will need to ensure 
-    # that you create player 2 accordingly. 
-    val = g.playGame(False)
-    if val == 1:
-        wins += 1
-    elif val == -1:
-        losses += 1
-    else:
-        draws += 1
-    end = time.time()
-    times.append(end - start)
-    expanded.append(p1.numExpanded)
-    pruned.append(p1.numPruned)
-realEnd = time.time()
+# A fixed number of games is too few to detect a small change in strength, and more than needed for a large one.
+# To compare two Player configurations, use strengthTest.py, which plays paired games and stops as soon as an SPRT
+# decides. For example, to test principal variation search against the default Player:
+#       python strengthTest.py '{"algorithm": "pvs"}'
+if __name__ == "__main__":
+    games = 100
+    seed = 0
+    # The number of processes to play games in. None uses one per CPU. Set to 1 and quiet to False (and
+    # consider setting randomPlayer.userPlayer as player 2) to watch each game being played.
+    workers = None
+    quiet = True
+    # You can set pruning to True to test your alpha-beta pruning approach, i.e., to make
+    # player 1 use alpha-beta. If you want player 2 to use alpha-beta you will need to ensure
+    # that you create player 2 accordingly.
+    pruning = False
 
-print(f"Cache hits: {p1.cacheHits}\nTotal expanded: {sum(expanded)}\nAverage expanded: {sum(expanded) / games}\nExpanded SD: {statistics.stdev(expanded)}\nTotal pruned: {sum(pruned)}\nAverage pruned: {sum(pruned) / games}\nPruned SD: {statistics.stdev(pruned)}")
-print(f"Games: {games}\nWins: {wins} ({wins / games * 100}%)\nDraws: {draws} ({draws / games * 100}%)\nLosses: {losses} ({losses / games * 100}%)\nAverage time: {statistics.mean(times)}\nStandard deviation: {statistics.stdev(times)}\nTotal time: {realEnd - realStart}")
\ No newline at end of file
+    # The board is specified by the number of rows, the number of columns and the number of pieces
+    # that need to be placed in a line in order to win.
+    # rows, columns, winNum = 5, 6, 4
+    # rows, columns, winNum = 5, 5, 3
+    # rows, columns, winNum = 4, 5, 3
+    # rows, columns, winNum = 4, 4, 4
+    # rows, columns, winNum = 4, 4, 3
+    # rows, columns, winNum = 4, 4, 2
+    # rows, columns, winNum = 4, 4, 1
+    # rows, columns, winNum = 3, 4, 3
+    # rows, columns, winNum = 5, 5, 2
+    # rows, columns, winNum = 6, 7, 4
+    rows, columns, winNum = 3, 3, 3
+    # rows, columns, winNum = 3, 3, 2
+    # rows, columns, winNum = 2, 3, 2
+    # rows, columns, winNum = 3, 2, 2
+    # rows, columns, winNum = 2, 2, 2
+    # rows, columns, winNum = 3, 3, 1
+
+    realStart = time.time()
+    results = []
+    for result in tournament.runTournament(games, rows, columns, winNum, pruning, workers, seed, quiet, makePlayer1, makePlayer2):
+        print(f"Game {result['game'] + 1}: result {result['result']}, {result['moves']} moves, {result['expanded']} expanded, {result['pruned']} pruned, {result['time']:.3f}s")
+        results.append(result)
+    realEnd = time.time()
+
+    summary = tournament.summarise(results)
+    print(f"Cache hits: {summary['cacheHits']}\nTotal expanded: {summary['totalExpanded']}\nAverage expanded: {summary['totalExpanded'] / games}\nExpanded SD: {summary['expandedSD']}\nTotal pruned: {summary['totalPruned']}\nAverage pruned: {summary['totalPruned'] / games}\nPruned SD: {summary['prunedSD']}")
+    print(f"Games: {games}\nWins: {summary['wins']} ({summary['wins'] / games * 100}%)\nDraws: {summary['draws']} ({summary['draws'] / games * 100}%)\nLosses: {summary['losses']} ({summary['losses'] / games * 100}%)\nAverage time: {summary['averageTime']}\nStandard deviation: {summary['timeSD']}\nTotal time: {realEnd - realStart}")
@@ -0,0 +1,99 @@
+import time
+
+# Detailed statistics about the search, recorded when a SearchStats is attached to a Player (as player.stats).
+# Recording costs a little time at every node, so it is off unless a SearchStats is attached.
+#
+# The statistics are:
+# - the number of nodes expanded at each ply (distance from the root), and from those the branching factor
+#   between one ply and the next
+# - the number of cutoffs, and how many of them came from the first move searched. With good move ordering
+#   nearly all cutoffs come from the first move.
+# - for each completed iteration of iterative deepening, its depth, the move and score it found (from the point of
+#   view of 'X', whichever search is used), the nodes it expanded and the time it took, and the effective branching
+#   factor (its nodes divided by the last iteration's)
+# - the probe, hit, store and collision counts of the player's transposition table
+#
+# Two optional callbacks are supported: onIteration(stats, iteration) is called after each completed iteration
+# with the iteration's record, and onNodes(stats) is called every nodeInterval nodes.
+
+class SearchStats:
+
+	def __init__(self, onIteration=None, onNodes=None, nodeInterval=10000):
+		self.onIteration = onIteration
+		self.onNodes = onNodes
+		self.nodeInterval = nodeInterval
+		self.reset()
+
+	# Clear every statistic
+	def reset(self):
+		self.numNodes = 0
+		self.nodesByPly = []
+		self.numCutoffs = 0
+		self.firstMoveCutoffs = 0
+		self.iterations = []
+		self.mark()
+
+	# Record a node expanded at the given ply
+	def node(self, ply):
+		while len(self.nodesByPly) <= ply:
+			self.nodesByPly.append(0)
+		self.nodesByPly[ply] += 1
+		self.numNodes += 1
+		if self.onNodes is not None and self.numNodes % self.nodeInterval == 0:
+			self.onNodes(self)
+
+	# Record a cutoff, and whether it was caused by the first move searched
+	def cutoff(self, first):
+		self.numCutoffs += 1
+		if first:
+			self.firstMoveCutoffs += 1
+
+	# Start a new search, so that its first iteration is timed and counted from now
+	def mark(self):
+		self.markTime = time.perf_counter()
+		self.markNodes = self.numNodes
+		self.lastIterationNodes = 0
+
+	# Record a completed iteration of iterative deepening
+	def iteration(self, depth, move, score):
+		now = time.perf_counter()
+		nodes = self.numNodes - self.markNodes
+		record = {"depth": depth, "move": move, "score": score, "nodes": nodes, "time": now - self.markTime}
+		if self.lastIterationNodes > 0:
+			record["branchingFactor"] = nodes / self.lastIterationNodes
+		self.iterations.append(record)
+		self.markTime = now
+		self.markNodes = self.numNodes
+		self.lastIterationNodes = nodes
+		if self.onIteration is not None:
+			self.onIteration(self, record)
+
+	# Return the branching factor between each ply and the next: the nodes expanded at ply + 1 divided by those at
+	# ply. Children that end the game or are answered by the transposition table are not expanded, so do not count.
+	def branchingFactors(self):
+		factors = []
+		for ply in range(len(self.nodesByPly) - 1):
+			if self.nodesByPly[ply] > 0:
+				factors.append(self.nodesByPly[ply + 1] / self.nodesByPly[ply])
+		return factors
+
+	# Return a dictionary of every statistic, including those of the given transposition table
+	def summary(self, table=None):
+		result = {
+			"nodes": self.numNodes,
+			"nodesByPly": list(self.nodesByPly),
+			"branchingFactors": self.branchingFactors(),
+			"cutoffs": self.numCutoffs,
+			"firstMoveCutoffRate": self.firstMoveCutoffs / self.numCutoffs if self.numCutoffs else 0,
+			"iterations": list(self.iterations),
+		}
+		if table is not None:
+			result["table"] = {
+				"probes": table.numProbes,
+				"hits": table.numHits,
+				"stores": table.numStores,
+				"collisions": table.numCollisions,
+				"entries": len(table),
+				"size": table.size,
+			}
+		return result
@@ -0,0 +1,171 @@
+import math
+import struct
+from multiprocessing import shared_memory
+
+# A transposition table in shared memory, so that Players in several processes on the same host (the workers of
+# parallelSearch or gameServer, or separate programs analysing the same game) can probe and store into one table
+# instead of each searching the same positions again. Hashes do not depend on the process (see
+# board.zobristKeys()), so an entry stored by one process is valid in every other.
+#
+# It has the same methods as transpositionTable.TranspositionTable and the same bucketed replacement policy, so
+# it can be used as Player.table:
+#       p.table = sharedTable.SharedTranspositionTable(1 << 20)
+# creates a table, and another process attaches to it by name with
+#       p.table = sharedTable.SharedTranspositionTable(name=name)
+# A table is also attached by name when it is pickled and sent to another process.
+#
+# The memory holds a header (a magic number, the shared search age and the number of buckets) followed by packed
+# slots of 24 bytes: the key, then the value, depth, flag, move (16 bits, so boards can be up to 32767 columns wide)
+# and age (8 bits, which only has to tell recent searches from older ones). There are no locks. Instead the key is
+# stored XORed with the other two 8-byte words of its slot, so if a slot is read while another process is halfway
+# through writing it (or two processes write it at once), the key will not match and the probe is treated as a
+# miss. Probes and stores therefore never return a mixture of two entries, though a store can occasionally be lost.
+#
+# Counts of probes, hits, stores and collisions are kept separately by each process. The creating process should
+# call unlink() when the table is no longer needed, and every process close() when it is done with it.
+# Before Python 3.13, the multiprocessing resource tracker removes shared memory when the process that started the
+# tracker exits, even if it only attached to it. Processes started by multiprocessing share their parent's tracker
+# if it was running when they started, but a separate program attaching by name should exit before the table's
+# creator.
+
+MAGIC = b"CNST"
+HEADER = struct.Struct("<4sIQ")
+SLOT = struct.Struct("<QdiBhB")
+WORDS = struct.Struct("<QQQ")
+DATA = struct.Struct("<diBhB")
+# The offset of the flag in a slot, which is 0 for an empty slot
+FLAG_OFFSET = struct.calcsize("<Qdi")
+# Depths are stored as 32-bit integers, with this standing for the infinite depth of a full search
+INFINITE_DEPTH = (1 << 31) - 1
+AGES = 1 << 8
+
+class SharedTranspositionTable:
+
+	def __init__(self, size=None, name=None):
+		if name is None:
+			# size is the total number of entries, which is rounded down to a whole number of buckets
+			self.numBuckets = max(1, size // 2)
+			self.memory = shared_memory.SharedMemory(create=True, size=HEADER.size + self.numBuckets * 2 * SLOT.size)
+			HEADER.pack_into(self.memory.buf, 0, MAGIC, 0, self.numBuckets)
+		else:
+			self.memory = shared_memory.SharedMemory(name=name)
+			magic, age, self.numBuckets = HEADER.unpack_from(self.memory.buf, 0)
+			if magic != MAGIC:
+				self.memory.close()
+				raise ValueError(f"{name} is not a shared transposition table")
+		self.name = self.memory.name
+		self.buf = self.memory.buf
+		self.size = self.numBuckets * 2
+		self.age = 0
+		# Entries last used at least this many searches ago (counting searches by every process) can be replaced
+		# whatever their depth. Raise it to about the number of processes sharing the table, so that one process
+		# starting a new search does not make the entries of searches still running elsewhere replaceable.
+		self.staleSearches = 1
+		self.numProbes = 0
+		self.numHits = 0
+		self.numStores = 0
+		self.numCollisions = 0
+
+	# Pickling sends only the name, and unpickling attaches to the same memory
+	def __reduce__(self):
+		return SharedTranspositionTable, (None, self.name)
+
+	# The number of entries, found by reading every slot
+	def __len__(self):
+		numEntries = 0
+		for key, value, depth, flag, move, age in SLOT.iter_unpack(self.buf[HEADER.size:HEADER.size + self.size * SLOT.size]):
+			if flag != 0:
+				numEntries += 1
+		return numEntries
+
+	# Start a new search, making entries from earlier searches replaceable. The age is shared by every process.
+	def newSearch(self):
+		self.age = (HEADER.unpack_from(self.buf, 0)[1] + 1) % AGES
+		HEADER.pack_into(self.buf, 0, MAGIC, self.age, self.numBuckets)
+
+	def offset(self, slot):
+		return HEADER.size + slot * SLOT.size
+
+	# Return the key stored in the raw bytes of a slot, or None if the slot is empty. A slot read while it was being
+	# written gives a key that matches nothing.
+	def readKey(self, raw):
+		keyWord, low, high = WORDS.unpack(raw)
+		if raw[FLAG_OFFSET] == 0:
+			return None
+		return keyWord ^ low ^ high
+
+	def isStale(self, age):
+		return (self.age - age) % AGES >= self.staleSearches
+
+	# Return the entry for the given key as (value, depth, flag, move), or None if it is not stored.
+	# The entry is marked as used by the current search.
+	def probe(self, key):
+		self.numProbes += 1
+		slot = (key % self.numBuckets) * 2
+		start = self.offset(slot)
+		raw = bytes(self.buf[start:start + SLOT.size])
+		if self.readKey(raw) != key:
+			slot = slot + 1
+			start = start + SLOT.size
+			raw = bytes(self.buf[start:start + SLOT.size])
+			if self.readKey(raw) != key:
+				return None
+		self.numHits += 1
+		keyWord, value, depth, flag, move, age = SLOT.unpack(raw)
+		if depth == INFINITE_DEPTH:
+			depth = math.inf
+		if move < 0:
+			move = None
+		flag = flag - 1
+		if age != self.age:
+			self.write(slot, key, value, depth, flag, move, self.age)
+		return value, depth, flag, move
+
+	# Store an entry for the given key, using the replacement policy of TranspositionTable
+	def store(self, key, value, depth, flag, move):
+		self.numStores += 1
+		slot = (key % self.numBuckets) * 2
+		start = self.offset(slot)
+		raw = bytes(self.buf[start:start + SLOT.size])
+		oldKey = self.readKey(raw)
+		keyWord, oldValue, oldDepth, oldFlag, oldMove, oldAge = SLOT.unpack(raw)
+		if oldDepth == INFINITE_DEPTH:
+			oldDepth = math.inf
+		if oldKey is None or oldKey == key or depth >= oldDepth or self.isStale(oldAge):
+			if oldKey is not None and oldKey != key:
+				# Move the old entry to the always-replace slot. The stored words do not depend on the slot.
+				self.countCollision(slot + 1, oldKey)
+				self.buf[start + SLOT.size:start + 2 * SLOT.size] = raw
+			self.write(slot, key, value, depth, flag, move, self.age)
+		else:
+			self.write(slot + 1, key, value, depth, flag, move, self.age)
+
+	def countCollision(self, slot, key):
+		start = self.offset(slot)
+		oldKey = self.readKey(bytes(self.buf[start:start + SLOT.size]))
+		if oldKey is not None and oldKey != key:
+			self.numCollisions += 1
+
+	def write(self, slot, key, value, depth, flag, move, age):
+		self.countCollision(slot, key)
+		if depth == math.inf:
+			depth = INFINITE_DEPTH
+		if move is None:
+			move = -1
+		data = DATA.pack(value, depth, flag + 1, move, age)
+		keyWord, low, high = WORDS.unpack(bytes(8) + data)
+		start = self.offset(slot)
+		self.buf[start:start + SLOT.size] = struct.pack("<Q", key ^ low ^ high) + data
+
+	# Remove every entry from the table
+	def clear(self):
+		self.buf[HEADER.size:HEADER.size + self.size * SLOT.size] = bytes(self.size * SLOT.size)
+
+	# Stop using the table in this process
+	def close(self):
+		self.buf = None
+		self.memory.close()
+
+	# Free the shared memory once every process has closed the table
+	def unlink(self):
+		self.memory.unlink()
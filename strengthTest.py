@@ -0,0 +1,205 @@
+import argparse
+import concurrent.futures
+import json
+import math
+import os
+import random
+import board
+import player
+
+# Plays two Player configurations against each other to find whether one is stronger, stopping as soon as the
+# answer is clear instead of after a fixed number of games.
+#
+# Games are played in pairs: each pair starts from the same random opening, and each configuration plays 'X' in
+# one game of the pair. This cancels out most of the advantage of the first move and of lopsided openings, so far
+# fewer games are needed than with independent games. The score of a pair for configuration A is its average
+# score over the two games (1 for a win, 0.5 for a draw).
+#
+# The Elo difference of A over B is worked out from A's mean pair score s as -400 * log10(1 / s - 1), with a
+# confidence interval from the standard error of the pair scores.
+#
+# A sequential probability ratio test (SPRT) decides between H0, that the difference is elo0, and H1, that it is
+# elo1. After each pair it works out the log-likelihood ratio (LLR) of the results under the two hypotheses, using
+# the normal approximation with the observed variance of the pair scores (the generalised SPRT). The test stops
+# and accepts H1 once the LLR reaches log((1 - beta) / alpha), or H0 once it falls to log(beta / (1 - alpha)),
+# where alpha and beta are the chances of accepting the wrong hypothesis. An obvious difference stops after a
+# few dozen pairs; a difference close to the midpoint of elo0 and elo1 takes longest. Pair scores are multiples of
+# 0.25, so if every pair so far has scored the same, the variance is taken to be MIN_VARIANCE, that of pairs
+# differing by half a step either way, rather than 0, which would never let the test stop.
+#
+# A configuration is a dictionary of Player attributes, such as {"algorithm": "pvs", "transposition": true}.
+# Moves are chosen by getMoveAlphaBeta() with a time budget of timeMs.
+
+MIN_VARIANCE = 0.125 ** 2
+
+# Return a Player with the settings of the configuration
+def makePlayer(config, name):
+	p = player.Player(name)
+	for attribute in config:
+		if not hasattr(p, attribute):
+			raise ValueError(f"Player has no attribute {attribute!r}")
+		setattr(p, attribute, config[attribute])
+	return p
+
+# Return a list of plies random moves from the empty board, leading to a position where the game is not over and
+# the player to move cannot win immediately
+def randomOpening(generator, rows, columns, winNum, plies):
+	while True:
+		gameBoard = board.BitBoard(rows, columns, winNum)
+		moves = []
+		piece = 'X'
+		for i in range(plies):
+			legal = [col for col in range(columns) if gameBoard.colFills[col] < rows]
+			col = generator.choice(legal)
+			gameBoard.addPiece(col, piece)
+			moves.append(col)
+			if gameBoard.checkWin() or gameBoard.checkFull():
+				break
+			if piece == 'X':
+				piece = 'O'
+			else:
+				piece = 'X'
+		else:
+			if not gameBoard.threatColumns(piece)[0]:
+				return moves
+
+# Play one game from the opening and return its result: 1 if 'X' wins, -1 if 'O' wins and 0 for a draw
+def playGame(configX, configO, opening, rows, columns, winNum, timeMs, seed):
+	random.seed(seed)
+	players = {'X': makePlayer(configX, 'X'), 'O': makePlayer(configO, 'O')}
+	gameBoard = board.Board(rows, columns, winNum)
+	piece = 'X'
+	for col in opening:
+		gameBoard.addPiece(col, piece)
+		if piece == 'X':
+			piece = 'O'
+		else:
+			piece = 'X'
+	try:
+		while True:
+			col = players[piece].getMoveAlphaBeta(gameBoard.copy(), timeMs)
+			if col is None or not gameBoard.addPiece(col, piece):
+				# An illegal move loses
+				if piece == 'X':
+					return -1
+				return 1
+			if gameBoard.checkWin():
+				if piece == 'X':
+					return 1
+				return -1
+			if gameBoard.checkFull():
+				return 0
+			if piece == 'X':
+				piece = 'O'
+			else:
+				piece = 'X'
+	finally:
+		# Stop any pondering, so no search keeps running in the worker after the game
+		for name in players:
+			players[name].stopPonder()
+
+# Play a pair of games from the opening with the colours swapped, returning A's pair score
+def playPair(configA, configB, opening, rows, columns, winNum, timeMs, seed):
+	first = playGame(configA, configB, opening, rows, columns, winNum, timeMs, seed)
+	second = playGame(configB, configA, opening, rows, columns, winNum, timeMs, seed)
+	return ((1 + first) / 2 + (1 - second) / 2) / 2
+
+# The Elo difference giving an expected score of s, and the expected score of an Elo difference
+def eloFromScore(s):
+	if s <= 0:
+		return -math.inf
+	if s >= 1:
+		return math.inf
+	return -400 * math.log10(1 / s - 1)
+
+def scoreFromElo(elo):
+	return 1 / (1 + 10 ** (-elo / 400))
+
+# Return the mean and sample variance of the pair scores
+def meanVariance(scores):
+	n = len(scores)
+	mean = sum(scores) / n
+	if n < 2:
+		return mean, 0
+	return mean, sum((x - mean) ** 2 for x in scores) / (n - 1)
+
+# Return the Elo difference of the pair scores and the lower and upper ends of its confidence interval, where z is
+# the number of standard errors either side (1.96 for 95%)
+def eloInterval(scores, z=1.96):
+	mean, variance = meanVariance(scores)
+	error = z * math.sqrt(variance / len(scores))
+	return eloFromScore(mean), eloFromScore(mean - error), eloFromScore(mean + error)
+
+# Return the log-likelihood ratio of H1 (a difference of elo1) against H0 (a difference of elo0) for the scores.
+# It is 0 until there are at least two scores.
+def llr(scores, elo0, elo1):
+	if len(scores) < 2:
+		return 0
+	mean, variance = meanVariance(scores)
+	if variance == 0:
+		variance = MIN_VARIANCE
+	s0 = scoreFromElo(elo0)
+	s1 = scoreFromElo(elo1)
+	return len(scores) * (s1 - s0) * (2 * mean - s0 - s1) / (2 * variance)
+
+# Play pairs until the SPRT accepts a hypothesis or maxPairs pairs have been played, yielding a dictionary of the
+# state of the test after each pair. The last dictionary has "result" set to "H0", "H1" or None (undecided).
+# At most a few pairs per worker are submitted ahead, so openings are only generated as they are needed.
+def runMatch(configA, configB, rows, columns, winNum, timeMs=100, plies=2, elo0=0, elo1=10, alpha=0.05, beta=0.05, maxPairs=1000, workers=None, seed=0):
+	lower = math.log(beta / (1 - alpha))
+	upper = math.log((1 - beta) / alpha)
+	generator = random.Random(seed)
+	scores = []
+	with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+		maxPending = (workers or os.cpu_count()) * 4
+		pending = set()
+		submitted = 0
+		result = None
+		while submitted < maxPairs or pending:
+			while submitted < maxPairs and len(pending) < maxPending:
+				opening = randomOpening(generator, rows, columns, winNum, plies)
+				pending.add(pool.submit(playPair, configA, configB, opening, rows, columns, winNum, timeMs, generator.getrandbits(32)))
+				submitted += 1
+			done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+			for future in done:
+				scores.append(future.result())
+				elo, eloLow, eloHigh = eloInterval(scores)
+				ratio = llr(scores, elo0, elo1)
+				if ratio >= upper:
+					result = "H1"
+				elif ratio <= lower:
+					result = "H0"
+				state = {"pairs": len(scores), "score": sum(scores) / len(scores), "elo": elo, "eloLow": eloLow, "eloHigh": eloHigh, "llr": ratio, "bounds": (lower, upper), "result": result}
+				yield state
+				if result is not None:
+					for other in pending:
+						other.cancel()
+					return
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Test whether one Player configuration is stronger than another with an SPRT.")
+	parser.add_argument("configA", help="Player attributes for the configuration under test, as JSON")
+	parser.add_argument("configB", nargs="?", default="{}", help="Player attributes for the baseline, as JSON (default: the default Player)")
+	parser.add_argument("--rows", type=int, default=6)
+	parser.add_argument("--columns", type=int, default=7)
+	parser.add_argument("--win", type=int, default=4)
+	parser.add_argument("--time", type=int, default=100, help="milliseconds per move")
+	parser.add_argument("--plies", type=int, default=2, help="number of random moves in each opening")
+	parser.add_argument("--elo0", type=float, default=0)
+	parser.add_argument("--elo1", type=float, default=10)
+	parser.add_argument("--alpha", type=float, default=0.05)
+	parser.add_argument("--beta", type=float, default=0.05)
+	parser.add_argument("--max-pairs", type=int, default=1000)
+	parser.add_argument("--workers", type=int, default=None, help="number of processes (default: one per CPU)")
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args()
+
+	configA = json.loads(args.configA)
+	configB = json.loads(args.configB)
+	# Check the configurations before starting any games
+	makePlayer(configA, 'X')
+	makePlayer(configB, 'X')
+	for state in runMatch(configA, configB, args.rows, args.columns, args.win, args.time, args.plies, args.elo0, args.elo1, args.alpha, args.beta, args.max_pairs, args.workers, args.seed):
+		print(f"Pairs {state['pairs']}: score {state['score']:.3f}, Elo {state['elo']:.1f} [{state['eloLow']:.1f}, {state['eloHigh']:.1f}], LLR {state['llr']:.2f} ({state['bounds'][0]:.2f}, {state['bounds'][1]:.2f})", flush=True)
+	print(json.dumps(state))
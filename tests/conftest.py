@@ -0,0 +1,39 @@
+import os
+import random
+import sys
+import pytest
+
+# The modules live at the top of the repository rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import board
+
+
+# Return count positions on a board of the given size, reached by random moves from the empty board, where the
+# game is not over. Each is a (gameBoard, maxingPlayer) pair.
+def randomPositions(rows, columns, winNum, count, seed=0, bitboard=True):
+	generator = random.Random(seed)
+	positions = []
+	while len(positions) < count:
+		if bitboard:
+			gameBoard = board.BitBoard(rows, columns, winNum)
+		else:
+			gameBoard = board.Board(rows, columns, winNum)
+		piece = 'X'
+		for i in range(generator.randrange(rows * columns - 1)):
+			col = generator.choice([col for col in range(columns) if gameBoard.colFills[col] < rows])
+			gameBoard.addPiece(col, piece)
+			if gameBoard.checkWin() or gameBoard.checkFull():
+				break
+			if piece == 'X':
+				piece = 'O'
+			else:
+				piece = 'X'
+		else:
+			positions.append((gameBoard, piece == 'X'))
+	return positions
+
+
+@pytest.fixture
+def positions():
+	return randomPositions
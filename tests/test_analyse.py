@@ -0,0 +1,60 @@
+import board
+import player
+import transpositionTable
+
+
+# Replay the line from the position, returning the board at its end, or None if a move is illegal or is played
+# after the game is over
+def replay(gameBoard, line, maxingPlayer):
+	gameBoard = gameBoard.copy()
+	if maxingPlayer:
+		piece = 'X'
+	else:
+		piece = 'O'
+	for col in line:
+		if gameBoard.checkWin() or gameBoard.colFills[col] >= gameBoard.numRows:
+			return None
+		gameBoard.addPiece(col, piece)
+		if piece == 'X':
+			piece = 'O'
+		else:
+			piece = 'X'
+	return gameBoard
+
+
+# In a full search, the principal variation of every column with an exact score is legal and plays the game out
+# to its result, even where the search took the column's score from the transposition table
+def test_full_analysis_lines_reach_the_result(positions):
+	cases = [(board.BitBoard(4, 4, 3), True)] + positions(4, 4, 3, 6, seed=4)
+	for gameBoard, maxingPlayer in cases:
+		p = player.Player('X')
+		p.transposition = True
+		p.symmetry = True
+		for col, score, flag, pv in p.analyse(gameBoard):
+			if flag != transpositionTable.EXACT:
+				continue
+			end = replay(gameBoard, pv, maxingPlayer)
+			assert end is not None
+			if score >= 1:
+				assert end.checkWin() and end.lastPlay[2] == 'X'
+			elif score <= -1:
+				assert end.checkWin() and end.lastPlay[2] == 'O'
+			else:
+				assert end.checkFull() and not end.checkWin()
+
+
+# The scores match a search of each column on its own
+def test_analysis_scores(positions):
+	for gameBoard, maxingPlayer in positions(4, 4, 3, 4, seed=5):
+		analysis = player.Player('X').analyse(gameBoard)
+		for col, score, flag, pv in analysis:
+			child = gameBoard.copy()
+			if maxingPlayer:
+				child.addPiece(col, 'X')
+			else:
+				child.addPiece(col, 'O')
+			if child.checkWin():
+				expected = 1 if maxingPlayer else -1
+			else:
+				expected = player.Player('X').minimax(child, -1, not maxingPlayer)[1]
+			assert score == expected
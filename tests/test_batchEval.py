@@ -0,0 +1,57 @@
+import math
+import random
+import pytest
+import board
+import evaluator
+
+np = pytest.importorskip("numpy")
+import batchEval
+
+
+# Return random boards, with the winner of each (1 for 'X', -1 for 'O', 0 if nobody has won yet). Some games are
+# stopped part way through and the rest played until a win or a full board.
+def randomBoards(rows, columns, winNum, count, seed):
+	generator = random.Random(seed)
+	boards = []
+	winners = []
+	for i in range(count):
+		gameBoard = board.Board(rows, columns, winNum)
+		winner = 0
+		numMoves = generator.randrange(rows * columns + 1)
+		for move in range(numMoves):
+			piece = 'XO'[move % 2]
+			col = generator.choice([col for col in range(columns) if gameBoard.colFills[col] < rows])
+			gameBoard.addPiece(col, piece)
+			if gameBoard.checkWin():
+				winner = 1 - 2 * (move % 2)
+				break
+		boards.append(gameBoard)
+		winners.append(winner)
+	return boards, winners
+
+
+@pytest.mark.parametrize("size", [(6, 7, 4), (4, 5, 3), (3, 9, 3), (5, 5, 2), (2, 6, 3)])
+def test_batch_matches_one_at_a_time(size):
+	rows, columns, winNum = size
+	boards, expectedWinners = randomBoards(rows, columns, winNum, 300, seed=sum(size))
+	batch = batchEval.toArray(boards)
+	assert batch.shape == (300, rows, columns)
+	winners, legal, scores = batchEval.evaluate(batch, winNum)
+	assert winners.tolist() == expectedWinners
+	for i in range(len(boards)):
+		gameBoard = boards[i]
+		assert legal[i].tolist() == [gameBoard.colFills[col] < rows for col in range(columns)]
+		if expectedWinners[i] == 0:
+			maxingPlayer = sum(gameBoard.colFills) % 2 == 0
+			assert math.isclose(scores[i], evaluator.WindowEvaluator(gameBoard).score(maxingPlayer), abs_tol=1e-12)
+
+
+# BitBoards convert to the same batch as Boards, and the parts of evaluate() give the same results on their own
+def test_bitboards_and_parts():
+	boards, expectedWinners = randomBoards(6, 7, 4, 50, seed=1)
+	batch = batchEval.toArray(boards)
+	assert (batchEval.toArray([gameBoard.toBitBoard() for gameBoard in boards]) == batch).all()
+	winners, legal, scores = batchEval.evaluate(batch, 4)
+	assert (batchEval.winners(batch, 4) == winners).all()
+	assert (batchEval.legalMoves(batch) == legal).all()
+	assert (batchEval.scores(batch, 4) == scores).all()
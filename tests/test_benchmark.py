@@ -0,0 +1,84 @@
+import copy
+import board
+import benchmark
+
+
+def result(expanded=1000, pruned=300, cacheHits=50, seconds=0.01, p50=0.4):
+	return {
+		"positions": 9,
+		"expanded": expanded,
+		"pruned": pruned,
+		"cacheHits": cacheHits,
+		"ttHitRate": cacheHits / (cacheHits + expanded),
+		"time": seconds,
+		"nodesPerSecond": expanded / seconds,
+		"latencyMs": {"p50": p50, "p90": p50 * 2, "p99": p50 * 3, "max": p50 * 3},
+	}
+
+
+def results(**kwargs):
+	return {"version": benchmark.VERSION, "repeat": 3, "results": {"4x4-3": {"minimaxAB": result(**kwargs)}}}
+
+
+def test_compare_same_counts():
+	baseline = results()
+	assert benchmark.compare(copy.deepcopy(baseline), baseline) == []
+
+
+# Timings of searches that take well under a millisecond vary a lot between runs, and do not count unless they are
+# worse by more than the slack
+def test_compare_ignores_noise_in_short_timings():
+	baseline = results(seconds=0.01, p50=0.4)
+	assert benchmark.compare(results(seconds=0.02, p50=0.9), baseline) == []
+	assert len(benchmark.compare(results(seconds=0.02, p50=1.5), baseline)) == 1
+	assert len(benchmark.compare(results(seconds=0.02, p50=0.9), baseline, slackMs=0)) == 1
+
+
+# Nodes per second is compared once the method runs for long enough
+def test_compare_nodes_per_second():
+	baseline = results(seconds=2, p50=200)
+	assert benchmark.compare(results(seconds=2.1, p50=200), baseline) == []
+	regressions = benchmark.compare(results(seconds=3, p50=200), baseline)
+	assert len(regressions) == 1 and "nodes/s" in regressions[0]
+
+
+def test_compare_counts():
+	baseline = results()
+	regressions = benchmark.compare(results(expanded=1001), baseline)
+	assert len(regressions) == 1 and "expanded" in regressions[0]
+	assert len(benchmark.compare(results(pruned=299), baseline)) == 1
+	assert len(benchmark.compare(results(cacheHits=49), baseline)) == 1
+	# Fewer nodes expanded is not a regression, even though fewer are then pruned or found in the table
+	assert benchmark.compare(results(expanded=800, pruned=200, cacheHits=20), baseline) == []
+
+
+def test_compare_other_suites_and_versions():
+	baseline = results()
+	new = results(expanded=2000)
+	new["results"]["3x3-3"] = {"minimax": result()}
+	assert len(benchmark.compare(new, baseline)) == 1
+	baseline["version"] = benchmark.VERSION + 1
+	assert len(benchmark.compare(results(), baseline)) == 1
+
+
+def test_make_position():
+	gameBoard, maxingPlayer = benchmark.makePosition(4, 4, 3, "2031")
+	assert isinstance(gameBoard, board.BitBoard)
+	assert maxingPlayer
+	assert gameBoard.colFills == [1, 1, 1, 1]
+	expected = board.BitBoard(4, 4, 3)
+	for col, name in [(2, 'X'), (0, 'O'), (3, 'X'), (1, 'O')]:
+		expected.addPiece(col, name)
+	assert gameBoard.hash == expected.hash
+	gameBoard, maxingPlayer = benchmark.makePosition(6, 7, 4, "")
+	assert maxingPlayer and gameBoard.colFills == [0] * 7
+	assert not benchmark.makePosition(6, 7, 4, "343")[1]
+
+
+# Every position in the suites is legal and the game is not already over
+def test_suite_positions():
+	for suite in benchmark.SUITES.values():
+		for moves in suite["positions"]:
+			gameBoard, maxingPlayer = benchmark.makePosition(suite["rows"], suite["columns"], suite["winNum"], moves)
+			assert sum(gameBoard.colFills) == len(moves)
+			assert not gameBoard.checkWin() and not gameBoard.checkFull()
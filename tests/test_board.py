@@ -0,0 +1,70 @@
+import random
+import board
+import candidateColumns
+
+
+def test_column_order():
+	assert board.columnOrder(7) == (3, 2, 4, 1, 5, 0, 6)
+	assert board.columnOrder(4) == (2, 1, 3, 0)
+	assert board.columnOrder(1) == (0,)
+
+
+# A Board and a BitBoard given the same moves, and pieces taken back, agree on everything the search asks them
+def test_board_and_bitboard_agree():
+	generator = random.Random(13)
+	for rows, columns, winNum in [(6, 7, 4), (4, 4, 3), (3, 9, 3), (5, 5, 2), (3, 8, 4), (5, 4, 5)]:
+		slow = board.Board(rows, columns, winNum)
+		fast = board.BitBoard(rows, columns, winNum)
+		played = []
+		for i in range(300):
+			legal = [col for col in range(columns) if slow.colFills[col] < rows]
+			if played and (not legal or slow.checkWin() or generator.random() < 0.3):
+				col = played.pop()
+				slow.removePiece(col)
+				fast.removePiece(col)
+			else:
+				col = generator.choice(legal)
+				name = 'XO'[len(played) % 2]
+				slow.addPiece(col, name)
+				fast.addPiece(col, name)
+				played.append(col)
+				assert slow.checkWin() == fast.checkWin()
+			assert slow.colFills == fast.colFills
+			assert slow.checkFull() == fast.checkFull()
+			assert (slow.hash, slow.mirrorHash) == (fast.hash, fast.mirrorHash)
+			if not slow.checkWin():
+				for name in 'XO':
+					assert slow.threatColumns(name) == fast.threatColumns(name)
+		assert slow.toBitBoard().hash == fast.hash
+
+
+# A position and its mirror image have each other's hashes
+def test_mirror_hash():
+	a = board.BitBoard(4, 5, 3)
+	b = board.BitBoard(4, 5, 3)
+	for col, name in [(0, 'X'), (1, 'O'), (0, 'X'), (3, 'O')]:
+		a.addPiece(col, name)
+		b.addPiece(4 - col, name)
+	assert a.hash == b.mirrorHash and a.mirrorHash == b.hash
+
+
+# The candidate columns kept up to date as pieces are added and removed match those worked out from scratch
+def test_candidate_columns_incremental():
+	generator = random.Random(14)
+	gameBoard = board.BitBoard(8, 30, 5)
+	candidates = candidateColumns.CandidateColumns(gameBoard, 2)
+	gameBoard.candidates = candidates
+	assert candidates.ordered(gameBoard) == [15]
+	played = []
+	for i in range(400):
+		if played and generator.random() < 0.4:
+			gameBoard.removePiece(played.pop())
+		else:
+			col = generator.randrange(30)
+			if gameBoard.colFills[col] < 8:
+				gameBoard.addPiece(col, 'XO'[len(played) % 2])
+				played.append(col)
+		fresh = candidateColumns.CandidateColumns(gameBoard, 2)
+		assert candidates.columns == fresh.columns
+		near = {col for col in range(30) if any(gameBoard.colFills[other] for other in range(max(0, col - 2), min(30, col + 3)))}
+		assert candidates.columns == near
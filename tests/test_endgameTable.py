@@ -0,0 +1,29 @@
+import endgameTable
+import player
+
+
+# Return the value of the position for the player to move with perfect play: 1, 0 or -1
+def moverValue(gameBoard, maxingPlayer):
+	value = player.Player('X').minimax(gameBoard.copy(), -1, maxingPlayer)[1]
+	if maxingPlayer:
+		return value
+	return -value
+
+
+# The table's results match a full minimax search, and its best moves keep them
+def test_table_matches_minimax(positions):
+	endgame = endgameTable.EndgameTable(3, 4, 3)
+	endgame.solve()
+	values = {endgameTable.WIN: 1, endgameTable.DRAW: 0, endgameTable.LOSS: -1}
+	for gameBoard, maxingPlayer in positions(3, 4, 3, 30, seed=7):
+		value = moverValue(gameBoard, maxingPlayer)
+		assert values[endgame.lookup(gameBoard)[0]] == value
+		move = endgame.bestMove(gameBoard)
+		child = gameBoard.copy()
+		child.addPiece(move, 'X' if maxingPlayer else 'O')
+		if child.checkWin():
+			assert value == 1
+		elif child.checkFull():
+			assert value == 0
+		else:
+			assert -moverValue(child, not maxingPlayer) == value
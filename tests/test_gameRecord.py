@@ -0,0 +1,138 @@
+import math
+import pytest
+import gameRecord
+import strengthTest
+
+
+# Scores of both players' moves are recorded from the point of view of 'X', so once a search proves the result
+# (a score of at least 1 either way) its sign matches the result of the game
+def test_self_play_scores_from_x():
+	for seed in range(3):
+		record = gameRecord.selfPlayGame({"algorithm": "pvs"}, [], 4, 5, 4, 30, seed)
+		proved = [score for nodes, seconds, score in record.stats if not math.isnan(score) and abs(score) >= 1]
+		for score in proved:
+			if record.result == gameRecord.X_WIN:
+				assert score > 0
+			elif record.result == gameRecord.O_WIN:
+				assert score < 0
+
+
+# Pondering is stopped for both players when the game ends
+def test_self_play_stops_pondering(monkeypatch):
+	players = []
+	makePlayer = strengthTest.makePlayer
+	def recordPlayer(config, name):
+		players.append(makePlayer(config, name))
+		return players[-1]
+	monkeypatch.setattr(strengthTest, "makePlayer", recordPlayer)
+	gameRecord.selfPlayGame({"ponder": True, "transposition": True}, [], 6, 9, 3, 20, 0)
+	assert len(players) == 2
+	for p in players:
+		assert p.ponderThread is None
+
+
+def sampleRecords():
+	return [
+		gameRecord.GameRecord(6, 7, 4, [3, 3, 2, gameRecord.PASS, 4], gameRecord.UNFINISHED),
+		gameRecord.GameRecord(3, 3, 3, [1, 0, 2], gameRecord.X_WIN, [(0, 0.0, math.nan), (12, 0.5, -0.25), (40, 1.5, 1.0)]),
+		gameRecord.GameRecord(2, 2, 3, [0, 0, 1, 1], gameRecord.DRAW),
+		gameRecord.GameRecord(4, 5, 4, [], gameRecord.O_WIN),
+	]
+
+
+def sameRecord(a, b):
+	if (a.numRows, a.numColumns, a.winNum, a.moves, a.result) != (b.numRows, b.numColumns, b.winNum, b.moves, b.result):
+		return False
+	if a.stats is None or b.stats is None:
+		return a.stats is None and b.stats is None
+	for x, y in zip(a.stats, b.stats):
+		if x[0] != y[0] or not math.isclose(x[1], y[1], rel_tol=1e-6) or not (x[2] == y[2] or (math.isnan(x[2]) and math.isnan(y[2]))):
+			return False
+	return len(a.stats) == len(b.stats)
+
+
+def test_pack_unpack_round_trip():
+	data = b"".join(record.pack() for record in sampleRecords())
+	offset = 0
+	for record in sampleRecords():
+		unpacked, offset = gameRecord.GameRecord.unpack(data, offset)
+		assert sameRecord(unpacked, record)
+	assert offset == len(data)
+
+
+# Records written in several chunks are read back in order
+def test_write_and_read(tmp_path):
+	path = tmp_path / "games.bin"
+	with gameRecord.RecordWriter(path, chunkSize=16) as writer:
+		for record in sampleRecords():
+			writer.write(record)
+	assert writer.numWritten == 4
+	records = list(gameRecord.readRecords(path))
+	assert len(records) == 4
+	for a, b in zip(records, sampleRecords()):
+		assert sameRecord(a, b)
+
+
+# A chunk cut short by a program stopping part way through a write is skipped
+def test_truncated_chunk_is_skipped(tmp_path):
+	path = tmp_path / "games.bin"
+	records = sampleRecords()
+	with gameRecord.RecordWriter(path) as writer:
+		writer.write(records[0])
+		writer.write(records[1])
+	with gameRecord.RecordWriter(path) as writer:
+		writer.write(records[2])
+	data = path.read_bytes()
+	path.write_bytes(data[:-3])
+	read = list(gameRecord.readRecords(path))
+	assert len(read) == 2
+	assert sameRecord(read[0], records[0]) and sameRecord(read[1], records[1])
+	# A truncated chunk header is skipped too
+	path.write_bytes(data[:len(data) - len(records[2].pack()) - 2])
+	assert len(list(gameRecord.readRecords(path))) == 2
+
+
+# Records appended after a program stopped part way through a write are all read back, whether the truncated chunk
+# is cut off by the next RecordWriter or left in the middle of the file by joining files
+@pytest.mark.parametrize("cut", [2, 9, 14])
+def test_append_after_truncated_chunk(tmp_path, cut):
+	path = tmp_path / "games.bin"
+	records = sampleRecords()
+	with gameRecord.RecordWriter(path, chunkSize=1) as writer:
+		for record in records[:3]:
+			writer.write(record)
+	data = path.read_bytes()
+	path.write_bytes(data[:-cut])
+	with gameRecord.RecordWriter(path, chunkSize=1) as writer:
+		for record in records:
+			writer.write(record)
+	read = list(gameRecord.readRecords(path))
+	assert len(read) == 6
+	for a, b in zip(read, records[:2] + records):
+		assert sameRecord(a, b)
+	assert len(path.read_bytes()) == len(data) - len(records[2].pack()) - gameRecord.CHUNK.size + sum(len(record.pack()) + gameRecord.CHUNK.size for record in records)
+	path.write_bytes(data[:-cut] + data)
+	read = list(gameRecord.readRecords(path))
+	assert len(read) == 5
+	for a, b in zip(read, records[:2] + records[:3]):
+		assert sameRecord(a, b)
+
+
+def test_not_a_record_file(tmp_path):
+	path = tmp_path / "other.bin"
+	path.write_bytes(b"NOTAFILE" * 4)
+	with pytest.raises(ValueError):
+		list(gameRecord.readRecords(path))
+	with pytest.raises(ValueError):
+		gameRecord.RecordWriter(path)
+
+
+# Replaying a record passes through every position, with the player to move and the move played
+def test_positions():
+	record = gameRecord.GameRecord(3, 3, 3, [1, gameRecord.PASS, 0, 2], gameRecord.UNFINISHED)
+	seen = []
+	for gameBoard, piece, move in record.positions(bitboard=True):
+		seen.append((sum(gameBoard.colFills), piece, move))
+	assert seen == [(0, 'X', 1), (1, 'O', gameRecord.PASS), (1, 'X', 0), (2, 'O', 2)]
+	assert gameBoard.colFills == [1, 1, 1]
+	assert gameBoard.checkSpace(0, 1).value == 'X' and gameBoard.checkSpace(0, 0).value == 'X' and gameBoard.checkSpace(0, 2).value == 'O'
@@ -0,0 +1,72 @@
+import asyncio
+import gameServer
+
+
+# Play a game with the server moving first and the client playing the lowest legal column, returning the last
+# message sent
+async def playGame(server, owned, rows=2, columns=2, winNum=3, timeMs=10):
+	messages = asyncio.Queue()
+	await server.handleRequest({"op": "new", "rows": rows, "columns": columns, "winNum": winNum, "first": "server", "timeMs": timeMs}, owned, messages.put)
+	started = await messages.get()
+	if started["op"] != "started":
+		return started
+	while True:
+		message = await messages.get()
+		assert message["op"] == "moved"
+		if message["result"] is not None:
+			return message
+		if message["player"] != started["client"]:
+			gameBoard = server.matches[started["game"]].gameBoard
+			column = [col for col in range(columns) if gameBoard.colFills[col] < rows][0]
+			await server.handleRequest({"op": "move", "game": started["game"], "column": column}, owned, messages.put)
+
+
+# Finished games do not count towards maxGames, but the latest can still be asked for their state
+def test_finished_games_are_not_in_progress():
+	server = gameServer.GameServer(workers=1, maxGames=3, keepFinished=2)
+
+	async def run():
+		owned = set()
+		for i in range(4):
+			# A 2x2 board with 3 to win is always a draw
+			assert (await playGame(server, owned))["result"] == "draw"
+		assert not server.matches
+		assert sorted(server.finished) == [3, 4]
+		assert owned == {3, 4}
+		messages = asyncio.Queue()
+		await server.handleRequest({"op": "state", "game": 4}, owned, messages.put)
+		state = await messages.get()
+		assert state["op"] == "state" and state["result"] == "draw"
+
+	try:
+		asyncio.run(run())
+	finally:
+		server.shutdown()
+
+
+# Start a game on a 6x7 board with the server moving first, returning the message with the server's first move
+async def firstMove(server, owned, timeMs):
+	messages = asyncio.Queue()
+	await server.handleRequest({"op": "new", "first": "server", "timeMs": timeMs}, owned, messages.put)
+	await messages.get()
+	return await messages.get()
+
+
+# The time allowed for a search starts when a worker starts it, so searches waiting in the pool's queue are not
+# abandoned for the time they waited
+def test_queued_searches_are_not_abandoned():
+	server = gameServer.GameServer(workers=1, searchGrace=0.1)
+
+	async def run():
+		owned = set()
+		return await asyncio.gather(*[firstMove(server, owned, 100) for i in range(5)])
+
+	try:
+		# Start the worker first, so its start-up time is not counted against the first search
+		server.pool.submit(sum, []).result()
+		messages = asyncio.run(run())
+	finally:
+		server.shutdown()
+	for message in messages:
+		assert message["op"] == "moved"
+	assert server.numFallbacks == 0
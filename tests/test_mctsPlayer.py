@@ -0,0 +1,18 @@
+import board
+import mctsPlayer
+
+
+# With enough playouts the search plays an immediate win, and blocks the opponent's
+def test_plays_win_and_block():
+	gameBoard = board.Board(4, 5, 3)
+	for col, name in [(0, 'X'), (4, 'O'), (1, 'X'), (4, 'O')]:
+		gameBoard.addPiece(col, name)
+	p = mctsPlayer.MCTSPlayer('X', seed=1)
+	p.playouts = 2000
+	assert p.getMove(gameBoard.copy()) == 2
+	gameBoard = board.Board(4, 5, 3)
+	for col, name in [(0, 'X'), (2, 'O'), (4, 'X'), (3, 'O')]:
+		gameBoard.addPiece(col, name)
+	p = mctsPlayer.MCTSPlayer('X', seed=1)
+	p.playouts = 2000
+	assert p.getMove(gameBoard.copy()) == 1
@@ -0,0 +1,118 @@
+import pytest
+import board
+import openingBook
+import player
+
+
+@pytest.fixture(scope="module")
+def book(tmp_path_factory):
+	path = tmp_path_factory.mktemp("book") / "book.bin"
+	numEntries = openingBook.buildBook(3, 4, 3, 3, path)
+	book = openingBook.OpeningBook(path)
+	assert len(book) == numEntries
+	yield book
+	book.close()
+
+
+# The value of the position for 'X' from a plain minimax search, kept as each position is reached in several ways
+referenceValues = {}
+
+def referenceValue(gameBoard):
+	if gameBoard.hash not in referenceValues:
+		maxingPlayer = sum(gameBoard.colFills) % 2 == 0
+		referenceValues[gameBoard.hash] = player.Player('X').minimax(gameBoard.copy(), -1, maxingPlayer)[1]
+	return referenceValues[gameBoard.hash]
+
+
+# Return every position reachable in at most plies moves that is not already over, with the moves that reach it
+def reachable(rows, columns, winNum, plies):
+	level = [(board.BitBoard(rows, columns, winNum), ())]
+	positions = []
+	for ply in range(plies + 1):
+		positions.extend(level)
+		nextLevel = []
+		for gameBoard, moves in level:
+			for col in range(columns):
+				if gameBoard.colFills[col] < rows:
+					child = gameBoard.copy()
+					child.addPiece(col, 'XO'[ply % 2])
+					if not child.checkWin() and not child.checkFull():
+						nextLevel.append((child, moves + (col,)))
+		level = nextLevel
+	return positions
+
+
+# Every position in the first plies moves, whichever way round it is reached, has its exact value and a move that
+# keeps it
+def test_book_values_and_moves(book):
+	positions = reachable(3, 4, 3, 3)
+	keys = set()
+	mirrored = 0
+	for gameBoard, moves in positions:
+		keys.add(min(gameBoard.hash, gameBoard.mirrorHash))
+		if gameBoard.mirrorHash < gameBoard.hash:
+			mirrored += 1
+		entry = book.lookup(gameBoard)
+		assert entry is not None, moves
+		move, value = entry
+		assert value == referenceValue(gameBoard)
+		child = gameBoard.copy()
+		child.addPiece(move, 'XO'[len(moves) % 2])
+		if child.checkWin():
+			assert value == (1 if len(moves) % 2 == 0 else -1)
+		else:
+			assert referenceValue(child) == value
+	assert len(book) == len(keys)
+	assert mirrored > 0
+
+
+def test_positions_not_in_book(book):
+	gameBoard = board.BitBoard(3, 4, 3)
+	for col in (0, 1, 2, 3):
+		gameBoard.addPiece(col, 'XO'[col % 2])
+	assert book.lookup(gameBoard) is None
+	assert book.lookup(board.BitBoard(4, 4, 3)) is None
+	assert book.find(12345) is None
+
+
+# A Player with a book plays its move without searching, and searches once the game leaves the book
+def test_player_uses_book(book):
+	gameBoard = board.Board(3, 4, 3)
+	gameBoard.addPiece(0, 'X')
+	p = player.Player('O')
+	p.book = book
+	move = p.getMoveAlphaBeta(gameBoard.copy())
+	assert move == book.lookup(gameBoard)[0]
+	assert p.bookHits == 1 and p.numExpanded == 0
+	for col, name in [(0, 'O'), (1, 'X'), (3, 'O')]:
+		gameBoard.addPiece(col, name)
+	p = player.Player('X')
+	p.book = book
+	p.getMove(gameBoard.copy())
+	assert p.bookHits == 0 and p.numExpanded > 0
+
+
+def test_not_a_book(tmp_path):
+	path = tmp_path / "other.bin"
+	path.write_bytes(b"NOTABOOK" * 4)
+	with pytest.raises(ValueError):
+		openingBook.OpeningBook(path)
+
+
+# Moves past column 127 are stored and reflected correctly
+def test_wide_board(tmp_path):
+	gameBoard = board.BitBoard(2, 300, 3)
+	gameBoard.addPiece(5, 'X')
+	path = tmp_path / "wide.bin"
+	with open(path, "wb") as f:
+		f.write(openingBook.HEADER.pack(openingBook.MAGIC, 2, 300, 3, 1, 1))
+		f.write(openingBook.RECORD.pack(min(gameBoard.hash, gameBoard.mirrorHash), 0, 290))
+	book = openingBook.OpeningBook(path)
+	mirror = board.BitBoard(2, 300, 3)
+	mirror.addPiece(294, 'X')
+	# The record's move is for whichever of the two positions has the smaller hash
+	if gameBoard.hash > gameBoard.mirrorHash:
+		gameBoard, mirror = mirror, gameBoard
+	assert book.lookup(gameBoard) == (290, 0)
+	assert book.lookup(mirror) == (9, 0)
+	book.close()
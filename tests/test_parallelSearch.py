@@ -0,0 +1,83 @@
+import math
+import pytest
+import board
+import parallelSearch
+import player
+
+
+@pytest.fixture(scope="module", autouse=True)
+def pools():
+	yield
+	parallelSearch.shutdown()
+
+
+def serialSearch(p, gameBoard, maxingPlayer, pruning):
+	if pruning:
+		return p.minimaxAB(gameBoard.copy(), -1, maxingPlayer, -math.inf, math.inf)
+	return p.minimax(gameBoard.copy(), -1, maxingPlayer)
+
+
+# The parallel search must choose the same move, with the same score, as the serial search
+@pytest.mark.parametrize("pruning", [True, False])
+def test_parallel_matches_serial(positions, pruning):
+	for gameBoard, maxingPlayer in positions(3, 4, 3, 40, seed=1):
+		serial = serialSearch(player.Player('X'), gameBoard, maxingPlayer, pruning)
+		p = player.Player('X')
+		p.workers = 2
+		assert parallelSearch.searchRoot(p, gameBoard.copy(), -1, maxingPlayer, pruning) == serial
+
+
+# An immediate win at the root is played, as in the serial search
+def test_parallel_plays_immediate_win():
+	gameBoard = board.BitBoard(3, 4, 3)
+	gameBoard.addPiece(0, 'X')
+	gameBoard.addPiece(3, 'O')
+	gameBoard.addPiece(2, 'X')
+	gameBoard.addPiece(2, 'O')
+	p = player.Player('X')
+	p.workers = 2
+	assert parallelSearch.searchRoot(p, gameBoard, -1, True, True)[0] == 1
+
+
+# Every search setting of the root player reaches the Player in the workers
+def test_worker_settings():
+	p = player.Player('O')
+	p.transposition = True
+	p.symmetry = False
+	p.threatPruning = False
+	p.candidateColumns = True
+	p.candidateDistance = 1
+	p.evaluator = None
+	worker = parallelSearch.getWorkerPlayer(parallelSearch.workerSettings(p))
+	assert worker.name == 'O'
+	for attribute in parallelSearch.SEARCH_SETTINGS:
+		assert getattr(worker, attribute) == getattr(p, attribute)
+
+
+# With candidateColumns set, the workers only search candidate columns, as the serial search does. Without
+# pruning, the workers expand exactly the nodes the serial search would.
+def test_parallel_candidate_columns(positions):
+	for gameBoard, maxingPlayer in positions(4, 12, 4, 6, seed=2):
+		serialPlayer = player.Player('X')
+		serialPlayer.candidateColumns = True
+		serialPlayer.candidateDistance = 1
+		serial = serialPlayer.minimax(gameBoard.copy(), 3, maxingPlayer)
+		p = player.Player('X')
+		p.candidateColumns = True
+		p.candidateDistance = 1
+		p.workers = 2
+		assert parallelSearch.searchRoot(p, gameBoard.copy(), 3, maxingPlayer, False) == serial
+		assert p.numExpanded == serialPlayer.numExpanded
+
+
+# The parallel search cannot run PVS, so asking for both is an error rather than a silent minimaxAB search. Timed
+# moves search in one process whatever workers is set to.
+def test_pvs_with_workers():
+	gameBoard = board.Board(3, 4, 3)
+	p = player.Player('X')
+	p.workers = 2
+	p.algorithm = 'pvs'
+	with pytest.raises(ValueError):
+		p.getMoveAlphaBeta(gameBoard.copy())
+	assert p.getMoveAlphaBeta(gameBoard.copy(), 50) in range(4)
+	assert p.numExpandedPerMove > 0
@@ -0,0 +1,111 @@
+import math
+import pytest
+import board
+import openingBook
+import player
+
+
+# The value of the position from the point of view of 'X', from a plain minimax search with no table. Values are
+# kept, as the same positions are checked by many tests.
+referenceValues = {}
+
+def referenceValue(gameBoard, maxingPlayer):
+	key = (gameBoard.numRows, gameBoard.numColumns, gameBoard.winNum, gameBoard.hash, maxingPlayer)
+	if key not in referenceValues:
+		referenceValues[key] = player.Player('X').minimax(gameBoard.copy(), -1, maxingPlayer)[1]
+	return referenceValues[key]
+
+
+def search(p, gameBoard, maxingPlayer, algorithm):
+	if algorithm == 'minimax':
+		return p.minimax(gameBoard, -1, maxingPlayer)
+	if algorithm == 'alphabeta':
+		return p.minimaxAB(gameBoard, -1, maxingPlayer, -math.inf, math.inf)
+	p.startSearch(gameBoard, None)
+	column, value = p.negamax(gameBoard, -1, -math.inf, math.inf, maxingPlayer)
+	if not maxingPlayer:
+		value = -value
+	return column, value
+
+
+# Every search, with or without the transposition table, symmetry and threat pruning, finds the value of plain
+# minimax, and plays a move that keeps it
+@pytest.mark.parametrize("algorithm", ['minimax', 'alphabeta', 'pvs'])
+@pytest.mark.parametrize("transposition, symmetry, threatPruning", [(False, False, True), (True, False, True), (True, True, True), (True, True, False)])
+def test_search_matches_minimax(positions, algorithm, transposition, symmetry, threatPruning):
+	for size in [(3, 4, 3), (4, 4, 3)]:
+		for gameBoard, maxingPlayer in positions(*size, 8, seed=8):
+			expected = referenceValue(gameBoard, maxingPlayer)
+			p = player.Player('X')
+			p.transposition = transposition
+			p.symmetry = symmetry
+			p.threatPruning = threatPruning
+			column, value = search(p, gameBoard.copy(), maxingPlayer, algorithm)
+			assert value == expected
+			child = gameBoard.copy()
+			child.addPiece(column, 'X' if maxingPlayer else 'O')
+			if child.checkWin():
+				assert value == (1 if maxingPlayer else -1)
+			else:
+				assert referenceValue(child, not maxingPlayer) == expected
+
+
+# A Board and the BitBoard built from it give the same search results
+def test_board_and_bitboard_agree(positions):
+	for gameBoard, maxingPlayer in positions(4, 4, 3, 10, seed=9, bitboard=False):
+		p = player.Player('X')
+		q = player.Player('X')
+		assert p.minimaxAB(gameBoard.copy(), 4, maxingPlayer, -math.inf, math.inf) == q.minimaxAB(gameBoard.toBitBoard(), 4, maxingPlayer, -math.inf, math.inf)
+		assert p.numExpanded == q.numExpanded
+
+
+# Return the value for 'X' of the position after the move, from plain minimax
+def valueAfter(gameBoard, column, maxingPlayer):
+	child = gameBoard.copy()
+	child.addPiece(column, 'X' if maxingPlayer else 'O')
+	return referenceValue(child, not maxingPlayer)
+
+
+# getMove and getMoveAlphaBeta play moves that keep the value of the position, with and without the table
+def test_get_move_keeps_value(positions):
+	for gameBoard, maxingPlayer in positions(3, 4, 3, 10, seed=10):
+		expected = referenceValue(gameBoard, maxingPlayer)
+		for transposition in (False, True):
+			p = player.Player('X' if maxingPlayer else 'O')
+			p.transposition = transposition
+			assert valueAfter(gameBoard, p.getMove(gameBoard.copy()), maxingPlayer) == expected
+			assert valueAfter(gameBoard, p.getMoveAlphaBeta(gameBoard.copy()), maxingPlayer) == expected
+
+
+# An untimed ponder search leaves its principal variation and table for the next move: when the opponent plays the
+# reply it expected, the next search follows on from the pondered line and finds the position already solved. If
+# the first move came from a search, the pondered position is already in the table, and the line found by that
+# search is carried over instead.
+@pytest.mark.parametrize("useBook", [False, True])
+def test_ponder_is_reused(tmp_path, useBook):
+	gameBoard = board.Board(3, 4, 3)
+	gameBoard.addPiece(1, 'X')
+	p = player.Player('O')
+	p.ponder = True
+	p.transposition = True
+	p.algorithm = 'pvs'
+	if useBook:
+		openingBook.buildBook(3, 4, 3, 1, tmp_path / "book.bin")
+		p.book = openingBook.OpeningBook(tmp_path / "book.bin")
+	move = p.getMoveAlphaBeta(gameBoard.copy())
+	p.ponderThread.join()
+	p.book = None
+	gameBoard.addPiece(move, 'O')
+	assert len(p.lastPV) > 1
+	gameBoard.addPiece(p.lastPV[0], 'X')
+	assert p.pvMovesPlayed(gameBoard) == 1
+	fresh = player.Player('O')
+	fresh.transposition = True
+	fresh.algorithm = 'pvs'
+	fresh.getMoveAlphaBeta(gameBoard.copy())
+	move = p.getMoveAlphaBeta(gameBoard.copy())
+	p.stopPonder()
+	if useBook:
+		assert p.numPondered > 0
+	assert p.numExpandedPerMove < fresh.numExpandedPerMove
+	assert valueAfter(gameBoard, move, False) == referenceValue(gameBoard, False)
@@ -0,0 +1,35 @@
+import time
+import board
+import player
+import proofSearch
+
+
+# The solver proves the same results as a full minimax search, and its moves achieve them
+def test_solver_matches_minimax(positions):
+	solver = proofSearch.ProofSolver(tableSize=1 << 16)
+	for gameBoard, maxingPlayer in positions(4, 4, 3, 20, seed=6):
+		result, move = solver.solve(gameBoard)
+		value = player.Player('X').minimax(gameBoard.copy(), -1, maxingPlayer)[1]
+		if not maxingPlayer:
+			value = -value
+		assert {1: proofSearch.WIN, -1: proofSearch.LOSS, 0: proofSearch.DRAW}[value] == result
+		if move is not None:
+			child = gameBoard.copy()
+			child.addPiece(move, 'X' if maxingPlayer else 'O')
+			if not child.checkWin():
+				childValue = player.Player('X').minimax(child, -1, not maxingPlayer)[1]
+				if not maxingPlayer:
+					childValue = -childValue
+				assert childValue == value
+
+
+# The solver only takes part of a timed move's budget, and the search the rest
+def test_solver_respects_time_budget():
+	p = player.Player('X')
+	p.solver = proofSearch.ProofSolver(tableSize=1 << 16)
+	p.solveThreshold = 0 # Every position looks decisive
+	gameBoard = board.Board(6, 7, 4)
+	start = time.perf_counter()
+	move = p.getMoveAlphaBeta(gameBoard, 100)
+	assert time.perf_counter() - start < 0.4
+	assert 0 <= move < 7
@@ -0,0 +1,21 @@
+import player
+import searchStats
+
+
+# Iteration scores are from the point of view of 'X' whichever search is used
+def test_iteration_scores_agree(positions):
+	for gameBoard, maxingPlayer in positions(4, 5, 4, 4, seed=3):
+		scores = {}
+		for algorithm in ('minimax', 'pvs'):
+			p = player.Player('X')
+			p.stats = searchStats.SearchStats()
+			p.nodeLimit = 2000
+			if algorithm == 'pvs':
+				p.pvsIterative(gameBoard.copy(), maxingPlayer)
+			else:
+				p.minimaxABIterative(gameBoard.copy(), maxingPlayer)
+			scores[algorithm] = [(record["depth"], round(record["score"], 9)) for record in p.stats.iterations]
+		# The searches expand different numbers of nodes, so may complete a different number of iterations
+		common = min(len(scores['pvs']), len(scores['minimax']))
+		assert common >= 2
+		assert scores['pvs'][:common] == scores['minimax'][:common]
@@ -0,0 +1,50 @@
+import math
+import pytest
+import strengthTest
+
+
+def test_elo_and_score_are_inverse():
+	for elo in (-400, -35.5, 0, 10, 200):
+		assert strengthTest.eloFromScore(strengthTest.scoreFromElo(elo)) == pytest.approx(elo)
+	assert strengthTest.eloFromScore(0.5) == 0
+	assert strengthTest.eloFromScore(0) == -math.inf
+	assert strengthTest.eloFromScore(1) == math.inf
+
+
+def test_mean_variance():
+	assert strengthTest.meanVariance([0.5]) == (0.5, 0)
+	mean, variance = strengthTest.meanVariance([0, 0.5, 1])
+	assert mean == 0.5
+	assert variance == pytest.approx(0.25)
+
+
+def test_elo_interval_contains_elo():
+	scores = [0.5, 0.75, 0.5, 1, 0.25, 0.75, 0.5, 0.75]
+	elo, low, high = strengthTest.eloInterval(scores)
+	assert low < elo < high
+	assert elo == pytest.approx(strengthTest.eloFromScore(sum(scores) / len(scores)))
+
+
+def test_llr():
+	# The ratio favours H1 when the scores are near its expected score, and H0 when they are near H0's
+	assert strengthTest.llr([0.75, 0.5, 1, 0.75], 0, 100) > 0
+	assert strengthTest.llr([0.5, 0.25, 0.5, 0.75], 0, 100) < 0
+	assert strengthTest.llr([1], 0, 100) == 0
+	# Pairs that all score the same still move the test towards a decision
+	assert strengthTest.llr([0.5] * 10, 0, 100) < 0
+	assert strengthTest.llr([0.5] * 20, 0, 100) < strengthTest.llr([0.5] * 10, 0, 100)
+
+
+# On a 2x2 board with 3 to win every game is drawn, so the test accepts H0 after a few pairs, having generated
+# only a few openings ahead of the pairs played
+def test_run_match_stops(monkeypatch):
+	numOpenings = [0]
+	randomOpening = strengthTest.randomOpening
+	def countOpening(*args):
+		numOpenings[0] += 1
+		return randomOpening(*args)
+	monkeypatch.setattr(strengthTest, "randomOpening", countOpening)
+	states = list(strengthTest.runMatch({}, {}, 2, 2, 3, timeMs=5, plies=0, elo0=0, elo1=100, maxPairs=1000, workers=1))
+	assert states[-1]["result"] == "H0"
+	assert states[-1]["pairs"] < 20
+	assert numOpenings[0] <= states[-1]["pairs"] + 4
@@ -0,0 +1,19 @@
+import tournament
+
+
+def result(outcome, time, expanded):
+	return {"result": outcome, "time": time, "expanded": expanded, "pruned": 0, "cacheHits": 0}
+
+
+def test_summarise():
+	summary = tournament.summarise([result(1, 1.0, 10), result(0, 3.0, 30), result(-1, 2.0, 20)])
+	assert (summary["wins"], summary["draws"], summary["losses"]) == (1, 1, 1)
+	assert summary["totalExpanded"] == 60
+	assert summary["averageTime"] == 2.0
+	assert summary["expandedSD"] == 10
+
+
+# A single game has no spread, but every statistic is still present
+def test_summarise_one_game():
+	summary = tournament.summarise([result(1, 1.0, 10)])
+	assert summary["timeSD"] == summary["expandedSD"] == summary["prunedSD"] == 0
@@ -0,0 +1,87 @@
+import math
+import random
+import pytest
+import board
+import player
+import sharedTable
+import transpositionTable
+
+
+@pytest.fixture
+def shared():
+	table = sharedTable.SharedTranspositionTable(64)
+	yield table
+	table.close()
+	table.unlink()
+
+
+def test_store_and_probe():
+	table = transpositionTable.TranspositionTable(64)
+	table.store(5, 0.25, 3, transpositionTable.LOWER, 2)
+	assert table.probe(5) == (0.25, 3, transpositionTable.LOWER, 2)
+	assert table.probe(6) is None
+	# A shallower result for another position in the same bucket goes to the always-replace slot
+	table.store(5 + 32, -1, 1, transpositionTable.EXACT, None)
+	assert table.probe(5) == (0.25, 3, transpositionTable.LOWER, 2)
+	assert table.probe(5 + 32) == (-1, 1, transpositionTable.EXACT, None)
+	assert len(table) == 2
+
+
+# The entries are only created by the first store, so a Player that never uses its table does not pay for it
+def test_table_created_on_first_store():
+	table = transpositionTable.TranspositionTable(64)
+	assert table.probe(5) is None and len(table) == 0
+	table.clear()
+	assert table.keys is None
+	table.store(5, 1, 2, transpositionTable.EXACT, 0)
+	assert len(table.keys) == 64 and table.probe(5) == (1, 2, transpositionTable.EXACT, 0)
+	gameBoard = board.BitBoard(4, 4, 3)
+	p = player.Player('X')
+	p.getMoveAlphaBeta(gameBoard.copy())
+	assert p.table.keys is None
+	p.transposition = True
+	p.getMoveAlphaBeta(gameBoard.copy())
+	assert p.table.keys is not None and len(p.table) > 0
+
+
+# The shared table gives the same results as TranspositionTable for the same operations
+def test_shared_table_matches(shared):
+	table = transpositionTable.TranspositionTable(64)
+	generator = random.Random(11)
+	for i in range(3000):
+		key = generator.randrange(200)
+		operation = generator.random()
+		if operation < 0.05:
+			table.newSearch()
+			shared.newSearch()
+		elif operation < 0.5:
+			assert shared.probe(key) == table.probe(key)
+		else:
+			depth = generator.choice([0, 1, 2, 5, math.inf])
+			value = generator.choice([0.5, -0.125, 1, -3])
+			flag = generator.choice([transpositionTable.EXACT, transpositionTable.LOWER, transpositionTable.UPPER])
+			move = generator.choice([None, 0, 6])
+			table.store(key, value, depth, flag, move)
+			shared.store(key, value, depth, flag, move)
+	assert len(shared) == len(table)
+
+
+# A player using the shared table finds the same values as one using its own table
+def test_player_with_shared_table(positions, shared):
+	for gameBoard, maxingPlayer in positions(3, 4, 3, 10, seed=12):
+		p = player.Player('X')
+		p.transposition = True
+		q = player.Player('X')
+		q.transposition = True
+		q.table = shared
+		assert p.minimaxAB(gameBoard.copy(), -1, maxingPlayer, -math.inf, math.inf)[1] == q.minimaxAB(gameBoard.copy(), -1, maxingPlayer, -math.inf, math.inf)[1]
+
+
+# Moves are stored in 16 bits, so the shared table works on boards wider than 127 columns
+def test_shared_table_wide_moves(shared):
+	for key, move in [(3, 130), (4, 1000), (5, 32767), (6, None), (7, 0)]:
+		shared.store(key, 0.5, 4, transpositionTable.EXACT, move)
+		assert shared.probe(key) == (0.5, 4, transpositionTable.EXACT, move)
+	assert len(shared) == 5
+	shared.clear()
+	assert shared.probe(3) is None and len(shared) == 0
@@ -0,0 +1,112 @@
+import concurrent.futures
+import argparse
+import json
+import random
+import statistics
+import time
+import game
+import player
+import randomPlayer
+
+# Runs many games between two players across a pool of processes, and streams the result of each game as it
+# finishes. Every game gets its own seed, derived from the tournament seed, which is used to seed both the
+# random module (used by Player) and the second player, so a tournament can be replayed exactly.
+#
+# Players are created in the worker processes by factory functions taking (name, seed). Factories must be defined
+# at the top level of a module so that they can be sent to the workers.
+
+def defaultPlayer1(name, seed):
+	return player.Player(name)
+
+def defaultPlayer2(name, seed):
+	return randomPlayer.RandomPlayer(name, seed)
+
+# Play a single game and return a dictionary describing it
+def playMatch(index, seed, rows, columns, winNum, pruning, quiet, makePlayer1, makePlayer2):
+	random.seed(seed)
+	p1 = makePlayer1("X", seed)
+	p2 = makePlayer2("O", seed)
+	g = game.Game(p1, p2, rows, columns, winNum)
+	start = time.perf_counter()
+	result = g.playGame(pruning, quiet)
+	end = time.perf_counter()
+
+	winner = None
+	if result == 1:
+		winner = p1.name
+	elif result == -1:
+		winner = p2.name
+	return {
+		"game": index,
+		"seed": seed,
+		"result": result,
+		"winner": winner,
+		"moves": g.numMoves,
+		"expanded": getattr(p1, "numExpanded", 0),
+		"pruned": getattr(p1, "numPruned", 0),
+		"cacheHits": getattr(p1, "cacheHits", 0),
+		"time": end - start,
+	}
+
+# Play the given number of games, yielding the result of each as it finishes (so not necessarily in order).
+# workers is the number of processes to use; None uses one per CPU, and 1 plays every game in this process.
+def runTournament(games, rows, columns, winNum, pruning=False, workers=None, seed=0, quiet=True, makePlayer1=defaultPlayer1, makePlayer2=defaultPlayer2):
+	seedGenerator = random.Random(seed)
+	seeds = [seedGenerator.getrandbits(32) for i in range(games)]
+
+	if workers == 1:
+		for i in range(games):
+			yield playMatch(i, seeds[i], rows, columns, winNum, pruning, quiet, makePlayer1, makePlayer2)
+		return
+
+	with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+		futures = []
+		for i in range(games):
+			futures.append(pool.submit(playMatch, i, seeds[i], rows, columns, winNum, pruning, quiet, makePlayer1, makePlayer2))
+		for future in concurrent.futures.as_completed(futures):
+			yield future.result()
+
+# Summarise a list of game results
+def summarise(results):
+	games = len(results)
+	wins = sum(1 for r in results if r["result"] == 1)
+	losses = sum(1 for r in results if r["result"] == -1)
+	times = [r["time"] for r in results]
+	expanded = [r["expanded"] for r in results]
+	pruned = [r["pruned"] for r in results]
+	summary = {
+		"games": games,
+		"wins": wins,
+		"draws": games - wins - losses,
+		"losses": losses,
+		"totalExpanded": sum(expanded),
+		"totalPruned": sum(pruned),
+		"cacheHits": sum(r["cacheHits"] for r in results),
+		"averageTime": statistics.mean(times) if times else 0,
+	}
+	# The standard deviations need at least two games, and are 0 otherwise
+	summary["timeSD"] = summary["expandedSD"] = summary["prunedSD"] = 0
+	if games > 1:
+		summary["timeSD"] = statistics.stdev(times)
+		summary["expandedSD"] = statistics.stdev(expanded)
+		summary["prunedSD"] = statistics.stdev(pruned)
+	return summary
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Play a tournament of Connect-N games and print one JSON line per game.")
+	parser.add_argument("--games", type=int, default=100)
+	parser.add_argument("--rows", type=int, default=3)
+	parser.add_argument("--columns", type=int, default=3)
+	parser.add_argument("--win", type=int, default=3)
+	parser.add_argument("--pruning", action="store_true", help="player 1 uses alpha-beta pruning")
+	parser.add_argument("--workers", type=int, default=None, help="number of processes (default: one per CPU)")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--verbose", action="store_true", help="print every move of every game")
+	args = parser.parse_args()
+
+	results = []
+	for result in runTournament(args.games, args.rows, args.columns, args.win, args.pruning, args.workers, args.seed, not args.verbose):
+		print(json.dumps(result), flush=True)
+		results.append(result)
+	print(json.dumps({"summary": summarise(results)}))
@@ -0,0 +1,101 @@
+# Flags recording how a stored value relates to the true value of a position.
+# Alpha-beta only finds exact values for positions whose value falls inside the (alpha, beta) window; otherwise
+# it only proves that the value is at least beta (a lower bound) or at most alpha (an upper bound).
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+# A fixed-size transposition table indexed by Zobrist hash.
+# The table is split into buckets of two slots. The first slot is depth-preferred: it is only replaced by an
+# entry searched to at least the same depth (or by the same position), so expensive results survive. The second
+# slot is always-replace, so recent positions can always be stored. When the depth-preferred slot is replaced,
+# its old entry moves to the always-replace slot rather than being lost.
+# Entries are aged so that a player can keep its table from one move to the next: each entry records the search
+# (numbered by newSearch()) that last stored or used it, and depth-preferred entries left by earlier searches can
+# be replaced whatever their depth. Otherwise deep results for positions that can no longer be reached would hold
+# on to their slots for the rest of the game.
+# Entries are stored in parallel lists rather than as objects, so the table allocates nothing once they exist. The
+# lists are only created by the first store, as every Player has a table but most never use it, and a full-size
+# table takes several megabytes and milliseconds to create.
+class TranspositionTable:
+
+	def __init__(self, size):
+		# size is the total number of entries, which is rounded down to a whole number of buckets
+		self.numBuckets = max(1, size // 2)
+		self.size = self.numBuckets * 2
+		self.keys = None # The lists of entries, created by allocate() on the first store
+		self.age = 0
+		self.numEntries = 0
+		# Counts of the probes made, the probes that found their key, the entries stored, and the stores that
+		# overwrote an entry for a different position
+		self.numProbes = 0
+		self.numHits = 0
+		self.numStores = 0
+		self.numCollisions = 0
+
+	def __len__(self):
+		return self.numEntries
+
+	# Create the empty lists of entries
+	def allocate(self):
+		self.keys = [None] * self.size
+		self.values = [0] * self.size
+		self.depths = [0] * self.size
+		self.flags = [EXACT] * self.size
+		self.moves = [None] * self.size
+		self.ages = [0] * self.size
+
+	# Start a new search, making entries from earlier searches replaceable
+	def newSearch(self):
+		self.age = self.age + 1
+
+	# Return the entry for the given key as (value, depth, flag, move), or None if it is not stored.
+	# The entry is marked as used by the current search.
+	def probe(self, key):
+		self.numProbes += 1
+		if self.keys is None:
+			return None
+		slot = (key % self.numBuckets) * 2
+		if self.keys[slot] != key:
+			slot = slot + 1
+			if self.keys[slot] != key:
+				return None
+		self.numHits += 1
+		self.ages[slot] = self.age
+		return self.values[slot], self.depths[slot], self.flags[slot], self.moves[slot]
+
+	# Store an entry for the given key, using the replacement policy described above
+	def store(self, key, value, depth, flag, move):
+		self.numStores += 1
+		if self.keys is None:
+			self.allocate()
+		slot = (key % self.numBuckets) * 2
+		oldKey = self.keys[slot]
+		if oldKey is None or oldKey == key or depth >= self.depths[slot] or self.ages[slot] != self.age:
+			if oldKey is not None and oldKey != key:
+				self.write(slot + 1, oldKey, self.values[slot], self.depths[slot], self.flags[slot], self.moves[slot], self.ages[slot])
+			self.write(slot, key, value, depth, flag, move, self.age)
+		else:
+			self.write(slot + 1, key, value, depth, flag, move, self.age)
+
+	def write(self, slot, key, value, depth, flag, move, age):
+		if self.keys[slot] is None:
+			self.numEntries = self.numEntries + 1
+		elif self.keys[slot] != key:
+			self.numCollisions += 1
+		self.keys[slot] = key
+		self.values[slot] = value
+		self.depths[slot] = depth
+		self.flags[slot] = flag
+		self.moves[slot] = move
+		self.ages[slot] = age
+
+	# Remove every entry from the table
+	def clear(self):
+		if self.keys is None:
+			return
+		for i in range(self.size):
+			self.keys[i] = None
+			self.moves[i] = None
+		self.numEntries = 0